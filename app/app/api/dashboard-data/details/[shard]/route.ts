@@ -0,0 +1,34 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { getDataSnapshot, getShardBody, publishedResponse } from '@/lib/server-data';
+
+export const dynamic = 'force-dynamic';
+
+export async function GET(request: NextRequest, { params }: { params: { shard: string } }) {
+  try {
+    const snapshot = getDataSnapshot();
+    
+    if (!snapshot) {
+      return NextResponse.json(
+        { error: 'Failed to load dashboard data' },
+        { status: 500 }
+      );
+    }
+
+    const shard = getShardBody(snapshot, params.shard);
+    if (!shard) {
+      return NextResponse.json(
+        { error: `Unknown category shard: ${params.shard}` },
+        { status: 404 }
+      );
+    }
+
+    // Each shard has its own ETag: a change elsewhere does not invalidate it
+    return publishedResponse(request, snapshot, shard);
+  } catch (error) {
+    console.error('Error in dashboard details API route:', error);
+    return NextResponse.json(
+      { error: 'Internal server error' },
+      { status: 500 }
+    );
+  }
+}
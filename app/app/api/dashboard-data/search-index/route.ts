@@ -0,0 +1,34 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { getDataSnapshot, getSearchIndexBody, publishedResponse } from '@/lib/server-data';
+
+export const dynamic = 'force-dynamic';
+
+export async function GET(request: NextRequest) {
+  try {
+    const snapshot = getDataSnapshot();
+    
+    if (!snapshot) {
+      return NextResponse.json(
+        { error: 'Failed to load dashboard data' },
+        { status: 500 }
+      );
+    }
+
+    // Built by the publish pipeline; clients fall back to scanning the shards without it
+    const index = getSearchIndexBody(snapshot);
+    if (!index) {
+      return NextResponse.json(
+        { error: 'Search index not published for this version' },
+        { status: 404 }
+      );
+    }
+
+    return publishedResponse(request, snapshot, index);
+  } catch (error) {
+    console.error('Error in search index API route:', error);
+    return NextResponse.json(
+      { error: 'Internal server error' },
+      { status: 500 }
+    );
+  }
+}
@@ -0,0 +1,26 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { getDataSnapshot, publishedResponse } from '@/lib/server-data';
+
+export const dynamic = 'force-dynamic';
+
+export async function GET(request: NextRequest) {
+  try {
+    const snapshot = getDataSnapshot();
+    
+    if (!snapshot) {
+      return NextResponse.json(
+        { error: 'Failed to load dashboard data' },
+        { status: 500 }
+      );
+    }
+
+    // Metadata, chart data and the hash of every category shard
+    return publishedResponse(request, snapshot, snapshot.summary);
+  } catch (error) {
+    console.error('Error in dashboard summary API route:', error);
+    return NextResponse.json(
+      { error: 'Internal server error' },
+      { status: 500 }
+    );
+  }
+}
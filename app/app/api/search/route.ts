@@ -0,0 +1,48 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { querySearchService, SearchServiceUnavailable } from '@/lib/search-service';
+
+export const dynamic = 'force-dynamic';
+
+// GET /api/search?q=angelo&category=Pavimentação%20e%20Vias&page=2&pageSize=20
+export async function GET(request: NextRequest) {
+  const params = request.nextUrl.searchParams;
+  const page = Number(params.get('page') || '1');
+  const pageSize = Number(params.get('pageSize') || '20');
+
+  if (!Number.isInteger(page) || page < 1 || !Number.isInteger(pageSize) || pageSize < 1) {
+    return NextResponse.json(
+      { error: 'page and pageSize must be positive integers' },
+      { status: 400 }
+    );
+  }
+
+  try {
+    const result = await querySearchService({
+      query: params.get('q') || '',
+      category: params.get('category'),
+      page,
+      pageSize
+    });
+
+    const headers = new Headers();
+    // Results follow the published data version; revalidate like the data routes
+    headers.set('Cache-Control', 'no-cache');
+    if (result.version) {
+      headers.set('X-Data-Version', result.version);
+    }
+    return NextResponse.json(result, { headers });
+  } catch (error) {
+    if (error instanceof SearchServiceUnavailable) {
+      console.warn('Search service unavailable:', error.message);
+      return NextResponse.json(
+        { error: 'Search service unavailable' },
+        { status: 503 }
+      );
+    }
+    console.error('Error in search API route:', error);
+    return NextResponse.json(
+      { error: 'Internal server error' },
+      { status: 500 }
+    );
+  }
+}
@@ -1,6 +1,6 @@
 
 import React from 'react';
-import { loadDashboardData } from '@/lib/server-data';
+import { loadDashboardSummary } from '@/lib/server-data';
 import DashboardClient from '@/components/dashboard-client';
 
 // Revalidate every 60 seconds (ISR)
@@ -13,8 +13,8 @@ export default async function DashboardPage() {
   let data = null;
   
   try {
-    // Try to load initial data server-side for better performance
-    data = await loadDashboardData();
+    // Only the summary is rendered server-side; category details load on demand
+    data = await loadDashboardSummary();
     console.log('Server-side data loaded:', data ? 'success' : 'failed');
   } catch (error) {
     console.warn('Server-side data loading failed, will load client-side:', error);
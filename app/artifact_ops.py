@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Operações Nativas de Artefatos
+Cópias no kernel (reflink, copy_file_range, sendfile), hardlinks e troca
+atômica por rename, e remoção de diretórios por rename com limpeza adiada,
+sem abrir um shell (cp/rm) para cada passo do rebuild
+"""
+
+import os
+import time
+import fcntl
+import errno
+import shutil
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
+TRASH_DIR = f"{PROJECT_ROOT}/.trash"
+FICLONE = 0x40049409  # ioctl de reflink (btrfs, xfs, ...)
+COPY_CHUNK = 64 * 1024 * 1024
+
+# Erros que indicam "não suportado aqui" e levam ao próximo método
+_UNSUPPORTED = {errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP,
+                errno.ENOTTY, errno.EPERM, errno.EBADF, errno.ETXTBSY}
+
+_cleanup_threads = []
+
+
+def _copy_fd_range(src_fd, dst_fd, size):
+    copied = 0
+    while copied < size:
+        count = os.copy_file_range(src_fd, dst_fd, min(COPY_CHUNK, size - copied))
+        if count == 0:
+            break
+        copied += count
+    return copied
+
+
+def _sendfile(src_fd, dst_fd, size):
+    copied = 0
+    while copied < size:
+        count = os.sendfile(dst_fd, src_fd, copied, min(COPY_CHUNK, size - copied))
+        if count == 0:
+            break
+        copied += count
+    return copied
+
+
+def _copy_contents(src, dst_fd):
+    """Copia src para dst_fd pelo método mais barato disponível; retorna o método"""
+    with open(src, 'rb') as source:
+        src_fd = source.fileno()
+        size = os.fstat(src_fd).st_size
+
+        try:
+            fcntl.ioctl(dst_fd, FICLONE, src_fd)
+            return 'reflink'
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+
+        if hasattr(os, 'copy_file_range'):
+            try:
+                if _copy_fd_range(src_fd, dst_fd, size) == size:
+                    return 'copy_file_range'
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED:
+                    raise
+            os.lseek(src_fd, 0, os.SEEK_SET)
+            os.ftruncate(dst_fd, 0)
+            os.lseek(dst_fd, 0, os.SEEK_SET)
+
+        try:
+            if _sendfile(src_fd, dst_fd, size) == size:
+                return 'sendfile'
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+        os.lseek(src_fd, 0, os.SEEK_SET)
+        os.ftruncate(dst_fd, 0)
+        os.lseek(dst_fd, 0, os.SEEK_SET)
+
+        with os.fdopen(os.dup(dst_fd), 'wb') as target:
+            shutil.copyfileobj(source, target)
+        return 'userspace'
+
+
+def _temp_path(dst):
+    directory, name = os.path.split(os.path.abspath(dst))
+    return os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def copy_file(src, dst):
+    """Copia src sobre dst atomicamente (arquivo temporário + rename); retorna o método"""
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    tmp_path = _temp_path(dst)
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            method = _copy_contents(src, fd)
+        finally:
+            os.close(fd)
+        shutil.copymode(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return method
+
+
+def link_or_copy(src, dst):
+    """Publica src em dst por hardlink (mesmo sistema de arquivos) ou cópia nativa
+
+    O destino é trocado por rename: leitores veem o arquivo antigo ou o novo.
+    Como os escritores do JSON também publicam por rename, o hardlink funciona
+    como um instantâneo do conteúdo de src.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    tmp_path = _temp_path(dst)
+    try:
+        os.link(src, tmp_path)
+    except OSError as e:
+        if e.errno not in _UNSUPPORTED | {errno.EMLINK}:
+            raise
+        return copy_file(src, dst)
+    try:
+        os.replace(tmp_path, dst)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return 'hardlink'
+
+
+def publish_artifact(src, dst):
+    """link_or_copy com tempo medido, para o log do rebuild"""
+    start_time = time.perf_counter()
+    method = link_or_copy(src, dst)
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    logger.info(f"📄 {os.path.basename(src)} → {dst} ({method}, {elapsed_ms:.2f} ms)")
+    return method
+
+
+def link_tree(src_dir, dst_dir, exclude_dirs=()):
+    """Recria src_dir em dst_dir com hardlinks (cópia nativa se não for possível)
+
+    Retorna o número de arquivos; dst_dir deve ser novo (não é mesclado).
+    """
+    count = 0
+    for root, dirs, names in os.walk(src_dir):
+        dirs[:] = [d for d in dirs if d not in exclude_dirs]
+        target_root = os.path.join(dst_dir, os.path.relpath(root, src_dir))
+        os.makedirs(target_root, exist_ok=True)
+        for name in names:
+            src = os.path.join(root, name)
+            dst = os.path.join(target_root, name)
+            if os.path.islink(src):
+                os.symlink(os.readlink(src), dst)
+                continue
+            try:
+                os.link(src, dst)
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED | {errno.EMLINK}:
+                    raise
+                copy_file(src, dst)
+            count += 1
+    return count
+
+
+def _rmtree_quietly(path):
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def remove_tree(path, deferred=True, trash_dir=TRASH_DIR):
+    """Remove um diretório: rename instantâneo para a lixeira e apagamento em segundo plano
+
+    Se o rename não for possível (outro sistema de arquivos), apaga na hora.
+    """
+    if not os.path.lexists(path):
+        return
+    if os.path.islink(path) or not os.path.isdir(path):
+        os.remove(path)
+        return
+    if not deferred:
+        shutil.rmtree(path)
+        return
+
+    os.makedirs(trash_dir, exist_ok=True)
+    trash_path = os.path.join(trash_dir, f"{os.path.basename(path)}.{time.time_ns()}")
+    try:
+        os.rename(path, trash_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.rmtree(path)
+        return
+
+    # Thread não-daemon: o processo só termina depois da limpeza
+    thread = threading.Thread(target=_rmtree_quietly, args=(trash_path,), name='trash-cleanup')
+    thread.start()
+    _cleanup_threads.append(thread)
+
+
+def purge_trash(trash_dir=TRASH_DIR):
+    """Apaga sobras da lixeira (ex: processo interrompido antes da limpeza)"""
+    if not os.path.isdir(trash_dir):
+        return
+    for entry in os.listdir(trash_dir):
+        path = os.path.join(trash_dir, entry)
+        if os.path.isdir(path) and not os.path.islink(path):
+            _rmtree_quietly(path)
+        else:
+            os.remove(path)
+
+
+def wait_for_cleanup():
+    """Aguarda as remoções adiadas em andamento"""
+    while _cleanup_threads:
+        _cleanup_threads.pop().join()
@@ -8,18 +8,19 @@ Integra o sistema de monitoramento com deploy automático via checkpoint
 import os
 import sys
 import json
-import hashlib
 import subprocess
 import time
 import logging
 from datetime import datetime
 
+from change_detection import calculate_file_hash
+from rebuild_coordinator import RebuildCoordinator
+
 # Configurações
 PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
 APP_DIR = f"{PROJECT_ROOT}/app"
 JSON_FILE = f"{APP_DIR}/public/dashboard_data.json" 
 MONITORING_DIR = f"{PROJECT_ROOT}/monitoring_system"
-REBUILD_STATE_FILE = f"{MONITORING_DIR}/rebuild_state.json"
 LOG_DIR = f"{MONITORING_DIR}/logs"
 
 # Configurar logging
@@ -42,40 +43,24 @@ class AutoCheckpointSystem:
         self.project_root = PROJECT_ROOT
         self.app_dir = APP_DIR
         self.json_file = JSON_FILE
-        self.rebuild_state_file = REBUILD_STATE_FILE
+        self.coordinator = RebuildCoordinator()
         
     def calculate_file_hash(self, file_path):
-        """Calcula hash MD5 do arquivo"""
-        try:
-            with open(file_path, 'rb') as f:
-                content = f.read()
-                return hashlib.md5(content).hexdigest()
-        except Exception as e:
-            logger.error(f"Erro ao calcular hash: {e}")
-            return None
+        """Calcula hash do conteúdo (só relê o arquivo quando o stat muda)"""
+        return calculate_file_hash(file_path)
     
     def get_rebuild_state(self):
-        """Obtém estado atual do rebuild"""
-        try:
-            if os.path.exists(self.rebuild_state_file):
-                with open(self.rebuild_state_file, 'r') as f:
-                    return json.load(f)
-            return {}
-        except Exception as e:
-            logger.error(f"Erro ao ler estado: {e}")
+        """Obtém o estado atual do checkpoint (estado unificado do coordenador)"""
+        last_hash = self.coordinator.get_last_hash('checkpoint')
+        if not last_hash:
             return {}
+        entry = self.coordinator.load_state().get('hashes', {}).get('checkpoint', {})
+        return {'last_hash': last_hash, 'last_rebuild': entry.get('updated_at', 'N/A')}
     
     def save_rebuild_state(self, hash_value):
-        """Salva estado do rebuild"""
+        """Salva o estado atual do checkpoint"""
         try:
-            state = {
-                "last_hash": hash_value,
-                "last_check": datetime.now().isoformat(),
-                "last_rebuild": datetime.now().isoformat()
-            }
-            with open(self.rebuild_state_file, 'w') as f:
-                json.dump(state, f, indent=2)
-            logger.info(f"Estado salvo: {hash_value}")
+            self.coordinator.record_hash(hash_value, 'checkpoint')
         except Exception as e:
             logger.error(f"Erro ao salvar estado: {e}")
     
@@ -201,6 +186,7 @@ class AutoCheckpointSystem:
             if state:
                 logger.info(f"🔄 Último checkpoint: {state.get('last_rebuild', 'N/A')}")
                 logger.info(f"🔍 Hash atual: {state.get('last_hash', 'N/A')[:8]}...")
+            self.coordinator.log_status()
             
             # Verificar se há mudanças pendentes
             if self.has_file_changed():
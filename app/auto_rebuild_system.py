@@ -7,20 +7,34 @@ Detecta mudanças no dashboard_data.json e triggera rebuild/redeploy automaticam
 import os
 import sys
 import json
-import hashlib
 import subprocess
 import time
 import logging
 from datetime import datetime
 from pathlib import Path
 
+from change_detection import calculate_file_hash
+from parallel_archive import create_archive
+from deploy_packaging import DeltaPackager
+from stage_graph import Stage, StageGraph
+from build_fingerprint import BuildFingerprint, clean_build_dir, code_input_paths
+from rebuild_coordinator import RebuildCoordinator
+from rebuild_daemon import delegate
+from backup_store import BackupStore
+from release_manager import ReleaseManager
+
 # Configurações
 PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
 APP_DIR = f"{PROJECT_ROOT}/app"
 JSON_FILE = f"{APP_DIR}/public/dashboard_data.json"
-HASH_FILE = f"{PROJECT_ROOT}/.last_json_hash"
 LOG_DIR = f"{PROJECT_ROOT}/.logs"
 DEPLOY_DIR = f"{PROJECT_ROOT}/.deploy"
+STAGE_CACHE_FILE = f"{PROJECT_ROOT}/.stage_cache.json"
+PACKAGE_CODEC = "gzip"  # "gzip" (compatível com tar -xzf) ou "zstd" (requer zstandard)
+PACKAGE_LEVEL = None    # None = nível padrão do codec
+
+# Entradas de código do build (dados em public/ são lidos em tempo de execução)
+BUILD_INPUTS = code_input_paths(APP_DIR)
 
 # Configurar logging
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -42,38 +56,27 @@ class DashboardRebuildSystem:
         self.project_root = PROJECT_ROOT
         self.app_dir = APP_DIR
         self.json_file = JSON_FILE
-        self.hash_file = HASH_FILE
         self.deploy_dir = DEPLOY_DIR
+        self.packager = DeltaPackager(self.deploy_dir, codec=PACKAGE_CODEC, level=PACKAGE_LEVEL)
+        self.package_file = self.packager.full_package
+        self.force_stages = False
+        self.build_id = None
+        self.build_fingerprint = BuildFingerprint(self.app_dir)
+        self.coordinator = RebuildCoordinator()
+        self.releases = ReleaseManager(self.deploy_dir, codec=PACKAGE_CODEC)
         
     def calculate_file_hash(self, file_path):
-        """Calcula hash MD5 do arquivo para detectar mudanças"""
-        try:
-            with open(file_path, 'rb') as f:
-                content = f.read()
-                return hashlib.md5(content).hexdigest()
-        except FileNotFoundError:
-            logger.warning(f"Arquivo não encontrado: {file_path}")
-            return None
-        except Exception as e:
-            logger.error(f"Erro ao calcular hash: {e}")
-            return None
+        """Calcula hash do conteúdo (só relê o arquivo quando o stat muda)"""
+        return calculate_file_hash(file_path)
     
     def get_last_hash(self):
-        """Recupera o último hash salvo"""
-        try:
-            if os.path.exists(self.hash_file):
-                with open(self.hash_file, 'r') as f:
-                    return f.read().strip()
-        except Exception as e:
-            logger.error(f"Erro ao ler último hash: {e}")
-        return None
+        """Recupera o último hash salvo (estado unificado do coordenador)"""
+        return self.coordinator.get_last_hash()
     
     def save_hash(self, hash_value):
         """Salva o hash atual"""
         try:
-            with open(self.hash_file, 'w') as f:
-                f.write(hash_value)
-            logger.info(f"Hash salvo: {hash_value}")
+            self.coordinator.record_hash(hash_value)
         except Exception as e:
             logger.error(f"Erro ao salvar hash: {e}")
     
@@ -131,104 +134,74 @@ class DashboardRebuildSystem:
             return False, str(e)
     
     def backup_current_deploy(self):
-        """Faz backup do deploy atual"""
+        """Faz backup do deploy atual no repositório deduplicado (.backups/, com retenção)"""
         try:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_file = f"{self.deploy_dir}/app_backup_{timestamp}.tgz"
-            
-            if os.path.exists(f"{self.deploy_dir}/app.tgz"):
-                os.rename(f"{self.deploy_dir}/app.tgz", backup_file)
-                logger.info(f"Backup criado: {backup_file}")
-                
-                # Manter apenas os 5 backups mais recentes
-                self.cleanup_old_backups()
+            if os.path.exists(self.package_file):
+                entry = BackupStore().backup_file(self.package_file, 'deploy')
+                logger.info(f"Backup criado: {entry['id']}")
                 
         except Exception as e:
             logger.error(f"Erro ao fazer backup: {e}")
     
-    def cleanup_old_backups(self):
-        """Remove backups antigos, mantendo apenas os 5 mais recentes"""
-        try:
-            backup_files = []
-            for file in os.listdir(self.deploy_dir):
-                if file.startswith('app_backup_') and file.endswith('.tgz'):
-                    backup_files.append(os.path.join(self.deploy_dir, file))
-            
-            backup_files.sort(key=os.path.getmtime, reverse=True)
-            
-            # Remove backups além dos 5 mais recentes
-            for old_backup in backup_files[5:]:
-                os.remove(old_backup)
-                logger.info(f"Backup antigo removido: {old_backup}")
-                
-        except Exception as e:
-            logger.error(f"Erro ao limpar backups antigos: {e}")
+    def get_build_id(self):
+        """BUILD_ID determinístico derivado do código: builds iguais geram saídas iguais"""
+        if not self.build_id:
+            self.build_id = self.build_fingerprint.current()[:20]
+        return self.build_id
     
     def build_application(self):
         """Executa o build da aplicação"""
         logger.info("=== INICIANDO BUILD DA APLICAÇÃO ===")
         
-        # Limpar build anterior
-        success, _ = self.run_command("rm -rf .next")
-        if not success:
-            logger.warning("Falha ao limpar build anterior")
+        # Limpar build anterior preservando .next/cache (build incremental)
+        try:
+            clean_build_dir(f"{self.app_dir}/.next")
+        except Exception as e:
+            logger.warning(f"Falha ao limpar build anterior: {e}")
         
         # Executar build
-        success, output = self.run_command("npm run build")
+        success, output = self.run_command(f"NEXT_BUILD_ID={self.get_build_id()} npm run build")
         if not success:
             logger.error("Falha no build da aplicação")
             return False
         
-        logger.info("Build da aplicação concluído com sucesso")
-        return True
-    
-    def export_static_files(self):
-        """Exporta arquivos estáticos"""
-        logger.info("=== INICIANDO EXPORT ESTÁTICO ===")
-        
-        # Configurar para export estático
-        env_vars = {
-            'NEXT_OUTPUT_MODE': 'export',
-            'NEXT_DIST_DIR': '.build'
-        }
-        
-        env_command = ' '.join([f'{k}={v}' for k, v in env_vars.items()])
-        success, output = self.run_command(f"{env_command} npm run build")
-        
-        if not success:
-            logger.error("Falha no export estático")
-            return False
+        self.build_fingerprint.record_build()
         
-        logger.info("Export estático concluído com sucesso")
+        logger.info("Build da aplicação concluído com sucesso")
         return True
     
     def create_deployment_package(self):
-        """Cria pacote de deployment"""
+        """Empacota o build (.next): delta sobre a base ou pacote completo, como o rebuild rápido"""
         logger.info("=== CRIANDO PACOTE DE DEPLOYMENT ===")
         
         os.makedirs(self.deploy_dir, exist_ok=True)
+        build_dir = f"{self.app_dir}/.next"
         
-        # Fazer backup do deploy atual
-        self.backup_current_deploy()
-        
-        # Criar novo pacote
-        success, output = self.run_command(
-            f"tar -czf {self.deploy_dir}/app.tgz -C {self.app_dir}/.build .",
-            cwd=self.project_root
-        )
-        
-        if not success:
-            logger.error("Falha ao criar pacote de deployment")
+        try:
+            plan = self.packager.plan(build_dir)
+            logger.info(f"Modo do pacote: {plan['mode']} ({plan['reason']})")
+            if plan['mode'] == 'unchanged':
+                return True
+            if plan['mode'] == 'delta':
+                self.packager.write_delta(build_dir, plan)
+                return True
+            
+            # Fazer backup do deploy atual e criar novo pacote (compressão paralela em todos os núcleos)
+            self.backup_current_deploy()
+            create_archive(build_dir, self.package_file, codec=PACKAGE_CODEC, level=PACKAGE_LEVEL)
+            self.packager.record_full(plan)
+        except Exception as e:
+            logger.error(f"Falha ao criar pacote de deployment: {e}")
             return False
         
-        logger.info(f"Pacote de deployment criado: {self.deploy_dir}/app.tgz")
+        logger.info(f"Pacote de deployment criado: {self.package_file}")
         return True
     
     def get_deployment_info(self):
         """Obtém informações do deployment"""
         try:
-            if os.path.exists(f"{self.deploy_dir}/app.tgz"):
-                stat = os.stat(f"{self.deploy_dir}/app.tgz")
+            if os.path.exists(self.package_file):
+                stat = os.stat(self.package_file)
                 size_mb = stat.st_size / (1024 * 1024)
                 modified = datetime.fromtimestamp(stat.st_mtime)
                 
@@ -242,33 +215,54 @@ class DashboardRebuildSystem:
         
         return {'exists': False}
     
+    def publish(self):
+        """Registra o hash do JSON publicado"""
+        current_hash = self.calculate_file_hash(self.json_file)
+        if current_hash:
+            self.save_hash(current_hash)
+        return True
+    
+    def build_stage_graph(self):
+        """Monta o grafo de etapas do rebuild completo"""
+        graph = StageGraph(STAGE_CACHE_FILE)
+        # Uma única compilação: o mesmo .next é empacotado e vira a release servida
+        graph.add(Stage(
+            'build', self.build_application,
+            inputs=BUILD_INPUTS, outputs=[f"{self.app_dir}/.next"],
+            relative_to=self.app_dir, exclude_dirs=['cache']
+        ))
+        graph.add(Stage(
+            'package', self.create_deployment_package,
+            deps=['build'], outputs=[self.package_file]
+        ))
+        graph.add(Stage(
+            'publish', self.publish,
+            inputs=[self.json_file], deps=['package']
+        ))
+        return graph
+    
     def perform_rebuild(self):
         """Executa o processo completo de rebuild"""
         logger.info("🚀 INICIANDO PROCESSO DE REBUILD AUTOMÁTICO")
         start_time = time.time()
         
         try:
-            # 1. Build da aplicação
-            if not self.build_application():
-                logger.error("❌ Falha no build - abortando rebuild")
-                return False
+            self.build_id = None
+            self.build_fingerprint.decide()
             
-            # 2. Export estático
-            if not self.export_static_files():
-                logger.error("❌ Falha no export - abortando rebuild")
+            # Build → pacote → publicação, pulando etapas com entradas inalteradas
+            if not self.build_stage_graph().run(force=self.force_stages):
+                logger.error("❌ Falha em uma etapa - abortando rebuild")
                 return False
             
-            # 3. Criar pacote de deployment
-            if not self.create_deployment_package():
-                logger.error("❌ Falha ao criar pacote - abortando rebuild")
+            # Release imutável do build + troca do symlink `current` e do supervisor
+            try:
+                self.releases.deploy(f"{self.app_dir}/.next")
+            except Exception as e:
+                logger.error(f"❌ Falha ao ativar release: {e}")
                 return False
             
-            # 4. Atualizar hash
-            current_hash = self.calculate_file_hash(self.json_file)
-            if current_hash:
-                self.save_hash(current_hash)
-            
-            # 5. Log de sucesso
+            # Log de sucesso
             elapsed_time = time.time() - start_time
             deploy_info = self.get_deployment_info()
             
@@ -289,9 +283,11 @@ class DashboardRebuildSystem:
         
         if self.has_file_changed():
             logger.info("📝 Mudança detectada - iniciando rebuild...")
-            success = self.perform_rebuild()
+            success = self.coordinator.request(self.perform_rebuild, 'auto_rebuild', kind='full')['success']
             
-            if success:
+            if success is None:
+                return None
+            elif success:
                 logger.info("✅ Sistema atualizado com sucesso!")
                 return True
             else:
@@ -304,10 +300,29 @@ class DashboardRebuildSystem:
     def force_rebuild(self):
         """Força um rebuild independente de mudanças"""
         logger.info("🔄 REBUILD FORÇADO INICIADO")
-        return self.perform_rebuild()
+        self.force_stages = True
+        try:
+            return self.coordinator.request(self.perform_rebuild, 'auto_rebuild --force', kind='full', force=True)['success']
+        finally:
+            self.force_stages = False
+
+def coordinated_action(force=False):
+    """Rebuild completo executado pelo coordenador para gatilhos de outros processos"""
+    system = DashboardRebuildSystem()
+    system.force_stages = force
+    return system.perform_rebuild
 
 def main():
     """Função principal"""
+    # Com o daemon rodando, este script é apenas um cliente
+    if len(sys.argv) == 1 or sys.argv[1] == '--force':
+        if len(sys.argv) > 1:
+            delegated = delegate('trigger', 'full', 'auto_rebuild --force', force=True)
+        else:
+            delegated = delegate('check', 'full', 'auto_rebuild', wait=False)
+        if delegated is not None:
+            sys.exit(0 if delegated else 1)
+    
     system = DashboardRebuildSystem()
     
     # Verificar argumentos
@@ -322,6 +337,9 @@ def main():
                 logger.info(f"📦 Deploy atual: {deploy_info['size_mb']} MB, modificado em {deploy_info['modified']}")
             else:
                 logger.info("❌ Nenhum deploy encontrado")
+            decision = system.build_fingerprint.decide()
+            logger.info(f"🧬 Último build completo: {decision['built_at'] or 'N/A'} - próximo rebuild: {decision['mode']} ({decision['reason']})")
+            system.coordinator.log_status()
             success = True
         else:
             logger.error(f"Argumento inválido: {sys.argv[1]}")
@@ -331,7 +349,10 @@ def main():
         logger.info("Modo: Monitoramento automático")
         success = system.monitor_and_rebuild()
     
-    if success:
+    if success is None:
+        logger.info("⏳ Outro rebuild em andamento - gatilho na fila, será executado ao fim dele")
+        sys.exit(0)
+    elif success:
         logger.info("🎉 Operação concluída com sucesso!")
         sys.exit(0)
     else:
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Repositório de Backups Deduplicado
+Guarda backups fora de public/ (em .backups/): o conteúdo é cortado em blocos
+definidos pelo próprio conteúdo (uma edição pequena muda só os blocos ao redor),
+cada bloco é identificado pelo hash, comprimido e gravado uma única vez. Um
+catálogo registra cada backup (horário, motivo, origem, blocos) e uma política
+de retenção por hora/dia/semana remove os antigos
+"""
+
+import os
+import re
+import sys
+import json
+import zlib
+import random
+import hashlib
+import logging
+from datetime import datetime
+
+from change_detection import DIGEST_SIZE
+from data_publisher import dashboard_lock, publish_file, write_json_atomic
+from precompress import write_bytes_atomic
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
+DASHBOARD_FILE = f"{PROJECT_ROOT}/app/public/dashboard_data.json"
+BACKUP_DIR = f"{PROJECT_ROOT}/.backups"
+CATALOG_FILE_NAME = "catalog.json"
+CHUNKS_DIR_NAME = "chunks"
+COMPRESSION_LEVEL = 9
+# Blocos por conteúdo (gear hash): mínimo, média (~2^13) e máximo
+MIN_CHUNK = 2 * 1024
+AVERAGE_CHUNK_BITS = 13
+MAX_CHUNK = 64 * 1024
+# Acima disso (ex: pacotes .tgz, que já são comprimidos) o corte é fixo
+CONTENT_DEFINED_LIMIT = 16 * 1024 * 1024
+FIXED_CHUNK = 1024 * 1024
+# Mantém os N backups mais recentes e o mais recente de cada uma das últimas
+# N horas/dias/semanas (por arquivo de origem)
+DEFAULT_RETENTION = {'last': 10, 'hourly': 24, 'daily': 7, 'weekly': 4}
+LEGACY_PATTERN = re.compile(r'^dashboard_data_backup(?:_(?P<reason>.*?))?(?:_(?P<ts>\d{8}_\d{6}))?\.json$')
+
+_GEAR_RANDOM = random.Random(0x6765617)
+_GEAR = [_GEAR_RANDOM.getrandbits(32) for _ in range(256)]
+_MASK = ((1 << AVERAGE_CHUNK_BITS) - 1) << (32 - AVERAGE_CHUNK_BITS)
+
+
+def split_chunks(data):
+    """Corta `data` em blocos; fronteiras dependem dos bytes, não da posição"""
+    if len(data) > CONTENT_DEFINED_LIMIT:
+        return [data[start:start + FIXED_CHUNK] for start in range(0, len(data), FIXED_CHUNK)]
+
+    chunks = []
+    start = 0
+    length = len(data)
+    while start < length:
+        end = min(start + MAX_CHUNK, length)
+        position = start + MIN_CHUNK
+        if position >= end:
+            position = end
+        fingerprint = 0
+        while position < end:
+            fingerprint = ((fingerprint << 1) + _GEAR[data[position]]) & 0xFFFFFFFF
+            position += 1
+            if not fingerprint & _MASK:
+                break
+        chunks.append(data[start:position])
+        start = position
+    return chunks
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).hexdigest()
+
+
+def _bucket(created_at, period):
+    moment = datetime.fromisoformat(created_at)
+    if period == 'hourly':
+        return moment.strftime('%Y-%m-%dT%H')
+    if period == 'daily':
+        return moment.strftime('%Y-%m-%d')
+    year, week, _ = moment.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def select_retained(backups, policy):
+    """Ids mantidos: os últimos N e o mais recente de cada período, por origem"""
+    keep = set()
+    by_name = {}
+    for entry in backups:
+        by_name.setdefault(entry['name'], []).append(entry)
+    for entries in by_name.values():
+        entries.sort(key=lambda entry: entry['created_at'], reverse=True)
+        keep.update(entry['id'] for entry in entries[:max(policy.get('last', 0), 1)])
+        for period, count in policy.items():
+            if period == 'last':
+                continue
+            seen = set()
+            for entry in entries:
+                bucket = _bucket(entry['created_at'], period)
+                if bucket in seen:
+                    continue
+                seen.add(bucket)
+                if len(seen) > count:
+                    break
+                keep.add(entry['id'])
+    return keep
+
+
+class BackupStore:
+    """Catálogo + blocos comprimidos endereçados por conteúdo"""
+
+    def __init__(self, root=BACKUP_DIR):
+        self.root = root
+        self.catalog_file = os.path.join(root, CATALOG_FILE_NAME)
+        self.chunks_dir = os.path.join(root, CHUNKS_DIR_NAME)
+
+    def _chunk_path(self, digest):
+        return os.path.join(self.chunks_dir, digest[:2], digest)
+
+    def load_catalog(self):
+        try:
+            with open(self.catalog_file, 'r', encoding='utf-8') as f:
+                catalog = json.load(f)
+        except (OSError, ValueError):
+            catalog = {}
+        catalog.setdefault('retention', dict(DEFAULT_RETENTION))
+        catalog.setdefault('backups', [])
+        return catalog
+
+    def _save_catalog(self, catalog):
+        write_json_atomic(self.catalog_file, catalog)
+
+    def _store_chunk(self, chunk):
+        """Grava o bloco se ainda não existe; retorna (hash, bytes gravados)"""
+        digest = _digest(chunk)
+        path = self._chunk_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compressed = zlib.compress(chunk, COMPRESSION_LEVEL)
+        write_bytes_atomic(path, compressed)
+        return digest, len(compressed)
+
+    def backup_bytes(self, data, name, reason, source=None, created_at=None):
+        """Registra `data` como backup de `name`; blocos já guardados não são regravados"""
+        os.makedirs(self.root, exist_ok=True)
+        with dashboard_lock(self.catalog_file):
+            # Blocos antes do catálogo: uma entrada nunca cita bloco ausente
+            chunks = []
+            stored = 0
+            for chunk in split_chunks(data):
+                digest, written = self._store_chunk(chunk)
+                chunks.append(digest)
+                stored += written
+
+            content_hash = _digest(data)
+            created_at = created_at or datetime.now().isoformat(timespec='seconds')
+            entry = {
+                'id': f"{created_at.replace('-', '').replace(':', '').replace('T', '_')}_{content_hash[:8]}",
+                'created_at': created_at,
+                'name': name,
+                'reason': reason,
+                'source': source,
+                'bytes': len(data),
+                'stored_bytes': stored,
+                'hash': content_hash,
+                'chunks': chunks
+            }
+            catalog = self.load_catalog()
+            catalog['backups'] = [item for item in catalog['backups'] if item['id'] != entry['id']]
+            catalog['backups'].append(entry)
+            removed = self._apply_retention(catalog)
+            self._save_catalog(catalog)
+            if removed:
+                self._collect_garbage(catalog)
+
+        logger.info(
+            f"💾 Backup {entry['id']} ({reason}): {len(data)} bytes, {len(chunks)} bloco(s), "
+            f"{stored} bytes novos"
+        )
+        return entry
+
+    def backup_file(self, path, reason):
+        with open(path, 'rb') as f:
+            data = f.read()
+        return self.backup_bytes(data, os.path.basename(path), reason, source=os.path.abspath(path))
+
+    def get(self, backup_id):
+        for entry in self.load_catalog()['backups']:
+            if entry['id'] == backup_id:
+                return entry
+        raise KeyError(f"Backup não encontrado: {backup_id}")
+
+    def read(self, backup_id):
+        """Conteúdo original do backup (verificado pelo hash)"""
+        entry = self.get(backup_id)
+        parts = []
+        for digest in entry['chunks']:
+            with open(self._chunk_path(digest), 'rb') as f:
+                parts.append(zlib.decompress(f.read()))
+        data = b''.join(parts)
+        if _digest(data) != entry['hash']:
+            raise ValueError(f"Backup {backup_id} corrompido (hash diferente)")
+        return data
+
+    def restore(self, backup_id, destination=None):
+        """Restaura no destino (padrão: arquivo de origem); o dashboard é republicado sob lock"""
+        entry = self.get(backup_id)
+        destination = destination or entry['source']
+        data = self.read(backup_id)
+        if os.path.abspath(destination) == os.path.abspath(DASHBOARD_FILE):
+            tmp_path = os.path.join(self.root, f".restore.{os.getpid()}.tmp")
+            try:
+                write_bytes_atomic(tmp_path, data)
+                publish_file(tmp_path, destination)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        else:
+            write_bytes_atomic(destination, data)
+        logger.info(f"♻️ Backup {backup_id} restaurado em {destination}")
+        return destination
+
+    def _apply_retention(self, catalog):
+        keep = select_retained(catalog['backups'], catalog['retention'])
+        removed = [entry for entry in catalog['backups'] if entry['id'] not in keep]
+        catalog['backups'] = [entry for entry in catalog['backups'] if entry['id'] in keep]
+        for entry in removed:
+            logger.info(f"🧹 Backup expirado: {entry['id']} ({entry['reason']})")
+        return removed
+
+    def _collect_garbage(self, catalog):
+        """Apaga blocos que nenhum backup do catálogo cita"""
+        referenced = {digest for entry in catalog['backups'] for digest in entry['chunks']}
+        freed = 0
+        if not os.path.isdir(self.chunks_dir):
+            return freed
+        for prefix in os.listdir(self.chunks_dir):
+            directory = os.path.join(self.chunks_dir, prefix)
+            for name in os.listdir(directory):
+                if name in referenced or name.endswith('.tmp'):
+                    continue
+                path = os.path.join(directory, name)
+                freed += os.path.getsize(path)
+                os.remove(path)
+        return freed
+
+    def apply_retention(self, policy=None):
+        """Aplica (e opcionalmente redefine) a política; retorna os backups removidos"""
+        os.makedirs(self.root, exist_ok=True)
+        with dashboard_lock(self.catalog_file):
+            catalog = self.load_catalog()
+            if policy:
+                catalog['retention'] = {**catalog['retention'], **policy}
+            removed = self._apply_retention(catalog)
+            self._save_catalog(catalog)
+            freed = self._collect_garbage(catalog)
+        logger.info(f"🧹 Retenção aplicada: {len(removed)} backup(s) removido(s), {freed} bytes liberados")
+        return removed
+
+    def stats(self):
+        catalog = self.load_catalog()
+        chunk_files = 0
+        stored = 0
+        if os.path.isdir(self.chunks_dir):
+            for prefix in os.listdir(self.chunks_dir):
+                for name in os.listdir(os.path.join(self.chunks_dir, prefix)):
+                    chunk_files += 1
+                    stored += os.path.getsize(os.path.join(self.chunks_dir, prefix, name))
+        logical = sum(entry['bytes'] for entry in catalog['backups'])
+        return {
+            'backups': len(catalog['backups']),
+            'retention': catalog['retention'],
+            'logical_bytes': logical,
+            'stored_bytes': stored,
+            'chunks': chunk_files,
+            'ratio': round(logical / stored, 2) if stored else None
+        }
+
+    def import_legacy(self, directory):
+        """Move para o repositório os backups antigos de public/ (dashboard_data_backup*.json)"""
+        imported = []
+        for name in sorted(os.listdir(directory)):
+            match = LEGACY_PATTERN.match(name)
+            if not match:
+                continue
+            path = os.path.join(directory, name)
+            if match.group('ts'):
+                created_at = datetime.strptime(match.group('ts'), '%Y%m%d_%H%M%S').isoformat()
+            else:
+                created_at = datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec='seconds')
+            with open(path, 'rb') as f:
+                data = f.read()
+            entry = self.backup_bytes(
+                data, os.path.basename(DASHBOARD_FILE), match.group('reason') or 'legacy',
+                source=DASHBOARD_FILE, created_at=created_at
+            )
+            os.remove(path)
+            imported.append(entry['id'])
+        return imported
+
+
+def create_backup(path=DASHBOARD_FILE, reason='manual'):
+    """Atalho usado pelos scripts: backup de um arquivo no repositório padrão"""
+    return BackupStore().backup_file(path, reason)
+
+
+def main():
+    """python3 backup_store.py [--list|--stats|--backup <arquivo> [motivo]|--restore <id> [destino]|--prune [periodo=n ...]|--import-legacy]"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = sys.argv[1:]
+    store = BackupStore()
+
+    if args == ['--list']:
+        for entry in sorted(store.load_catalog()['backups'], key=lambda entry: entry['created_at']):
+            print(f"{entry['id']}  {entry['name']:<24} {entry['reason']:<20} {entry['bytes']:>10} bytes")
+        success = True
+    elif args == ['--stats']:
+        print(json.dumps(store.stats(), indent=2))
+        success = True
+    elif args and args[0] == '--backup' and len(args) in (2, 3):
+        entry = store.backup_file(args[1], args[2] if len(args) == 3 else 'manual')
+        print(entry['id'])
+        success = True
+    elif args and args[0] == '--restore' and len(args) in (2, 3):
+        store.restore(args[1], args[2] if len(args) == 3 else None)
+        success = True
+    elif args and args[0] == '--prune':
+        policy = {}
+        for option in args[1:]:
+            period, _, count = option.partition('=')
+            if period not in DEFAULT_RETENTION or not count.isdigit():
+                print(f"Período inválido: {option} (use last=N, hourly=N, daily=N, weekly=N)")
+                sys.exit(1)
+            policy[period] = int(count)
+        store.apply_retention(policy)
+        success = True
+    elif args == ['--import-legacy']:
+        imported = store.import_legacy(os.path.dirname(DASHBOARD_FILE))
+        print(f"{len(imported)} backup(s) movido(s) de public/ para {store.root}")
+        success = True
+    else:
+        print("Uso: python3 backup_store.py [--list|--stats|--backup <arquivo> [motivo]|--restore <id> [destino]|"
+              "--prune [last=N hourly=N daily=N weekly=N]|--import-legacy]")
+        success = False
+
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Fingerprint do Código-Fonte do Build
+Decide entre o caminho só-dados (copiar o JSON) e o build completo, e limpa
+o diretório de build preservando o cache incremental do Next.js (.next/cache)
+"""
+
+import os
+import json
+import logging
+from datetime import datetime
+
+from change_detection import fingerprint_paths
+from artifact_ops import purge_trash, remove_tree
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
+APP_DIR = f"{PROJECT_ROOT}/app"
+BUILD_STATE_FILE = f"{PROJECT_ROOT}/.build_fingerprint.json"
+
+# Entradas de código do build (dados em public/ são lidos em tempo de execução)
+CODE_INPUTS = (
+    'app', 'components', 'lib', 'hooks', 'package-lock.json',
+    'next.config.js', 'tailwind.config.ts', 'postcss.config.js', 'tsconfig.json'
+)
+PRESERVED_BUILD_ENTRIES = ('cache',)
+
+
+def code_input_paths(app_dir=APP_DIR):
+    """Caminhos absolutos das entradas de código"""
+    return [os.path.join(app_dir, path) for path in CODE_INPUTS]
+
+
+def clean_build_dir(build_dir, preserve=PRESERVED_BUILD_ENTRIES):
+    """Remove o build anterior mantendo o cache do compilador"""
+    if not os.path.isdir(build_dir):
+        return
+    purge_trash()
+    for entry in os.listdir(build_dir):
+        if entry in preserve:
+            continue
+        # Diretórios saem por rename (instantâneo) e são apagados em segundo plano
+        remove_tree(os.path.join(build_dir, entry))
+    logger.info(f"Build anterior limpo (preservado: {', '.join(preserve)})")
+
+
+class BuildFingerprint:
+    """Compara o código atual com o último build bem-sucedido"""
+
+    def __init__(self, app_dir=APP_DIR, state_file=BUILD_STATE_FILE, build_dir=None):
+        self.app_dir = app_dir
+        self.state_file = state_file
+        self.build_dir = build_dir or os.path.join(app_dir, '.next')
+
+    def current(self):
+        """Fingerprint das entradas de código"""
+        fingerprint, _ = fingerprint_paths(code_input_paths(self.app_dir), relative_to=self.app_dir)
+        return fingerprint
+
+    def load_state(self):
+        try:
+            if os.path.exists(self.state_file):
+                with open(self.state_file, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.error(f"Erro ao ler fingerprint do build: {e}")
+        return {}
+
+    def record_build(self, fingerprint=None):
+        """Registra o fingerprint do código após um build bem-sucedido"""
+        state = {
+            'fingerprint': fingerprint or self.current(),
+            'built_at': datetime.now().isoformat()
+        }
+        try:
+            tmp_file = f"{self.state_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_file, self.state_file)
+        except Exception as e:
+            logger.error(f"Erro ao salvar fingerprint do build: {e}")
+        return state
+
+    def decide(self):
+        """Retorna {'mode': 'data-only'|'full', 'reason', 'current', 'last'}"""
+        current = self.current()
+        state = self.load_state()
+        last = state.get('fingerprint')
+
+        if not os.path.isdir(self.build_dir):
+            mode, reason = 'full', 'build inexistente'
+        elif last is None:
+            mode, reason = 'full', 'sem fingerprint do último build'
+        elif last != current:
+            mode, reason = 'full', 'código alterado'
+        else:
+            mode, reason = 'data-only', 'código inalterado'
+
+        decision = {
+            'mode': mode,
+            'reason': reason,
+            'current': current,
+            'last': last,
+            'built_at': state.get('built_at')
+        }
+        logger.info(
+            f"🧬 Fingerprint do código: {current[:12]} (último build: {(last or 'N/A')[:12]}) "
+            f"→ modo {mode} ({reason})"
+        )
+        return decision
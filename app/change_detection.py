@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Detecção de Mudanças em Arquivos
+Hash de conteúdo com cache por fingerprint de stat (inode, tamanho, mtime_ns),
+compartilhado por todos os scripts de rebuild
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
+FINGERPRINT_FILE = f"{PROJECT_ROOT}/.file_fingerprints.json"
+CHUNK_SIZE = 1024 * 1024
+DIGEST_SIZE = 16
+
+# Arquivos modificados há menos que isso podem receber nova escrita com o
+# mesmo mtime (granularidade do sistema de arquivos): não confiar no cache
+RACY_WINDOW_NS = 2 * 1_000_000_000
+
+
+def stat_fingerprint(file_path):
+    """Retorna (inode, tamanho, mtime_ns) do arquivo ou None se não existir"""
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+
+def hash_file_contents(file_path):
+    """Calcula o digest BLAKE2b lendo o arquivo em blocos de tamanho fixo"""
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(file_path, 'rb', buffering=0) as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            digest.update(view[:size])
+    return digest.hexdigest()
+
+
+class ChangeDetector:
+    """Hash de arquivos que só relê o conteúdo quando o stat muda"""
+
+    def __init__(self, fingerprint_file=FINGERPRINT_FILE):
+        self.fingerprint_file = fingerprint_file
+        self._cache = None
+        self._cache_stat = None
+
+    def _load_fingerprints(self):
+        # Recarregar apenas se outro processo atualizou o arquivo de fingerprints
+        current_stat = stat_fingerprint(self.fingerprint_file)
+        if self._cache is not None and current_stat == self._cache_stat:
+            return self._cache
+
+        self._cache = {}
+        self._cache_stat = current_stat
+        if current_stat is None:
+            return self._cache
+        try:
+            with open(self.fingerprint_file, 'r') as f:
+                self._cache = json.load(f)
+        except Exception as e:
+            logger.warning(f"Fingerprints ilegíveis, recalculando hashes: {e}")
+        return self._cache
+
+    def _save_fingerprints(self):
+        tmp_file = f"{self.fingerprint_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump(self._cache, f, indent=2)
+            os.replace(tmp_file, self.fingerprint_file)
+            self._cache_stat = stat_fingerprint(self.fingerprint_file)
+        except Exception as e:
+            logger.error(f"Erro ao salvar fingerprints: {e}")
+            try:
+                os.remove(tmp_file)
+            except OSError:
+                pass
+
+    def _hash_with_cache(self, file_path, cache):
+        """Retorna (hash, cache_alterado) para um arquivo existente"""
+        fingerprint = stat_fingerprint(file_path)
+        if fingerprint is None:
+            raise FileNotFoundError(file_path)
+
+        entry = cache.get(file_path)
+        if entry and entry.get('stat') == fingerprint:
+            return entry['hash'], False
+
+        content_hash = hash_file_contents(file_path)
+
+        # Só persistir quando o mtime estiver fora da janela de escrita concorrente
+        if time.time_ns() - fingerprint[2] > RACY_WINDOW_NS:
+            cache[file_path] = {'stat': fingerprint, 'hash': content_hash}
+            return content_hash, True
+        return content_hash, False
+
+    def file_hash(self, file_path):
+        """Retorna o hash do conteúdo, usando o cache quando o stat não mudou"""
+        file_path = os.path.abspath(file_path)
+        try:
+            content_hash, dirty = self._hash_with_cache(file_path, self._load_fingerprints())
+            if dirty:
+                self._save_fingerprints()
+            return content_hash
+        except FileNotFoundError:
+            logger.warning(f"Arquivo não encontrado: {file_path}")
+            return None
+        except Exception as e:
+            logger.error(f"Erro ao calcular hash: {e}")
+            return None
+
+    def file_hashes(self, file_paths, prune_root=None):
+        """Hash de vários arquivos gravando os fingerprints uma única vez
+
+        Com prune_root, entradas sob esse diretório que não fazem parte
+        do lote (arquivos apagados) são descartadas do cache.
+        """
+        cache = self._load_fingerprints()
+        hashes = {}
+        dirty = False
+        for file_path in file_paths:
+            file_path = os.path.abspath(file_path)
+            try:
+                hashes[file_path], changed = self._hash_with_cache(file_path, cache)
+                dirty = dirty or changed
+            except FileNotFoundError:
+                continue
+        if prune_root:
+            prefix = os.path.join(os.path.abspath(prune_root), '')
+            for stale in [p for p in cache if p.startswith(prefix) and p not in hashes]:
+                del cache[stale]
+                dirty = True
+        if dirty:
+            self._save_fingerprints()
+        return hashes
+
+
+_default_detector = None
+
+
+def calculate_file_hash(file_path):
+    """Hash do arquivo usando o detector compartilhado do processo"""
+    global _default_detector
+    if _default_detector is None:
+        _default_detector = ChangeDetector()
+    return _default_detector.file_hash(file_path)
+
+
+def list_tree_files(paths, exclude_dirs=()):
+    """Expande arquivos e diretórios em uma lista ordenada de arquivos"""
+    exclude_dirs = set(exclude_dirs)
+    files = []
+    for path in paths:
+        if os.path.isfile(path):
+            files.append(os.path.abspath(path))
+            continue
+        for root, dirs, names in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d not in exclude_dirs)
+            for name in sorted(names):
+                file_path = os.path.join(root, name)
+                if os.path.isfile(file_path) and not os.path.islink(file_path):
+                    files.append(os.path.abspath(file_path))
+    return files
+
+
+def fingerprint_paths(paths, detector=None, exclude_dirs=(), relative_to=None):
+    """Digest único de um conjunto de arquivos/diretórios (nomes + conteúdos)
+
+    Retorna (digest, quantidade_de_arquivos). Caminhos inexistentes entram
+    no digest como ausentes, então criar ou apagar um arquivo muda o resultado.
+    """
+    detector = detector or ChangeDetector()
+    files = list_tree_files(paths, exclude_dirs)
+    hashes = detector.file_hashes(files)
+
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for path in paths:
+        if not os.path.exists(path):
+            digest.update(f"ausente:{path}\n".encode('utf-8'))
+    for file_path in files:
+        name = os.path.relpath(file_path, relative_to) if relative_to else file_path
+        digest.update(f"{name}\0{hashes.get(file_path)}\n".encode('utf-8'))
+    return digest.hexdigest(), len(files)
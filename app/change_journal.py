@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Diário de Alterações do Dashboard
+Consulta o diário append-only gravado pelo dashboard_store.py (uma entrada por
+campo alterado: registro, campo, valor antigo/novo, script, horário).
+Reconstrói o dashboard_data.json de qualquer instante a partir do snapshot
+mais próximo e responde "o que mudou entre T1 e T2" sem comparar arquivos
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import tempfile
+from datetime import datetime, timedelta
+
+from dashboard_store import DashboardStore, build_document, decode_snapshot, empty_state
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+BENCHMARK_RECORDS = 2_000
+BENCHMARK_DAYS = 365
+# Execuções por dia (monitoramento a cada 30 min) e campos alterados por execução
+BENCHMARK_RUNS_PER_DAY = 48
+BENCHMARK_CHANGES_PER_RUN = 2
+BENCHMARK_REPEAT = 20
+
+
+def journal_id_at(store, when):
+    """Última entrada do diário registrada até `when` (texto ISO; 0 se nenhuma)"""
+    row = store.execute('SELECT MAX(id) FROM dashboard_journal WHERE registrado_em <= ?', (when,)).fetchone()
+    return row[0] or 0
+
+
+def apply_entry(state, tabela, operacao, registro_id, campo, valor_novo):
+    """Aplica uma entrada do diário ao estado (formato de DashboardStore.current_state)"""
+    if tabela == 'dashboard_meta':
+        state['document'] = json.loads(valor_novo) or {}
+        return
+    rows = state[tabela]
+    key = str(registro_id)
+    if operacao == 'insert':
+        rows[key] = json.loads(valor_novo)
+    elif operacao == 'delete':
+        rows.pop(key, None)
+    elif key in rows:
+        rows[key][campo] = json.loads(valor_novo)
+
+
+def state_at(store, journal_id):
+    """Estado das tabelas logo após a entrada `journal_id`: snapshot + replay"""
+    row = store.execute(
+        'SELECT journal_id, conteudo FROM dashboard_snapshots WHERE journal_id <= ? '
+        'ORDER BY journal_id DESC LIMIT 1',
+        (journal_id,)
+    ).fetchone()
+    start_id, state = (row[0], decode_snapshot(row[1])) if row else (0, empty_state())
+    for entry in store.execute(
+        'SELECT tabela, operacao, registro_id, campo, valor_novo FROM dashboard_journal '
+        'WHERE id > ? AND id <= ? ORDER BY id',
+        (start_id, journal_id)
+    ):
+        apply_entry(state, *entry)
+    return state
+
+
+def reconstruct(store, when):
+    """dashboard_data.json como estava em `when`"""
+    return build_document(state_at(store, journal_id_at(store, when)))
+
+
+def changes_between(store, start, end):
+    """Alterações líquidas entre `start` (exclusive) e `end` (inclusive)
+
+    Cada registro aparece uma vez: inserido, removido ou com os campos cujo
+    valor final difere do inicial. Registros criados e removidos no intervalo
+    (ou alterados e revertidos) não aparecem.
+    """
+    records = {}
+    for tabela, operacao, registro_id, rotulo, campo, antigo, novo in store.execute(
+        'SELECT tabela, operacao, registro_id, rotulo, campo, valor_antigo, valor_novo FROM dashboard_journal '
+        'WHERE registrado_em > ? AND registrado_em <= ? ORDER BY id',
+        (start, end)
+    ):
+        record = records.setdefault((tabela, registro_id), {
+            'tabela': tabela, 'registro_id': registro_id, 'rotulo': rotulo,
+            'inserted': False, 'deleted': False, 'fields': {}, 'values': None
+        })
+        record['rotulo'] = rotulo or record['rotulo']
+        if operacao == 'insert':
+            record['inserted'] = True
+            record['deleted'] = False
+            record['values'] = json.loads(novo)
+        elif operacao == 'delete':
+            record['deleted'] = True
+            old_values = json.loads(antigo)
+            # Valores do início do intervalo, não os de logo antes da remoção
+            for field, (first, _) in record['fields'].items():
+                old_values[field] = first
+            record['values'] = old_values
+        else:
+            first = record['fields'].get(campo, (json.loads(antigo), None))[0]
+            record['fields'][campo] = (first, json.loads(novo))
+            if record['inserted']:
+                record['values'][campo] = json.loads(novo)
+
+    changes = []
+    for record in records.values():
+        change = {'tabela': record['tabela'], 'registro_id': record['registro_id'], 'rotulo': record['rotulo']}
+        if record['inserted'] and record['deleted']:
+            continue
+        if record['inserted']:
+            changes.append({**change, 'operacao': 'insert', 'depois': record['values']})
+        elif record['deleted']:
+            changes.append({**change, 'operacao': 'delete', 'antes': record['values']})
+        else:
+            fields = {
+                field: {'antes': first, 'depois': last}
+                for field, (first, last) in record['fields'].items() if first != last
+            }
+            if fields:
+                changes.append({**change, 'operacao': 'update', 'campos': fields})
+    return changes
+
+
+def history(store, limit=20):
+    """Últimas entradas do diário, mais recentes primeiro"""
+    columns = ('id', 'registrado_em', 'script', 'tabela', 'operacao', 'registro_id', 'rotulo', 'campo',
+               'valor_antigo', 'valor_novo')
+    rows = store.execute(
+        f"SELECT {', '.join(columns)} FROM dashboard_journal ORDER BY id DESC LIMIT ?", (limit,)
+    ).fetchall()
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def _synthetic_document(size, rng):
+    categories = ['Iluminação Pública', 'Sinalização e Trânsito', 'Pavimentação e Vias', 'Prédios Públicos']
+    details = {category: {'sheet_name': category, 'total_indicacoes': 0, 'indicacoes': []} for category in categories}
+    for number in range(1, size + 1):
+        details[rng.choice(categories)]['indicacoes'].append({
+            'numero': f"IND {number}/2025",
+            'descricao': f"Solicita reparo na Rua {rng.randint(1, 500)}",
+            'rua': f"Rua {rng.randint(1, 500)}",
+            'pdfUrl': f"https://sapl.camarabento.rs.gov.br/documento/download/{30000 + number}"
+        })
+    return {'metadata': {'title': 'benchmark'}, 'chart_data': [], 'details': details}
+
+
+def run_benchmark(records=BENCHMARK_RECORDS, days=BENCHMARK_DAYS, runs_per_day=BENCHMARK_RUNS_PER_DAY,
+                  changes_per_run=BENCHMARK_CHANGES_PER_RUN, repeat=BENCHMARK_REPEAT):
+    """Um ano sintético de alterações: tempo de reconstrução e de diff"""
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = DashboardStore('', os.path.join(tmp_dir, 'dashboard.db'), script='benchmark')
+        store.connect().execute('PRAGMA synchronous=OFF')
+        start = datetime(2025, 1, 1)
+        store.journal_time = start.isoformat(timespec='microseconds')
+        store.import_document(_synthetic_document(records, rng))
+        store.commit()
+
+        ids = [row[0] for row in store.execute('SELECT id FROM indicacoes')]
+        start_time = time.perf_counter()
+        for run in range(days * runs_per_day):
+            moment = start + timedelta(minutes=30 * (run + 1))
+            store.journal_time = moment.isoformat(timespec='microseconds')
+            for _ in range(changes_per_run):
+                store.update_indicacao(
+                    rng.choice(ids),
+                    pdf_url=f"https://sapl.camarabento.rs.gov.br/documento/download/{rng.randint(1, 99999)}"
+                )
+            store.maybe_snapshot()
+            store.commit()
+        write_seconds = time.perf_counter() - start_time
+        entries = store.execute('SELECT COUNT(*) FROM dashboard_journal').fetchone()[0]
+        end = start + timedelta(days=days)
+
+        def measure(function):
+            timings = []
+            for _ in range(repeat):
+                moment = start + timedelta(seconds=rng.randint(0, days * 86400))
+                begin = time.perf_counter()
+                function(moment)
+                timings.append((time.perf_counter() - begin) * 1000)
+            timings.sort()
+            return round(timings[len(timings) // 2], 2), round(timings[-1], 2)
+
+        reconstruct_p50, reconstruct_max = measure(lambda moment: reconstruct(store, moment.isoformat()))
+        begin = time.perf_counter()
+        year_changes = changes_between(store, start.isoformat(), end.isoformat())
+        year_diff_ms = round((time.perf_counter() - begin) * 1000, 2)
+        day_p50, day_max = measure(lambda moment: changes_between(
+            store, moment.isoformat(), (moment + timedelta(days=1)).isoformat()
+        ))
+        store.close()
+
+    return {
+        'records': records,
+        'journal_entries': entries,
+        'write_ms_per_run': round(write_seconds * 1000 / (days * runs_per_day), 3),
+        'reconstruct_p50_ms': reconstruct_p50,
+        'reconstruct_max_ms': reconstruct_max,
+        'diff_year_ms': year_diff_ms,
+        'diff_year_records': len(year_changes),
+        'diff_day_p50_ms': day_p50,
+        'diff_day_max_ms': day_max
+    }
+
+
+def main():
+    """python3 change_journal.py [--at <T> [arquivo]|--diff <T1> <T2>|--log [n]|--snapshot|--benchmark]"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = sys.argv[1:]
+    store = DashboardStore()
+    try:
+        if args and args[0] == '--at' and len(args) in (2, 3):
+            document = reconstruct(store, args[1])
+            if len(args) == 3:
+                with open(args[2], 'w', encoding='utf-8') as f:
+                    json.dump(document, f, indent=2, ensure_ascii=False)
+                print(f"Versão de {args[1]} gravada em {args[2]}")
+            else:
+                print(json.dumps(document, indent=2, ensure_ascii=False))
+            success = True
+        elif args and args[0] == '--diff' and len(args) == 3:
+            print(json.dumps(changes_between(store, args[1], args[2]), indent=2, ensure_ascii=False))
+            success = True
+        elif args and args[0] == '--log' and len(args) <= 2:
+            print(json.dumps(history(store, int(args[1]) if len(args) == 2 else 20), indent=2, ensure_ascii=False))
+            success = True
+        elif args == ['--snapshot']:
+            journal_id = store.snapshot()
+            store.commit()
+            print(f"Snapshot gravado na entrada {journal_id}" if journal_id else "Diário vazio")
+            success = True
+        elif args == ['--benchmark']:
+            print(json.dumps(run_benchmark(), indent=2))
+            success = True
+        else:
+            print("Uso: python3 change_journal.py [--at <T> [arquivo]|--diff <T1> <T2>|--log [n]|--snapshot|--benchmark]")
+            success = False
+    finally:
+        store.close()
+
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,15 +4,18 @@
 import React, { useState, useEffect, useMemo } from 'react';
 import { motion } from 'framer-motion';
 import { Search, X, AlertCircle } from 'lucide-react';
-import { DashboardData, ChartDataItem, IndicacaoData, CategoryData } from '@/lib/data';
+import { DashboardSummary, ChartDataItem, IndicacaoData, CategoryData } from '@/lib/data';
 import { useDashboardData } from '@/hooks/use-dashboard-data';
+import { useCategoryShards } from '@/hooks/use-category-shards';
+import { useSearchIndex } from '@/hooks/use-search-index';
+import { countMatches, foldText, matchedPositions, searchRecords } from '@/lib/search-index';
 import { toast } from 'sonner';
 import DashboardHeader from './dashboard-header';
 import InteractiveChart from './interactive-chart';
 import DetailsPanel from './details-panel';
 
 interface DashboardClientProps {
-  initialData: DashboardData;
+  initialData: DashboardSummary;
 }
 
 export default function DashboardClient({ initialData }: DashboardClientProps) {
@@ -22,6 +25,23 @@ export default function DashboardClient({ initialData }: DashboardClientProps) {
   // Use dynamic data hook
   const { data, loading, error, lastFetch, refetch } = useDashboardData(initialData);
 
+  // Searches run on the published index; counts per category come from it alone
+  const searching = searchTerm.trim() !== '';
+  const { index: searchIndex, loading: indexLoading, unavailable: indexUnavailable } = useSearchIndex(data, searching);
+  const matches = useMemo(
+    () => (searching && searchIndex ? searchRecords(searchIndex, searchTerm) : null),
+    [searching, searchIndex, searchTerm]
+  );
+
+  // Details are sharded per category: load the open one (all of them only when searching without an index)
+  const wantedCategories = useMemo(() => {
+    if (searching && indexUnavailable) {
+      return Object.keys(data?.shards || {});
+    }
+    return selectedCategory ? [selectedCategory] : [];
+  }, [data, searching, indexUnavailable, selectedCategory]);
+  const { details, loading: detailsLoading, error: detailsError } = useCategoryShards(data, wantedCategories);
+
   // Show error state if data fails to load
   useEffect(() => {
     if (error) {
@@ -29,6 +49,12 @@ export default function DashboardClient({ initialData }: DashboardClientProps) {
     }
   }, [error]);
 
+  useEffect(() => {
+    if (detailsError) {
+      toast.error(`Erro ao carregar detalhes: ${detailsError}`);
+    }
+  }, [detailsError]);
+
   // Handle data refresh from external sources (like RefreshButton)
   useEffect(() => {
     const handleRefreshData = () => {
@@ -46,36 +72,51 @@ export default function DashboardClient({ initialData }: DashboardClientProps) {
 
   // Filter data based on search term
   const filteredData = useMemo(() => {
-    if (!searchTerm.trim()) {
-      return data;
+    if (!searching) {
+      return data ? { ...data, details } : null;
     }
 
-    const searchLower = searchTerm.toLowerCase().trim();
-    
-    // Filter details by searching in number, description, and location
     const filteredDetails: { [key: string]: CategoryData } = {};
-    const categoryCounts: { [key: string]: number } = {};
-
-    Object.entries(data?.details || {}).forEach(([category, categoryData]) => {
-      const filtered = categoryData?.indicacoes?.filter((indicacao) => {
-        const numero = indicacao?.numero?.toLowerCase() || '';
-        const descricao = indicacao?.descricao?.toLowerCase() || '';
-        const rua = indicacao?.rua?.toLowerCase() || '';
-        
-        return numero.includes(searchLower) || 
-               descricao.includes(searchLower) || 
-               rua.includes(searchLower);
-      }) || [];
+    let categoryCounts: { [key: string]: number } = {};
 
-      if (filtered.length > 0) {
+    if (searchIndex && matches) {
+      // Indexed search: only the loaded shards are filtered, by matched position
+      categoryCounts = countMatches(searchIndex, matches);
+      Object.entries(details).forEach(([category, categoryData]) => {
+        if (!categoryCounts[category]) return;
+        const positions = matchedPositions(searchIndex, matches, category);
+        const filtered = categoryData?.indicacoes?.filter((_indicacao, position) => positions.has(position)) || [];
         filteredDetails[category] = {
           ...categoryData,
           indicacoes: filtered,
           total_indicacoes: filtered.length
         };
-        categoryCounts[category] = filtered.length;
-      }
-    });
+      });
+    } else {
+      // No index for this version: scan number, description, and location
+      const searchFolded = foldText(searchTerm.trim());
+
+      Object.entries(details).forEach(([category, categoryData]) => {
+        const filtered = categoryData?.indicacoes?.filter((indicacao) => {
+          const numero = foldText(indicacao?.numero || '');
+          const descricao = foldText(indicacao?.descricao || '');
+          const rua = foldText(indicacao?.rua || '');
+          
+          return numero.includes(searchFolded) || 
+                 descricao.includes(searchFolded) || 
+                 rua.includes(searchFolded);
+        }) || [];
+
+        if (filtered.length > 0) {
+          filteredDetails[category] = {
+            ...categoryData,
+            indicacoes: filtered,
+            total_indicacoes: filtered.length
+          };
+          categoryCounts[category] = filtered.length;
+        }
+      });
+    }
 
     // Create filtered chart data
     const filteredChartData: ChartDataItem[] = Object.entries(categoryCounts).map(([categoria, quantidade]) => {
@@ -101,7 +142,7 @@ export default function DashboardClient({ initialData }: DashboardClientProps) {
         total_categorias: totalCategorias
       }
     };
-  }, [data, searchTerm]);
+  }, [data, details, searching, searchIndex, matches, searchTerm]);
 
   const handleCategorySelect = (category: string) => {
     setSelectedCategory(category);
@@ -216,7 +257,9 @@ export default function DashboardClient({ initialData }: DashboardClientProps) {
             {searchTerm && (
               <div className="mt-3 flex items-center justify-between text-sm">
                 <span className="text-gray-300">
-                  {filteredData?.metadata?.total_indicacoes === 0 ? (
+                  {(searching && !matches && (indexLoading || detailsLoading)) ? (
+                    'Buscando...'
+                  ) : filteredData?.metadata?.total_indicacoes === 0 ? (
                     'Nenhum resultado encontrado'
                   ) : (
                     `${filteredData?.metadata?.total_indicacoes || 0} resultado${(filteredData?.metadata?.total_indicacoes || 0) !== 1 ? 's' : ''} encontrado${(filteredData?.metadata?.total_indicacoes || 0) !== 1 ? 's' : ''}`
@@ -255,6 +298,7 @@ export default function DashboardClient({ initialData }: DashboardClientProps) {
           <DetailsPanel
             selectedCategory={selectedCategory}
             categoryData={selectedCategoryData}
+            loading={detailsLoading && !selectedCategoryData}
             onClearSelection={handleClearSelection}
           />
         </motion.div>
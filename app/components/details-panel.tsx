@@ -10,12 +10,15 @@ import IndicationCard from './indication-card';
 interface DetailsPanelProps {
   selectedCategory: string | null;
   categoryData: CategoryData | null;
+  // The category's detail shard is still being fetched
+  loading?: boolean;
   onClearSelection: () => void;
 }
 
 export default function DetailsPanel({ 
   selectedCategory, 
   categoryData, 
+  loading,
   onClearSelection 
 }: DetailsPanelProps) {
   if (!selectedCategory) {
@@ -86,7 +89,11 @@ export default function DetailsPanel({
         </div>
 
         <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
-          {categoryData?.indicacoes?.map?.((indicacao, index) => (
+          {loading ? (
+            <div className="col-span-full flex justify-center py-12">
+              <div className="animate-spin rounded-full h-10 w-10 border-b-2 border-blue-500"></div>
+            </div>
+          ) : categoryData?.indicacoes?.map?.((indicacao, index) => (
             <IndicationCard 
               key={indicacao?.numero || index} 
               indicacao={indicacao} 
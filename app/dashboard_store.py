@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+Banco Relacional das Indicações
+Fonte de verdade das indicações: tabelas normalizadas `categorias` e
+`indicacoes` (índices em (ano, numero), documento_id e categoria) em SQLite
+local, ou no Postgres do datasource do Prisma (DASHBOARD_STORE_URL). Os
+scripts de correção fazem UPDATEs pontuais dentro de uma transação e o
+dashboard_data.json passa a ser uma exportação gerada a partir do banco.
+Cada alteração de linha grava, na mesma transação, uma entrada no diário
+`dashboard_journal` (consultado por change_journal.py)
+"""
+
+import os
+import re
+import sys
+import json
+import zlib
+import sqlite3
+import logging
+from datetime import datetime
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from change_detection import hash_file_contents
+from data_publisher import dashboard_lock, write_json_atomic, write_data_manifest
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
+DASHBOARD_FILE = f"{PROJECT_ROOT}/app/public/dashboard_data.json"
+STORE_DB_FILE = f"{PROJECT_ROOT}/.data/dashboard.db"
+# Vazio = SQLite local; postgresql://... = mesmo banco do `DATABASE_URL` do Prisma
+STORE_URL = os.environ.get('DASHBOARD_STORE_URL', '')
+
+NUMERO_PATTERN = re.compile(r'(\d+)\s*/\s*(\d{4})')
+DOCUMENTO_PATTERNS = (
+    re.compile(r'/materialegislativa/\d{4}/(\d+)/'),
+    re.compile(r'/documento/download/(\d+)'),
+)
+# Campo do JSON → coluna de `indicacoes` (os demais campos vão para `extra`, assim
+# como um destes campos presente com valor null, para distingui-lo de ausente)
+INDICACAO_FIELDS = {'numero': 'identificacao', 'descricao': 'descricao', 'rua': 'rua', 'pdfUrl': 'pdf_url'}
+CATEGORIA_FIELDS = ('sheet_name', 'total_indicacoes', 'indicacoes')
+CATEGORIA_COLUMNS = ('nome', 'sheet_name', 'posicao', 'extra')
+INDICACAO_COLUMNS = ('categoria_id', 'posicao', 'identificacao', 'ano', 'numero', 'descricao', 'rua',
+                     'pdf_url', 'documento_id', 'extra')
+UPDATABLE_COLUMNS = ('identificacao', 'ano', 'numero', 'descricao', 'rua', 'pdf_url', 'documento_id')
+# Um snapshot do estado a cada tantas entradas do diário limita o replay
+SNAPSHOT_INTERVAL = 2000
+
+# Esquema do SQLite (AUTOINCREMENT: ids removidos não são reusados, o diário
+# identifica registros por id); no Postgres as tabelas vêm de `npx prisma db push` (prisma/schema.prisma)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS categorias (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT NOT NULL UNIQUE,
+    sheet_name TEXT,
+    posicao INTEGER NOT NULL,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS indicacoes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    categoria_id INTEGER NOT NULL REFERENCES categorias (id) ON DELETE CASCADE,
+    posicao INTEGER NOT NULL,
+    identificacao TEXT,
+    ano INTEGER,
+    numero INTEGER,
+    descricao TEXT,
+    rua TEXT,
+    pdf_url TEXT,
+    documento_id TEXT,
+    extra TEXT,
+    UNIQUE (categoria_id, posicao)
+);
+CREATE INDEX IF NOT EXISTS indicacoes_ano_numero ON indicacoes (ano, numero);
+CREATE INDEX IF NOT EXISTS indicacoes_documento_id ON indicacoes (documento_id);
+CREATE INDEX IF NOT EXISTS indicacoes_categoria_id ON indicacoes (categoria_id);
+CREATE TABLE IF NOT EXISTS dashboard_meta (
+    chave TEXT PRIMARY KEY,
+    valor TEXT
+);
+CREATE TABLE IF NOT EXISTS dashboard_journal (
+    id INTEGER PRIMARY KEY,
+    registrado_em TEXT NOT NULL,
+    script TEXT,
+    tabela TEXT NOT NULL,
+    operacao TEXT NOT NULL,
+    registro_id INTEGER,
+    rotulo TEXT,
+    campo TEXT,
+    valor_antigo TEXT,
+    valor_novo TEXT
+);
+CREATE INDEX IF NOT EXISTS dashboard_journal_registrado_em ON dashboard_journal (registrado_em);
+CREATE TABLE IF NOT EXISTS dashboard_snapshots (
+    journal_id INTEGER PRIMARY KEY,
+    registrado_em TEXT NOT NULL,
+    conteudo BLOB NOT NULL
+);
+"""
+
+
+def parse_numero(identificacao):
+    """'IND 341/2025' → (2025, 341); (None, None) fora do padrão"""
+    match = NUMERO_PATTERN.search(identificacao or '')
+    if not match:
+        return None, None
+    return int(match.group(2)), int(match.group(1))
+
+
+def documento_id_from_url(url):
+    """Id do SAPL contido no link do PDF (materialegislativa/<ano>/<id>/ ou documento/download/<id>)"""
+    for pattern in DOCUMENTO_PATTERNS:
+        match = pattern.search(url or '')
+        if match:
+            return match.group(1)
+    return None
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False) if value else None
+
+
+def _loads(value, default):
+    return json.loads(value) if value else default
+
+
+def empty_state():
+    """Estado vazio das tabelas: ponto de partida do replay sem snapshot"""
+    return {'document': {}, 'categorias': {}, 'indicacoes': {}}
+
+
+def build_document(state):
+    """Monta o dashboard_data.json a partir do estado das tabelas
+
+    `state` = {'document': metadata/chart_data, 'categorias': {id: linha},
+    'indicacoes': {id: linha}} (ids como texto, como no JSON dos snapshots).
+    Totais de metadata, details e chart_data são recontados.
+    """
+    document = json.loads(json.dumps(state['document']))
+    details = {}
+    indicacoes_por_categoria = {}
+    for categoria_id, row in sorted(state['categorias'].items(), key=lambda item: (item[1]['posicao'], int(item[0]))):
+        indicacoes_por_categoria[int(categoria_id)] = []
+        details[row['nome']] = {'sheet_name': row['sheet_name'], 'total_indicacoes': 0,
+                                'indicacoes': indicacoes_por_categoria[int(categoria_id)],
+                                **_loads(row['extra'], {})}
+
+    for _, row in sorted(state['indicacoes'].items(), key=lambda item: (item[1]['posicao'], int(item[0]))):
+        values = {'numero': row['identificacao'], 'descricao': row['descricao'], 'rua': row['rua'],
+                  'pdfUrl': row['pdf_url']}
+        indicacao = {field: value for field, value in values.items() if value is not None}
+        # Nulls explícitos guardados em `extra` valem só enquanto a coluna seguir vazia
+        for field, value in _loads(row['extra'], {}).items():
+            indicacao.setdefault(field, value)
+        indicacoes_por_categoria[row['categoria_id']].append(indicacao)
+
+    for category_data in details.values():
+        category_data['total_indicacoes'] = len(category_data['indicacoes'])
+    total = sum(category_data['total_indicacoes'] for category_data in details.values())
+    metadata = document.get('metadata')
+    if isinstance(metadata, dict):
+        metadata['total_categorias'] = len(details)
+        metadata['total_indicacoes'] = total
+    for entry in document.get('chart_data', []):
+        if isinstance(entry, dict) and entry.get('categoria') in details:
+            entry['quantidade'] = details[entry['categoria']]['total_indicacoes']
+
+    result = {}
+    for key, value in document.items():
+        result[key] = value
+        if key == 'chart_data':
+            result['details'] = details
+    result.setdefault('details', details)
+    return result
+
+
+def decode_snapshot(conteudo):
+    return json.loads(zlib.decompress(bytes(conteudo)).decode('utf-8'))
+
+
+def _postgres():
+    """psycopg é opcional: só é necessário com DASHBOARD_STORE_URL=postgresql://..."""
+    try:
+        import psycopg
+        return psycopg
+    except ImportError:
+        return None
+
+
+class DashboardStore:
+    """Acesso às tabelas do dashboard (SQLite ou Postgres, mesmas consultas)"""
+
+    def __init__(self, url=None, db_file=STORE_DB_FILE, script=None):
+        self.url = url if url is not None else STORE_URL
+        self.db_file = db_file
+        self.postgres = self.url.startswith(('postgres://', 'postgresql://'))
+        # Autor das entradas do diário (padrão: nome do script em execução)
+        self.script = script or os.path.basename(sys.argv[0] or '') or 'python'
+        # Horário da transação: todas as entradas dela compartilham o mesmo
+        self.journal_time = None
+        self.changes = 0
+        self._conn = None
+
+    def connect(self):
+        if self._conn is not None:
+            return self._conn
+        if self.postgres:
+            psycopg = _postgres()
+            if psycopg is None:
+                raise RuntimeError("DASHBOARD_STORE_URL aponta para Postgres, mas o psycopg não está instalado")
+            # `?schema=` é opção do Prisma; no psycopg vira search_path
+            parts = urlsplit(self.url)
+            query = dict(parse_qsl(parts.query))
+            schema = query.pop('schema', None)
+            self._conn = psycopg.connect(urlunsplit(parts._replace(query=urlencode(query))))
+            if schema:
+                self._conn.execute(f'SET search_path TO "{schema}"')
+                self._conn.commit()
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_file)), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_file, timeout=30)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA foreign_keys=ON')
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def execute(self, query, params=()):
+        """Executa com placeholders '?' (convertidos para %s no Postgres)"""
+        if self.postgres:
+            query = query.replace('?', '%s')
+        return self.connect().execute(query, params)
+
+    def commit(self):
+        self.connect().commit()
+        self.journal_time = None
+
+    def rollback(self):
+        self.connect().rollback()
+        self.journal_time = None
+
+    def _rows(self, table, columns, where='', params=()):
+        query = f"SELECT id, {', '.join(columns)} FROM {table} {where}"
+        return [dict(zip(('id',) + columns, row)) for row in self.execute(query, params)]
+
+    def _journal(self, tabela, operacao, registro_id, rotulo, campo=None, antigo=None, novo=None):
+        """Entrada do diário: só o que mudou (O(alteração)), na transação corrente"""
+        if self.journal_time is None:
+            self.journal_time = datetime.now().isoformat(timespec='microseconds')
+        self.execute(
+            'INSERT INTO dashboard_journal (registrado_em, script, tabela, operacao, registro_id, rotulo, campo, '
+            'valor_antigo, valor_novo) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (self.journal_time, self.script, tabela, operacao, registro_id, rotulo, campo,
+             None if operacao == 'insert' else json.dumps(antigo, ensure_ascii=False),
+             None if operacao == 'delete' else json.dumps(novo, ensure_ascii=False))
+        )
+
+    def _insert(self, table, values, rotulo):
+        columns = ', '.join(values)
+        placeholders = ', '.join('?' for _ in values)
+        row_id = self.execute(
+            f'INSERT INTO {table} ({columns}) VALUES ({placeholders}) RETURNING id', tuple(values.values())
+        ).fetchone()[0]
+        self.changes += 1
+        self._journal(table, 'insert', row_id, rotulo, novo=values)
+        return row_id
+
+    def _update(self, table, current, values, rotulo):
+        """UPDATE só das colunas que mudaram; retorna True se alguma mudou"""
+        changed = {column: value for column, value in values.items() if current[column] != value}
+        if not changed:
+            return False
+        assignments = ', '.join(f'{column} = ?' for column in changed)
+        self.execute(f'UPDATE {table} SET {assignments} WHERE id = ?', (*changed.values(), current['id']))
+        self.changes += 1
+        for column, value in changed.items():
+            self._journal(table, 'update', current['id'], rotulo, column, current[column], value)
+        return True
+
+    def _delete(self, table, current, rotulo):
+        self.execute(f'DELETE FROM {table} WHERE id = ?', (current['id'],))
+        self.changes += 1
+        self._journal(table, 'delete', current['id'], rotulo,
+                      antigo={column: value for column, value in current.items() if column != 'id'})
+
+    def _set_document(self, document):
+        """metadata/chart_data (e outras chaves fora de details) como um documento"""
+        previous = self.get_meta('document')
+        encoded = json.dumps(document, ensure_ascii=False)
+        if previous == encoded:
+            return
+        self.set_meta('document', encoded)
+        self.changes += 1
+        self._journal('dashboard_meta', 'update', None, 'document', 'document',
+                      json.loads(previous) if previous else None, document)
+
+    def get_meta(self, chave, default=None):
+        row = self.execute('SELECT valor FROM dashboard_meta WHERE chave = ?', (chave,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, chave, valor):
+        self.execute(
+            'INSERT INTO dashboard_meta (chave, valor) VALUES (?, ?) '
+            'ON CONFLICT (chave) DO UPDATE SET valor = excluded.valor',
+            (chave, valor)
+        )
+
+    def import_document(self, data):
+        """Carrega o documento no banco; só linhas diferentes são regravadas
+
+        Indicações são identificadas por (categoria, posição), como no JSON.
+        Retorna {'inserted', 'updated', 'deleted'}.
+        """
+        counts = {'inserted': 0, 'updated': 0, 'deleted': 0}
+        categorias = {row['nome']: row for row in self._rows('categorias', CATEGORIA_COLUMNS)}
+        existing = {
+            (row['categoria_id'], row['posicao']): row for row in self._rows('indicacoes', INDICACAO_COLUMNS)
+        }
+
+        for posicao_categoria, (nome, category_data) in enumerate(data.get('details', {}).items()):
+            extra = {k: v for k, v in category_data.items() if k not in CATEGORIA_FIELDS}
+            values = {'nome': nome, 'sheet_name': category_data.get('sheet_name'),
+                      'posicao': posicao_categoria, 'extra': _dumps(extra)}
+            current = categorias.pop(nome, None)
+            if current is None:
+                categoria_id = self._insert('categorias', values, nome)
+            else:
+                categoria_id = current['id']
+                self._update('categorias', current, values, nome)
+
+            for posicao, indicacao in enumerate(category_data.get('indicacoes', [])):
+                identificacao = indicacao.get('numero')
+                ano, numero = parse_numero(identificacao)
+                extra = {k: v for k, v in indicacao.items() if k not in INDICACAO_FIELDS or v is None}
+                values = {
+                    'categoria_id': categoria_id, 'posicao': posicao, 'identificacao': identificacao,
+                    'ano': ano, 'numero': numero, 'descricao': indicacao.get('descricao'),
+                    'rua': indicacao.get('rua'), 'pdf_url': indicacao.get('pdfUrl'),
+                    'documento_id': documento_id_from_url(indicacao.get('pdfUrl')), 'extra': _dumps(extra)
+                }
+                current = existing.pop((categoria_id, posicao), None)
+                if current is None:
+                    self._insert('indicacoes', values, identificacao)
+                    counts['inserted'] += 1
+                elif self._update('indicacoes', current, values, identificacao):
+                    counts['updated'] += 1
+
+        for current in existing.values():
+            self._delete('indicacoes', current, current['identificacao'])
+            counts['deleted'] += 1
+        for current in categorias.values():
+            self._delete('categorias', current, current['nome'])
+
+        # metadata e chart_data ficam como documentos: os nomes de planilha do
+        # gráfico não coincidem com os de `details`; as contagens são refeitas na exportação
+        self._set_document({k: v for k, v in data.items() if k != 'details'})
+        return counts
+
+    def current_state(self):
+        """Estado atual das tabelas no formato dos snapshots (ver build_document)"""
+        return {
+            'document': json.loads(self.get_meta('document', '{}')),
+            'categorias': {
+                str(row.pop('id')): row for row in self._rows('categorias', CATEGORIA_COLUMNS)
+            },
+            'indicacoes': {
+                str(row.pop('id')): row for row in self._rows('indicacoes', INDICACAO_COLUMNS)
+            }
+        }
+
+    def export_document(self):
+        """Monta o dashboard_data.json a partir das tabelas"""
+        return build_document(self.current_state())
+
+    def snapshot(self):
+        """Grava o estado atual (comprimido) marcado com a última entrada do diário"""
+        journal_id = self.execute('SELECT MAX(id) FROM dashboard_journal').fetchone()[0]
+        if journal_id is None:
+            return None
+        payload = zlib.compress(json.dumps(self.current_state(), ensure_ascii=False).encode('utf-8'))
+        self.execute(
+            'INSERT INTO dashboard_snapshots (journal_id, registrado_em, conteudo) VALUES (?, ?, ?) '
+            'ON CONFLICT (journal_id) DO NOTHING',
+            (journal_id, datetime.now().isoformat(timespec='microseconds'), payload)
+        )
+        return journal_id
+
+    def maybe_snapshot(self):
+        """Snapshot quando o diário cresceu SNAPSHOT_INTERVAL entradas desde o último"""
+        head = self.execute('SELECT MAX(id) FROM dashboard_journal').fetchone()[0] or 0
+        last = self.execute('SELECT MAX(journal_id) FROM dashboard_snapshots').fetchone()[0] or 0
+        if head - last >= SNAPSHOT_INTERVAL:
+            return self.snapshot()
+        return None
+
+    def indicacoes(self, categoria=None):
+        """Indicações na ordem do documento (opcionalmente de uma categoria)
+
+        `extra` traz os demais campos do JSON, incluindo os nulls explícitos
+        (ex: 'pdfUrl' em extra = pdfUrl: null no documento, não ausente).
+        """
+        query = ('SELECT i.id, c.nome, i.identificacao, i.ano, i.numero, i.descricao, i.rua, i.pdf_url, '
+                 'i.documento_id, i.extra FROM indicacoes i JOIN categorias c ON c.id = i.categoria_id')
+        params = ()
+        if categoria is not None:
+            query += ' WHERE c.nome = ?'
+            params = (categoria,)
+        columns = ('id', 'categoria', 'identificacao', 'ano', 'numero', 'descricao', 'rua', 'pdf_url', 'documento_id')
+        return [{**dict(zip(columns, row[:-1])), 'extra': _loads(row[-1], {})}
+                for row in self.execute(query + ' ORDER BY c.posicao, i.posicao', params)]
+
+    def update_indicacao(self, indicacao_id, **fields):
+        """UPDATE pontual de uma indicação; retorna True se algum valor mudou"""
+        unknown = set(fields) - set(UPDATABLE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Colunas desconhecidas: {', '.join(sorted(unknown))}")
+        rows = self._rows('indicacoes', INDICACAO_COLUMNS, 'WHERE id = ?', (indicacao_id,))
+        if not rows:
+            return False
+        return self._update('indicacoes', rows[0], fields, rows[0]['identificacao'])
+
+    def sync_from_file(self, path=DASHBOARD_FILE):
+        """Importa o JSON se ele não é a última exportação (ex: backup restaurado)
+
+        Retorna as contagens da importação ou None se o banco já está em dia.
+        """
+        content_hash = hash_file_contents(path)
+        if self.get_meta('exported_hash') == content_hash:
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        script = self.script
+        self.script = f"{script} (importação de {os.path.basename(path)})"
+        try:
+            counts = self.import_document(data)
+        finally:
+            self.script = script
+        self.set_meta('exported_hash', content_hash)
+        self.maybe_snapshot()
+        self.commit()
+        logger.info(
+            f"🗄️ Banco sincronizado com {os.path.basename(path)}: {counts['inserted']} inseridas, "
+            f"{counts['updated']} alteradas, {counts['deleted']} removidas"
+        )
+        return counts
+
+    def export_file(self, path=DASHBOARD_FILE):
+        """Grava a exportação e o manifesto (chamar com dashboard_lock)"""
+        write_json_atomic(path, self.export_document())
+        manifest = write_data_manifest(path)
+        self.set_meta('exported_hash', manifest['hash'])
+        return manifest
+
+
+@contextmanager
+def edit_store(path=DASHBOARD_FILE, url=None, script=None):
+    """Transação sobre o banco sob o lock do documento
+
+    Ao sair do bloco, se alguma linha mudou, o JSON é exportado e publicado
+    antes do COMMIT; se o bloco levantar exceção é feito ROLLBACK e nada é
+    publicado. Se o COMMIT falhar depois da exportação, o JSON publicado é
+    reimportado na próxima edição.
+    """
+    store = DashboardStore(url, script=script)
+    try:
+        with dashboard_lock(path):
+            store.sync_from_file(path)
+            store.changes = 0
+            try:
+                yield store
+                changes = store.changes
+                if changes:
+                    store.maybe_snapshot()
+                    store.export_file(path)
+                store.commit()
+            except BaseException:
+                store.rollback()
+                raise
+    finally:
+        store.close()
+    if changes:
+        logger.info(f"📤 Dashboard exportado do banco: {path} ({changes} linha(s) alterada(s))")
+
+
+def export_dashboard(path=DASHBOARD_FILE, url=None):
+    """Regera o JSON a partir do banco"""
+    store = DashboardStore(url)
+    try:
+        with dashboard_lock(path):
+            manifest = store.export_file(path)
+            store.commit()
+    finally:
+        store.close()
+    logger.info(f"📤 Dashboard exportado do banco: {path}")
+    return manifest
+
+
+def main():
+    """python3 dashboard_store.py [--import|--export|--status]"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = sys.argv[1:]
+
+    if args == ['--import']:
+        store = DashboardStore()
+        try:
+            with dashboard_lock(DASHBOARD_FILE):
+                counts = store.sync_from_file(DASHBOARD_FILE)
+        finally:
+            store.close()
+        print(json.dumps(counts or {'inserted': 0, 'updated': 0, 'deleted': 0}, indent=2))
+        success = True
+    elif args == ['--export']:
+        print(json.dumps(export_dashboard(), indent=2, ensure_ascii=False))
+        success = True
+    elif args == ['--status']:
+        store = DashboardStore()
+        try:
+            status = {
+                'backend': 'postgres' if store.postgres else store.db_file,
+                'categorias': store.execute('SELECT COUNT(*) FROM categorias').fetchone()[0],
+                'indicacoes': store.execute('SELECT COUNT(*) FROM indicacoes').fetchone()[0],
+                'sem_pdf': store.execute('SELECT COUNT(*) FROM indicacoes WHERE pdf_url IS NULL').fetchone()[0],
+                'exported_hash': store.get_meta('exported_hash')
+            }
+        finally:
+            store.close()
+        print(json.dumps(status, indent=2, ensure_ascii=False))
+        success = True
+    else:
+        print("Uso: python3 dashboard_store.py [--import|--export|--status]")
+        success = False
+
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
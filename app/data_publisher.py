@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Publicação Atômica do dashboard_data.json
+Escreve em arquivo temporário, faz fsync e troca por rename atômico, sob um
+lock consultivo (flock) para que dois scripts não intercalem atualizações
+"""
+
+import os
+import json
+import fcntl
+import shutil
+import hashlib
+import tempfile
+import logging
+from datetime import datetime
+from contextlib import contextmanager
+
+from change_detection import hash_file_contents
+from precompress import compress_variants
+from data_shards import write_data_shards
+from search_service import sync_search_database
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
+DASHBOARD_FILE = f"{PROJECT_ROOT}/app/public/dashboard_data.json"
+LOCK_DIR = f"{PROJECT_ROOT}/.locks"
+
+
+def lock_file_for(path):
+    """Arquivo de lock do documento, fora de public/ (o rename não afeta o lock)"""
+    digest = hashlib.blake2b(os.path.abspath(path).encode('utf-8'), digest_size=6).hexdigest()
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    return os.path.join(LOCK_DIR, f"{os.path.basename(path)}.{digest}.lock")
+
+
+@contextmanager
+def dashboard_lock(path=DASHBOARD_FILE):
+    """Lock exclusivo entre processos para ler-modificar-escrever o documento"""
+    with open(lock_file_for(path), 'a') as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def _fsync_directory(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _atomic_replace(path, write_contents):
+    """Grava via arquivo temporário no mesmo diretório e faz rename atômico"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write_contents(f)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        else:
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+        _fsync_directory(directory)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_json_atomic(path, data, indent=2):
+    """Serializa e publica um JSON sem que leitores vejam o arquivo pela metade"""
+    payload = json.dumps(data, ensure_ascii=False, indent=indent).encode('utf-8')
+    _atomic_replace(path, lambda f: f.write(payload))
+
+
+def manifest_file_for(path):
+    """Manifesto observado pelo servidor Next.js (ex: dashboard_data.manifest.json)"""
+    return f"{os.path.splitext(path)[0]}.manifest.json"
+
+
+def read_data_manifest(path=DASHBOARD_FILE):
+    try:
+        with open(manifest_file_for(path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _count_records(path):
+    """(indicações, categorias) do documento publicado"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            details = json.load(f).get('details', {})
+    except (OSError, ValueError, AttributeError):
+        return 0, 0
+    records = sum(len(category.get('indicacoes', [])) for category in details.values())
+    return records, len(details)
+
+
+def write_data_manifest(path=DASHBOARD_FILE):
+    """Publica o manifesto da versão dos dados (hash, tamanho, registros, horário)
+
+    Escrito depois do documento, das variantes .br/.gz e dos fragmentos
+    (data/summary.json + data/details/): quando o servidor vê o manifesto
+    novo, os bytes que ele descreve já estão no lugar. Conteúdo igual mantém
+    a versão (e a compressão) anterior.
+    """
+    content_hash = hash_file_contents(path)
+    current = read_data_manifest(path)
+    if current.get('hash') == content_hash and 'encodings' in current and 'summary' in current:
+        return current
+
+    records, categories = _count_records(path)
+    manifest = {
+        'version': content_hash[:16],
+        'hash': content_hash,
+        'bytes': os.path.getsize(path),
+        'records': records,
+        'categories': categories,
+        'encodings': compress_variants(path),
+        'summary': write_data_shards(path),
+        'published_at': datetime.now().isoformat()
+    }
+    write_json_atomic(manifest_file_for(path), manifest)
+    try:
+        sync_search_database(path, manifest['version'])
+    except Exception as e:
+        # Banco derivado: a publicação segue; `search_service.py --sync` o reconstrói
+        logger.error(f"Erro ao atualizar o banco de busca: {e}")
+    logger.info(f"🔄 Versão de dados publicada: {manifest['version']} ({records} indicações, {manifest['bytes']} bytes)")
+    return manifest
+
+
+def publish_dashboard(data, path=DASHBOARD_FILE):
+    """Substitui o documento inteiro sob lock"""
+    with dashboard_lock(path):
+        write_json_atomic(path, data)
+        write_data_manifest(path)
+    logger.info(f"📤 Dashboard publicado: {path}")
+
+
+def publish_file(source_path, path=DASHBOARD_FILE):
+    """Publica o conteúdo de outro arquivo (ex: restaurar backup) sob lock"""
+    def copy_contents(f):
+        with open(source_path, 'rb') as source:
+            shutil.copyfileobj(source, f)
+
+    with dashboard_lock(path):
+        _atomic_replace(path, copy_contents)
+        write_data_manifest(path)
+    logger.info(f"📤 Dashboard publicado a partir de {source_path}")
+
+
+@contextmanager
+def edit_dashboard(path=DASHBOARD_FILE):
+    """Lê o documento sob lock e publica as alterações ao sair do bloco
+
+    Se o bloco levantar exceção nada é gravado.
+    """
+    with dashboard_lock(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        yield data
+        write_json_atomic(path, data)
+        write_data_manifest(path)
+    logger.info(f"📤 Dashboard publicado: {path}")
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Fragmentação do dashboard_data.json
+Gera um resumo pequeno (metadata + chart_data + hash de cada fragmento), um
+arquivo de detalhes por categoria e o índice de busca em public/data/. O cliente carrega o resumo
+na primeira renderização e busca cada categoria só quando ela é aberta; uma
+mudança em uma categoria invalida apenas o fragmento dela
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+import logging
+import unicodedata
+
+from change_detection import DIGEST_SIZE
+from precompress import EXTENSIONS, compress_variants, write_bytes_atomic
+from search_index import build_search_index
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
+DASHBOARD_FILE = f"{PROJECT_ROOT}/app/public/dashboard_data.json"
+SHARD_DIR_NAME = "data"
+SUMMARY_FILE_NAME = "summary.json"
+SEARCH_INDEX_FILE_NAME = "search-index.json"
+DETAILS_DIR_NAME = "details"
+
+
+def shard_id(category):
+    """Identificador do fragmento usado no nome do arquivo e na URL (ex: iluminacao-publica)"""
+    folded = unicodedata.normalize('NFKD', category).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '-', folded.lower()).strip('-') or 'categoria'
+
+
+def _serialize(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _digest(payload):
+    return hashlib.blake2b(payload, digest_size=DIGEST_SIZE).hexdigest()
+
+
+def _read_summary(summary_path):
+    try:
+        with open(summary_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _publish(path, payload, previous, public_dir):
+    """Grava o fragmento e suas variantes comprimidas se o conteúdo mudou"""
+    content_hash = _digest(payload)
+    relative_path = os.path.relpath(path, public_dir)
+    if previous and previous.get('hash') == content_hash and previous.get('file') == relative_path \
+            and os.path.exists(path):
+        return previous, False
+
+    write_bytes_atomic(path, payload)
+    relative_dir = os.path.dirname(relative_path)
+    encodings = {
+        encoding: {'file': os.path.join(relative_dir, variant['file']), 'bytes': variant['bytes']}
+        for encoding, variant in compress_variants(path).items()
+    }
+    return {
+        'file': relative_path,
+        'hash': content_hash,
+        'bytes': len(payload),
+        'encodings': encodings
+    }, True
+
+
+def _remove_stale(details_dir, keep):
+    """Apaga fragmentos (e variantes) de categorias que deixaram de existir"""
+    for name in os.listdir(details_dir):
+        base = name
+        for suffix in EXTENSIONS.values():
+            if name.endswith(suffix):
+                base = name[:-len(suffix)]
+        if base.endswith('.tmp'):
+            continue
+        if base not in keep:
+            os.remove(os.path.join(details_dir, name))
+            logger.info(f"🧹 Fragmento removido: {name}")
+
+
+def write_data_shards(path=DASHBOARD_FILE):
+    """Publica o resumo e os fragmentos por categoria de path
+
+    Fragmentos sem mudança não são regravados (mantêm hash e mtime). O resumo
+    é gravado por último: quem o lê encontra todos os fragmentos citados.
+    Retorna a entrada do resumo para o manifesto ({'file', 'hash', 'bytes',
+    'encodings'}).
+    """
+    public_dir = os.path.dirname(os.path.abspath(path))
+    shard_dir = os.path.join(public_dir, SHARD_DIR_NAME)
+    details_dir = os.path.join(shard_dir, DETAILS_DIR_NAME)
+    summary_path = os.path.join(shard_dir, SUMMARY_FILE_NAME)
+    os.makedirs(details_dir, exist_ok=True)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    previous_summary = _read_summary(summary_path)
+    previous = previous_summary.get('shards', {})
+    shards = {}
+    used_ids = set()
+    changed = 0
+    for category, category_data in data.get('details', {}).items():
+        base_id = shard_id(category)
+        identifier = base_id
+        suffix = 2
+        while identifier in used_ids:
+            identifier = f"{base_id}-{suffix}"
+            suffix += 1
+        used_ids.add(identifier)
+
+        payload = _serialize({'categoria': category, **category_data})
+        entry, written = _publish(
+            os.path.join(details_dir, f"{identifier}.json"), payload, previous.get(category), public_dir
+        )
+        changed += written
+        shards[category] = {
+            **entry,
+            'id': identifier,
+            'records': len(category_data.get('indicacoes', []))
+        }
+
+    _remove_stale(details_dir, {f"{entry['id']}.json" for entry in shards.values()})
+
+    # Índice de busca da mesma versão: posições referem-se aos fragmentos acima
+    search_entry, _ = _publish(
+        os.path.join(shard_dir, SEARCH_INDEX_FILE_NAME), _serialize(build_search_index(data)),
+        previous_summary.get('search_index'), public_dir
+    )
+
+    summary = {
+        'metadata': data.get('metadata', {}),
+        'chart_data': data.get('chart_data', []),
+        'shards': shards,
+        'search_index': search_entry
+    }
+    entry, _ = _publish(summary_path, _serialize(summary), None, public_dir)
+    logger.info(
+        f"🧩 Resumo publicado ({entry['bytes']} bytes): {len(shards)} fragmento(s), "
+        f"{changed} regravado(s)"
+    )
+    return entry
+
+
+def main():
+    """Regera resumo e fragmentos do JSON informado (padrão: dashboard_data.json)"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    path = sys.argv[1] if len(sys.argv) > 1 else DASHBOARD_FILE
+    print(json.dumps(write_data_shards(path), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Pacotes de Deploy Incrementais
+Mantém um manifesto (hash por arquivo) do último pacote completo e gera pacotes
+delta com apenas os arquivos alterados/adicionados e a lista de removidos
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import tarfile
+import logging
+from datetime import datetime
+
+from change_detection import ChangeDetector
+from parallel_archive import archive_extension, create_archive, open_archive
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
+DEPLOY_DIR = f"{PROJECT_ROOT}/.deploy"
+FULL_PACKAGE_BASENAME = "app"
+DELTA_PACKAGE_BASENAME = "app_delta"
+MANIFEST_NAME = "package_manifest.json"
+DELTA_INFO_NAME = ".delta.json"
+
+# Cadência dos pacotes completos (para recuperação)
+FULL_PACKAGE_EVERY = 20          # deltas entre dois pacotes completos
+FULL_PACKAGE_MAX_AGE_HOURS = 24  # idade máxima da base
+DELTA_MAX_RATIO = 0.5            # delta maior que isso (em bytes) vira pacote completo
+
+
+def list_build_files(build_dir):
+    """Lista os arquivos regulares do build em caminhos relativos ordenados"""
+    files = []
+    for root, dirs, names in os.walk(build_dir):
+        dirs.sort()
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            if os.path.isfile(path) and not os.path.islink(path):
+                files.append(os.path.relpath(path, build_dir))
+    return files
+
+
+def manifest_id(files):
+    """Identificador estável de um manifesto"""
+    digest = hashlib.blake2b(digest_size=8)
+    for rel_path in sorted(files):
+        digest.update(f"{rel_path}\0{files[rel_path]['hash']}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _extract_member(archive, member, target_dir):
+    if hasattr(tarfile, 'data_filter'):
+        archive.extract(member, target_dir, filter='data')
+        return
+    target_root = os.path.realpath(target_dir)
+    destination = os.path.realpath(os.path.join(target_dir, member.name))
+    if destination != target_root and not destination.startswith(os.path.join(target_root, '')):
+        raise ValueError(f"Caminho inseguro no pacote: {member.name}")
+    archive.extract(member, target_dir)
+
+
+def apply_delta(target_dir, delta_path):
+    """Aplica um pacote delta sobre um diretório já extraído da base"""
+    delta_info = {}
+    with open_archive(delta_path) as archive:
+        for member in archive:
+            # .delta.json é sempre o primeiro membro: remoções antes das cópias
+            if member.name == DELTA_INFO_NAME:
+                delta_info = json.load(archive.extractfile(member))
+                for rel_path in delta_info.get('removed', []):
+                    path = os.path.join(target_dir, rel_path)
+                    if os.path.isfile(path):
+                        os.remove(path)
+                continue
+            _extract_member(archive, member, target_dir)
+
+    logger.info(
+        f"Delta aplicado: {len(delta_info.get('changed', []))} arquivos, "
+        f"{len(delta_info.get('removed', []))} removidos"
+    )
+    return delta_info
+
+
+def read_delta_info(delta_path):
+    """Lê apenas o cabeçalho .delta.json de um pacote delta"""
+    with open_archive(delta_path) as archive:
+        for member in archive:
+            if member.name == DELTA_INFO_NAME:
+                return json.load(archive.extractfile(member))
+    return {}
+
+
+def restore_deploy(target_dir, deploy_dir=DEPLOY_DIR, codec=None):
+    """Reconstrói o deploy atual: pacote completo + último delta (se houver)"""
+    packager = DeltaPackager(deploy_dir, codec=codec)
+
+    os.makedirs(target_dir, exist_ok=True)
+    with open_archive(packager.full_package) as archive:
+        for member in archive:
+            _extract_member(archive, member, target_dir)
+    logger.info(f"Base extraída: {packager.full_package}")
+
+    state = packager.load_state()
+    if not os.path.exists(packager.delta_package) or not state.get('last_delta'):
+        return True
+
+    if read_delta_info(packager.delta_package).get('base_id') != state.get('base_id'):
+        logger.warning("Delta pertence a outra base - ignorado")
+        return True
+
+    apply_delta(target_dir, packager.delta_package)
+    return True
+
+
+class DeltaPackager:
+    """Decide entre pacote completo, delta ou nada e mantém o manifesto"""
+
+    def __init__(self, deploy_dir=DEPLOY_DIR, full_every=FULL_PACKAGE_EVERY,
+                 max_age_hours=FULL_PACKAGE_MAX_AGE_HOURS, delta_max_ratio=DELTA_MAX_RATIO,
+                 codec=None, level=None):
+        self.deploy_dir = deploy_dir
+        self.codec = codec
+        self.level = level
+        extension = archive_extension(codec)
+        self.full_package = os.path.join(deploy_dir, f"{FULL_PACKAGE_BASENAME}.{extension}")
+        self.delta_package = os.path.join(deploy_dir, f"{DELTA_PACKAGE_BASENAME}.{extension}")
+        self.full_every = full_every
+        self.max_age_hours = max_age_hours
+        self.delta_max_ratio = delta_max_ratio
+        self.manifest_file = os.path.join(deploy_dir, MANIFEST_NAME)
+        self.detector = ChangeDetector(os.path.join(deploy_dir, '.build_fingerprints.json'))
+
+    def load_state(self):
+        """Carrega o manifesto do último pacote completo"""
+        try:
+            if os.path.exists(self.manifest_file):
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.error(f"Erro ao ler manifesto de pacotes: {e}")
+        return {}
+
+    def save_state(self, state):
+        tmp_file = f"{self.manifest_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+
+    def build_manifest(self, build_dir):
+        """Hash de cada arquivo do build (relendo só arquivos com stat novo)"""
+        rel_paths = list_build_files(build_dir)
+        absolute = [os.path.join(build_dir, p) for p in rel_paths]
+        hashes = self.detector.file_hashes(absolute, prune_root=build_dir)
+
+        files = {}
+        for rel_path, path in zip(rel_paths, absolute):
+            content_hash = hashes.get(os.path.abspath(path))
+            if content_hash:
+                files[rel_path] = {'hash': content_hash, 'size': os.path.getsize(path)}
+        return files
+
+    def plan(self, build_dir):
+        """Compara o build com a base e escolhe o tipo de pacote"""
+        files = self.build_manifest(build_dir)
+        state = self.load_state()
+        base_files = state.get('files', {})
+
+        changed = [p for p, entry in files.items()
+                   if base_files.get(p, {}).get('hash') != entry['hash']]
+        removed = [p for p in base_files if p not in files]
+        changed_bytes = sum(files[p]['size'] for p in changed)
+        total_bytes = sum(entry['size'] for entry in files.values()) or 1
+
+        plan = {
+            'files': files,
+            'changed': changed,
+            'removed': removed,
+            'changed_bytes': changed_bytes,
+            'total_bytes': total_bytes
+        }
+
+        base_age_hours = None
+        if state.get('base_created'):
+            base_age_hours = (time.time() - state['base_created']) / 3600
+
+        if not state or not os.path.exists(self.full_package):
+            plan.update(mode='full', reason='sem pacote base')
+        elif state.get('deltas_since_full', 0) >= self.full_every:
+            plan.update(mode='full', reason=f"cadência de {self.full_every} deltas atingida")
+        elif base_age_hours is not None and base_age_hours >= self.max_age_hours:
+            plan.update(mode='full', reason=f"base com {base_age_hours:.1f}h")
+        elif changed_bytes / total_bytes > self.delta_max_ratio:
+            plan.update(mode='full', reason=f"delta com {changed_bytes / total_bytes:.0%} do build")
+        elif not changed and not removed:
+            # Build voltou a ser igual à base: o delta anterior traria arquivos revertidos
+            if state.get('last_delta') or os.path.exists(self.delta_package):
+                self.clear_delta()
+                plan.update(mode='unchanged', reason='build idêntico à base (delta anterior descartado)')
+            else:
+                plan.update(mode='unchanged', reason='build idêntico à base')
+        elif (state.get('last_delta') or {}).get('manifest_id') == manifest_id(files):
+            plan.update(mode='unchanged', reason='build idêntico ao último delta')
+        else:
+            plan.update(mode='delta', reason=f"{len(changed)} alterados, {len(removed)} removidos")
+        return plan
+
+    def clear_delta(self):
+        """Descarta o delta atual: o deploy volta a ser só a base"""
+        if os.path.exists(self.delta_package):
+            os.remove(self.delta_package)
+        state = self.load_state()
+        if state.get('last_delta'):
+            state['last_delta'] = None
+            self.save_state(state)
+        logger.info("Delta anterior descartado - deploy igual à base")
+
+    def record_full(self, plan):
+        """Registra o build empacotado por completo como nova base"""
+        if os.path.exists(self.delta_package):
+            os.remove(self.delta_package)
+
+        self.save_state({
+            'base_id': manifest_id(plan['files']),
+            'base_created': time.time(),
+            'deltas_since_full': 0,
+            'files': plan['files'],
+            'last_delta': None
+        })
+        logger.info(f"Manifesto base atualizado: {len(plan['files'])} arquivos")
+
+    def write_delta(self, build_dir, plan):
+        """Gera o pacote delta (cumulativo em relação à base) e atualiza o estado"""
+        state = self.load_state()
+        delta_path = self.delta_package
+
+        delta_info = {
+            'base_id': state['base_id'],
+            'created': datetime.now().isoformat(),
+            'changed': plan['changed'],
+            'removed': plan['removed']
+        }
+        create_archive(
+            build_dir,
+            delta_path,
+            codec=self.codec,
+            level=self.level,
+            files=plan['changed'],
+            extra_files={DELTA_INFO_NAME: json.dumps(delta_info, indent=2).encode('utf-8')}
+        )
+
+        size = os.path.getsize(delta_path)
+        state['deltas_since_full'] = state.get('deltas_since_full', 0) + 1
+        state['last_delta'] = {
+            'created': delta_info['created'],
+            'changed': len(plan['changed']),
+            'removed': len(plan['removed']),
+            'size_bytes': size,
+            'manifest_id': manifest_id(plan['files'])
+        }
+        self.save_state(state)
+
+        logger.info(f"📦 Pacote delta criado: {delta_path} ({size / 1024:.1f} KB)")
+        return delta_path
+
+    def get_info(self):
+        """Resumo do estado dos pacotes para --status"""
+        state = self.load_state()
+        if not state:
+            return {'exists': False}
+        return {
+            'exists': True,
+            'base_id': state.get('base_id'),
+            'base_files': len(state.get('files', {})),
+            'deltas_since_full': state.get('deltas_since_full', 0),
+            'last_delta': state.get('last_delta')
+        }
+
+
+def main():
+    """Reconstrói o deploy atual em um diretório (--restore <destino>)"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if len(sys.argv) == 3 and sys.argv[1] == '--restore':
+        success = restore_deploy(sys.argv[2])
+    elif len(sys.argv) == 2 and sys.argv[1] == '--status':
+        print(json.dumps(DeltaPackager().get_info(), indent=2))
+        success = True
+    else:
+        print("Uso: python3 deploy_packaging.py [--restore <destino>|--status]")
+        success = False
+
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Observador de Arquivos do Dashboard
+Dispara um callback quando arquivos monitorados terminam de ser escritos,
+usando eventos inotify do kernel e polling como fallback
+"""
+
+import os
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+
+from change_detection import stat_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Máscaras do inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o0004000
+IN_CLOEXEC = 0o2000000
+
+# Observamos o diretório, não o arquivo: escritas atômicas (rename) trocam o inode
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_MOVED_FROM
+EVENT_HEADER = struct.Struct('iIII')
+
+DEFAULT_DEBOUNCE_SECONDS = 0.5
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+class InotifyUnavailable(OSError):
+    """O sistema de arquivos ou a plataforma não suporta inotify"""
+
+
+class _Inotify:
+    """Wrapper mínimo sobre a API inotify da libc"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise InotifyUnavailable("libc não encontrada")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise InotifyUnavailable("inotify não suportado nesta plataforma")
+
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise InotifyUnavailable(err, os.strerror(err))
+        self.watches = {}
+
+    def add_watch(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise InotifyUnavailable(err, os.strerror(err))
+        self.watches[wd] = directory
+        return wd
+
+    def read_events(self):
+        """Lê os eventos pendentes e retorna (diretório, nome, máscara)"""
+        events = []
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return events
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(buffer):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = buffer[offset:offset + length].rstrip(b'\0')
+            offset += length
+            events.append((self.watches.get(wd), os.fsdecode(name), mask))
+        return events
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class FileWatcher:
+    """Observa arquivos e chama o callback após uma janela de debounce"""
+
+    def __init__(self, paths, callback, debounce=DEFAULT_DEBOUNCE_SECONDS,
+                 poll_interval=DEFAULT_POLL_INTERVAL, use_inotify=True):
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.callback = callback
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.mode = None
+        self._running = False
+
+    def stop(self):
+        """Solicita a parada do loop de observação"""
+        self._running = False
+
+    def _dispatch(self, changed):
+        logger.info(f"📝 Escrita concluída: {', '.join(sorted(changed))}")
+        try:
+            self.callback(sorted(changed))
+        except Exception as e:
+            logger.error(f"Erro no callback do observador: {e}")
+
+    def _run_inotify(self):
+        inotify = _Inotify()
+        targets = {}
+        for path in self.paths:
+            directory, name = os.path.split(path)
+            targets.setdefault(directory, {})[name] = path
+        try:
+            for directory in targets:
+                inotify.add_watch(directory)
+
+            self.mode = 'inotify'
+            logger.info(f"👀 Observando via inotify (debounce {self.debounce:.2f}s): {', '.join(self.paths)}")
+
+            pending = set()
+            deadline = None
+            while self._running:
+                timeout = max(0.0, deadline - time.monotonic()) if deadline else 1.0
+                try:
+                    ready, _, _ = select.select([inotify.fd], [], [], timeout)
+                except InterruptedError:
+                    continue
+
+                if ready:
+                    for directory, name, mask in inotify.read_events():
+                        if mask & IN_Q_OVERFLOW:
+                            # Fila do kernel estourou: assumir que todos mudaram
+                            pending.update(self.paths)
+                        elif directory in targets and name in targets[directory]:
+                            pending.add(targets[directory][name])
+                        else:
+                            continue
+                        deadline = time.monotonic() + self.debounce
+
+                if deadline and time.monotonic() >= deadline:
+                    self._dispatch(pending)
+                    pending = set()
+                    deadline = None
+        finally:
+            inotify.close()
+
+    def _run_polling(self):
+        self.mode = 'polling'
+        logger.info(f"👀 Observando via polling a cada {self.poll_interval:.1f}s: {', '.join(self.paths)}")
+
+        signatures = {path: stat_fingerprint(path) for path in self.paths}
+        pending = set()
+        deadline = None
+        while self._running:
+            for path in self.paths:
+                signature = stat_fingerprint(path)
+                if signature != signatures[path]:
+                    signatures[path] = signature
+                    pending.add(path)
+                    deadline = time.monotonic() + self.debounce
+
+            if deadline and time.monotonic() >= deadline:
+                self._dispatch(pending)
+                pending = set()
+                deadline = None
+
+            sleep_for = self.poll_interval
+            if deadline:
+                sleep_for = min(sleep_for, max(0.0, deadline - time.monotonic()))
+            time.sleep(sleep_for)
+
+    def run(self):
+        """Executa o loop de observação até stop() ou Ctrl+C"""
+        self._running = True
+        try:
+            if self.use_inotify:
+                try:
+                    self._run_inotify()
+                    return
+                except InotifyUnavailable as e:
+                    logger.warning(f"⚠️  inotify indisponível ({e}) - usando polling")
+            self._run_polling()
+        except KeyboardInterrupt:
+            logger.info("🛑 Observador encerrado")
+        finally:
+            self._running = False
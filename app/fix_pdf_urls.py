@@ -1,11 +1,10 @@
 
 #!/usr/bin/env python3
-import json
 import re
-import requests
-from bs4 import BeautifulSoup
-import time
-from datetime import datetime
+
+from dashboard_store import edit_store
+from backup_store import BackupStore
+from sapl_scraper import scrape_sapl_ids
 
 def extract_indication_number(numero_str):
     """Extrai o número da indicação do formato 'IND XXX/2025'"""
@@ -31,65 +30,48 @@ def build_correct_pdf_url(numero, ano, sapl_id):
     return f"https://sapl.camarabento.rs.gov.br/media/sapl/public/materialegislativa/{ano}/{sapl_id}/cmbgind{ano}{numero_formatado}a.pdf"
 
 def extract_ids_from_sapl_pages():
-    """Extrai IDs das páginas do SAPL para construir mapeamento"""
-    base_url = "https://sapl.camarabento.rs.gov.br/ta/indicacao/"
-    ids_encontrados = {}
-    
+    """Extrai IDs de todas as páginas do SAPL para construir mapeamento"""
     print("🔍 Extraindo IDs do sistema SAPL...")
     
-    # Páginas 1 e 2 como mencionado pelo usuário
-    for page in [1, 2]:
-        try:
-            url = f"{base_url}?page={page}"
-            print(f"   Processando página {page}: {url}")
-            
-            response = requests.get(url, timeout=10)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Buscar links para indicações
-                links = soup.find_all('a', href=re.compile(r'/ta/indicacao/\d+'))
-                
-                for link in links:
-                    href = link.get('href')
-                    match = re.search(r'/ta/indicacao/(\d+)', href)
-                    if match:
-                        sapl_id = match.group(1)
-                        
-                        # Tentar extrair número da indicação do texto do link
-                        text = link.get_text(strip=True)
-                        numero_match = re.search(r'(\d+)/2025', text)
-                        if numero_match:
-                            numero = int(numero_match.group(1))
-                            ids_encontrados[numero] = sapl_id
-                            print(f"   ✓ Indicação {numero}/2025 → ID {sapl_id}")
-                        
-                time.sleep(1)  # Pausa entre requisições
-                
-        except Exception as e:
-            print(f"   ❌ Erro ao processar página {page}: {e}")
+    # Todas as páginas da listagem (última descoberta pela paginação), em paralelo limitado
+    ids_encontrados, stats = scrape_sapl_ids()
+    
+    print(f"   ✓ {stats['ids']} indicações em {stats['pages']}/{stats['last_page']} páginas "
+          f"({stats['wall_seconds']:.2f}s, {stats['pages_per_second']} páginas/s)")
+    cache = stats['cache']
+    print(f"   🗄️  Cache: {cache['revalidated'] + cache['hits']} páginas sem download, "
+          f"{cache['unchanged']} inalteradas, {cache['misses']} parseadas "
+          f"({cache['bytes_saved'] / 1024:.0f} KB e {cache['parse_seconds_saved']:.2f}s economizados)")
+    for page in stats['failed_pages']:
+        print(f"   ❌ Erro ao processar página {page}")
     
     return ids_encontrados
 
 def update_dashboard_data():
     """Atualiza o dashboard_data.json com URLs corretas"""
     
-    # Backup automático
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = f"/home/ubuntu/dashboard_indicacoes/app/public/dashboard_data_backup_url_fix_{timestamp}.json"
-    
-    # Carregar dados atuais
-    with open('/home/ubuntu/dashboard_indicacoes/app/public/dashboard_data.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    # Criar backup
-    with open(backup_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-    print(f"📋 Backup criado: {backup_path}")
-    
-    # Extrair IDs do SAPL
+    # Extrair IDs do SAPL antes de travar o arquivo (etapa de rede, mais lenta)
     sapl_ids = extract_ids_from_sapl_pages()
     
+    # Atualizar no banco em uma transação; o JSON é exportado ao final (sob lock)
+    with edit_store('/home/ubuntu/dashboard_indicacoes/app/public/dashboard_data.json') as store:
+        # Backup automático (sob o lock o arquivo é a exportação atual do banco)
+        backup_id = BackupStore().backup_file(
+            '/home/ubuntu/dashboard_indicacoes/app/public/dashboard_data.json', 'url_fix'
+        )['id']
+        print(f"📋 Backup criado: {backup_id}")
+        
+        updates_count, total_indicacoes = apply_sapl_urls(store, sapl_ids)
+    
+    return {
+        'total_indicacoes': total_indicacoes,
+        'updates_count': updates_count,
+        'backup_id': backup_id,
+        'sapl_ids_found': len(sapl_ids)
+    }
+
+def apply_sapl_urls(store, sapl_ids):
+    """Atualiza as URLs das indicações no banco (UPDATE por indicação)"""
     # Atualizar URLs das indicações
     updates_count = 0
     total_indicacoes = 0
@@ -101,11 +83,12 @@ def update_dashboard_data():
                   'Prédios Públicos']
     
     for categoria in categorias:
-        if 'details' in data and categoria in data['details'] and 'indicacoes' in data['details'][categoria]:
+        indicacoes = store.indicacoes(categoria)
+        if indicacoes:
             print(f"\n📂 Processando categoria: {categoria}")
-            for indicacao in data['details'][categoria]['indicacoes']:
+            for indicacao in indicacoes:
                 total_indicacoes += 1
-                numero, ano = extract_indication_number(indicacao['numero'])
+                numero, ano = extract_indication_number(indicacao['identificacao'] or '')
                 
                 if numero and ano == 2025:
                     # Primeiro, tentar usar ID do mapeamento extraído do SAPL
@@ -113,34 +96,24 @@ def update_dashboard_data():
                         sapl_id = sapl_ids[numero]
                     else:
                         # Fallback: usar ID da URL atual se disponível
-                        sapl_id = extract_sapl_id_from_current_url(indicacao.get('pdfUrl', ''))
+                        sapl_id = extract_sapl_id_from_current_url(indicacao['pdf_url'] or '')
                     
                     if sapl_id:
                         # Construir URL no padrão correto
                         new_url = build_correct_pdf_url(numero, ano, sapl_id)
-                        old_url = indicacao.get('pdfUrl', '')
                         
-                        indicacao['pdfUrl'] = new_url
+                        store.update_indicacao(indicacao['id'], pdf_url=new_url, documento_id=str(sapl_id))
                         updates_count += 1
                         
-                        print(f"   ✓ {indicacao['numero']} → {new_url}")
+                        print(f"   ✓ {indicacao['identificacao']} → {new_url}")
                     else:
-                        print(f"   ❌ Não foi possível encontrar ID para {indicacao['numero']}")
+                        print(f"   ❌ Não foi possível encontrar ID para {indicacao['identificacao']}")
                 else:
-                    print(f"   ⚠️  Formato inválido ou ano diferente: {indicacao['numero']}")
+                    print(f"   ⚠️  Formato inválido ou ano diferente: {indicacao['identificacao']}")
         else:
             print(f"⚠️  Categoria '{categoria}' não encontrada ou sem indicações")
     
-    # Salvar dados atualizados
-    with open('/home/ubuntu/dashboard_indicacoes/app/public/dashboard_data.json', 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-    
-    return {
-        'total_indicacoes': total_indicacoes,
-        'updates_count': updates_count,
-        'backup_path': backup_path,
-        'sapl_ids_found': len(sapl_ids)
-    }
+    return updates_count, total_indicacoes
 
 if __name__ == "__main__":
     print("🔧 INICIANDO CORREÇÃO DE URLs DOS PDFs")
@@ -153,5 +126,5 @@ if __name__ == "__main__":
     print(f"• Total de indicações processadas: {resultado['total_indicacoes']}")
     print(f"• URLs atualizadas: {resultado['updates_count']}")
     print(f"• IDs extraídos do SAPL: {resultado['sapl_ids_found']}")
-    print(f"• Backup salvo em: {resultado['backup_path']}")
+    print(f"• Backup salvo: {resultado['backup_id']}")
     print("\n✅ CORREÇÃO CONCLUÍDA!")
@@ -0,0 +1,95 @@
+'use client';
+
+import { useState, useEffect, useMemo } from 'react';
+import { CategoryData, CategoryShard, DashboardSummary, ShardInfo } from '@/lib/data';
+
+// Shards by id and hash: a category is downloaded again only after it changes
+const shardRequests = new Map<string, Promise<CategoryShard>>();
+
+export function fetchCategoryShard(shard: ShardInfo): Promise<CategoryShard> {
+  const key = `${shard.id}:${shard.hash}`;
+  let request = shardRequests.get(key);
+  if (!request) {
+    request = fetch(`/api/dashboard-data/details/${encodeURIComponent(shard.id)}`, { cache: 'no-cache' })
+      .then((response) => {
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        return response.json() as Promise<CategoryShard>;
+      })
+      .catch((error) => {
+        // Allow a retry on the next request
+        shardRequests.delete(key);
+        throw error;
+      });
+    shardRequests.set(key, request);
+  }
+  return request;
+}
+
+interface UseCategoryShardsReturn {
+  details: Record<string, CategoryData>;
+  loading: boolean;
+  error: string | null;
+}
+
+/** Loads the detail shards of the given categories from the current summary */
+export function useCategoryShards(summary: DashboardSummary | null, categories: string[]): UseCategoryShardsReturn {
+  const [loaded, setLoaded] = useState<Record<string, { hash: string; data: CategoryData }>>({});
+  const [loading, setLoading] = useState(false);
+  const [error, setError] = useState<string | null>(null);
+
+  // Identity of the wanted shards: changes only when a category or its hash does
+  const wanted = categories
+    .map((category) => summary?.shards?.[category])
+    .filter((shard): shard is ShardInfo => Boolean(shard));
+  const wantedKey = wanted.map((shard) => `${shard.id}:${shard.hash}`).join('|');
+
+  useEffect(() => {
+    if (wanted.length === 0) {
+      return;
+    }
+
+    let cancelled = false;
+    setLoading(true);
+    setError(null);
+
+    Promise.all(wanted.map((shard) => fetchCategoryShard(shard).then((data) => ({ hash: shard.hash, data }))))
+      .then((shards) => {
+        if (cancelled) return;
+        setLoaded((current) => {
+          const next = { ...current };
+          shards.forEach(({ hash, data: { categoria, ...categoryData } }) => {
+            next[categoria] = { hash, data: categoryData };
+          });
+          return next;
+        });
+      })
+      .catch((err) => {
+        if (cancelled) return;
+        console.error('Error fetching category details:', err);
+        setError(err instanceof Error ? err.message : 'Failed to fetch category details');
+      })
+      .finally(() => {
+        if (!cancelled) setLoading(false);
+      });
+
+    return () => {
+      cancelled = true;
+    };
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [wantedKey]);
+
+  // Only shards matching the current summary; older copies are never shown
+  const details = useMemo(() => {
+    const current: Record<string, CategoryData> = {};
+    Object.entries(loaded).forEach(([category, entry]) => {
+      if (summary?.shards?.[category]?.hash === entry.hash) {
+        current[category] = entry.data;
+      }
+    });
+    return current;
+  }, [loaded, summary]);
+
+  return { details, loading, error };
+}
@@ -3,18 +3,18 @@
 'use client';
 
 import { useState, useEffect, useCallback } from 'react';
-import { DashboardData } from '@/lib/data';
+import { DashboardSummary } from '@/lib/data';
 
 interface UseDashboardDataReturn {
-  data: DashboardData | null;
+  data: DashboardSummary | null;
   loading: boolean;
   error: string | null;
   lastFetch: number | null;
   refetch: () => Promise<void>;
 }
 
-export function useDashboardData(initialData?: DashboardData): UseDashboardDataReturn {
-  const [data, setData] = useState<DashboardData | null>(initialData || null);
+export function useDashboardData(initialData?: DashboardSummary): UseDashboardDataReturn {
+  const [data, setData] = useState<DashboardSummary | null>(initialData || null);
   const [loading, setLoading] = useState(!initialData);
   const [error, setError] = useState<string | null>(null);
   const [lastFetch, setLastFetch] = useState<number | null>(null);
@@ -24,17 +24,13 @@ export function useDashboardData(initialData?: DashboardData): UseDashboardDataR
       setLoading(true);
       setError(null);
       
-      console.log('Fetching fresh dashboard data...');
+      console.log('Fetching dashboard summary...');
       
-      // Add timestamp to prevent caching
-      const timestamp = Date.now();
-      const response = await fetch(`/api/dashboard-data?t=${timestamp}`, {
+      // Always revalidate: the browser sends If-None-Match and reuses its copy on 304
+      // Details are not included; each category shard is fetched when opened
+      const response = await fetch('/api/dashboard-data/summary', {
         method: 'GET',
-        headers: {
-          'Cache-Control': 'no-cache, no-store, must-revalidate',
-          'Pragma': 'no-cache'
-        },
-        cache: 'no-store'
+        cache: 'no-cache'
       });
 
       if (!response.ok) {
@@ -44,7 +40,7 @@ export function useDashboardData(initialData?: DashboardData): UseDashboardDataR
       const freshData = await response.json();
       
       console.log('Fresh data loaded:', {
-        timestamp: freshData._apiMeta?.fetchedAt,
+        version: response.headers.get('X-Data-Version'),
         totalIndicacoes: freshData.metadata?.total_indicacoes
       });
       
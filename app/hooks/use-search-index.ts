@@ -0,0 +1,75 @@
+'use client';
+
+import { useState, useEffect } from 'react';
+import { DashboardSummary } from '@/lib/data';
+import { SearchIndex, SearchIndexFile, decodeSearchIndex } from '@/lib/search-index';
+
+// Decoded indexes by hash: downloaded once per data version
+const indexRequests = new Map<string, Promise<SearchIndex>>();
+
+function fetchSearchIndex(hash: string): Promise<SearchIndex> {
+  let request = indexRequests.get(hash);
+  if (!request) {
+    request = fetch('/api/dashboard-data/search-index', { cache: 'no-cache' })
+      .then((response) => {
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        return response.json() as Promise<SearchIndexFile>;
+      })
+      .then(decodeSearchIndex)
+      .catch((error) => {
+        indexRequests.delete(hash);
+        throw error;
+      });
+    indexRequests.set(hash, request);
+  }
+  return request;
+}
+
+interface UseSearchIndexReturn {
+  index: SearchIndex | null;
+  loading: boolean;
+  // No index for this version (not published or failed to load)
+  unavailable: boolean;
+}
+
+/** Search index of the current summary, fetched the first time a search starts */
+export function useSearchIndex(summary: DashboardSummary | null, enabled: boolean): UseSearchIndexReturn {
+  const [loaded, setLoaded] = useState<{ hash: string; index: SearchIndex } | null>(null);
+  const [loading, setLoading] = useState(false);
+  const [failedHash, setFailedHash] = useState<string | null>(null);
+  const hash = summary?.search_index?.hash;
+
+  useEffect(() => {
+    if (!enabled || !hash || loaded?.hash === hash || failedHash === hash) {
+      return;
+    }
+
+    let cancelled = false;
+    setLoading(true);
+
+    fetchSearchIndex(hash)
+      .then((index) => {
+        if (!cancelled) setLoaded({ hash, index });
+      })
+      .catch((err) => {
+        // Without the index the dashboard scans the category shards instead
+        console.error('Error fetching search index:', err);
+        if (!cancelled) setFailedHash(hash);
+      })
+      .finally(() => {
+        if (!cancelled) setLoading(false);
+      });
+
+    return () => {
+      cancelled = true;
+    };
+  }, [enabled, hash, loaded, failedHash]);
+
+  return {
+    index: loaded && loaded.hash === hash ? loaded.index : null,
+    loading,
+    unavailable: !hash || failedHash === hash
+  };
+}
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Cache HTTP em Disco com Revalidação Condicional
+Guarda, por URL, o corpo da última resposta 200 (comprimido), ETag,
+Last-Modified, o hash do corpo e o resultado do parsing desse corpo, junto com
+a chave do parser que o produziu. A próxima requisição vai com
+If-None-Match/If-Modified-Since; um 304 ou um corpo com o mesmo hash
+reaproveita o resultado sem parsear o HTML de novo, desde que a chave do
+parser seja a mesma (senão o corpo guardado é parseado outra vez)
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import hashlib
+import logging
+from datetime import datetime
+
+from data_publisher import write_json_atomic
+from precompress import write_bytes_atomic
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
+CACHE_DIR = f"{PROJECT_ROOT}/.cache/http"
+MAX_AGE_PATTERN = re.compile(r'max-age=(\d+)')
+
+
+def url_key(url):
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def body_hash(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _expires_at(headers):
+    """Validade da resposta pelo Cache-Control (0 = revalidar sempre, None = não guardar)"""
+    cache_control = headers.get('Cache-Control', '').lower()
+    if 'no-store' in cache_control:
+        return None
+    match = MAX_AGE_PATTERN.search(cache_control)
+    if match and 'no-cache' not in cache_control:
+        return time.time() + int(match.group(1))
+    return 0
+
+
+class HTTPCache:
+    """Entradas em <cache_dir>/<hash da URL>.json + .body (zlib)
+
+    Contadores da execução em self.stats:
+    - hits: resposta ainda válida (max-age), nenhuma requisição
+    - revalidated: requisição condicional respondida com 304
+    - unchanged: 200 com o mesmo corpo (hash igual), parsing evitado
+    - reparsed: corpo reaproveitado, mas parseado de novo (chave do parser mudou)
+    - misses: sem entrada ou corpo novo, parsing feito
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.stats = {'hits': 0, 'revalidated': 0, 'unchanged': 0, 'reparsed': 0, 'misses': 0,
+                      'bytes_downloaded': 0, 'bytes_saved': 0, 'parse_seconds': 0.0, 'parse_seconds_saved': 0.0}
+
+    def _path(self, url, suffix):
+        return os.path.join(self.cache_dir, f"{url_key(url)}{suffix}")
+
+    def lookup(self, url):
+        """Entrada guardada para a URL (None se não houver ou se faltar o corpo)"""
+        try:
+            with open(self._path(url, '.json'), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('url') != url or not os.path.exists(self._path(url, '.body')):
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        return bool(entry) and entry.get('expires_at', 0) > time.time()
+
+    def validators(self, entry):
+        """Cabeçalhos da requisição condicional"""
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def read_body(self, entry):
+        with open(self._path(entry['url'], '.body'), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    def _parse(self, body, parse):
+        start_time = time.perf_counter()
+        result = parse(body)
+        parse_seconds = time.perf_counter() - start_time
+        self.stats['parse_seconds'] += parse_seconds
+        return result, parse_seconds
+
+    def _saved(self, entry, downloaded, parse, parser_key, body=None):
+        """Resultado guardado; com outra chave de parser, reparseia o corpo guardado"""
+        if not downloaded:
+            self.stats['bytes_saved'] += entry['size']
+        if entry.get('parser_key') == parser_key:
+            self.stats['parse_seconds_saved'] += entry.get('parse_seconds', 0.0)
+            return entry['result']
+
+        self.stats['reparsed'] += 1
+        result, parse_seconds = self._parse(body if body is not None else self.read_body(entry), parse)
+        entry.update({'parser_key': parser_key, 'parse_seconds': round(parse_seconds, 6), 'result': result})
+        write_json_atomic(self._path(entry['url'], '.json'), entry, indent=None)
+        return result
+
+    def hit(self, entry, parse, parser_key=None):
+        """Resultado de uma entrada ainda válida (sem requisição)"""
+        self.stats['hits'] += 1
+        return self._saved(entry, False, parse, parser_key)
+
+    def resolve(self, url, entry, status, headers, body, parse, parser_key=None):
+        """Resultado da resposta `status` para `url`, parseando só se o corpo mudou
+
+        `entry` é a entrada usada nos cabeçalhos condicionais, `headers` os da
+        resposta e `parse(body)` deve devolver algo serializável em JSON.
+        `parser_key` identifica o parser (versão, parâmetros): resultados
+        guardados por outro parser não são reaproveitados.
+        """
+        if status == 304 and entry:
+            self.stats['revalidated'] += 1
+            self._refresh(entry, headers)
+            return self._saved(entry, False, parse, parser_key)
+
+        self.stats['bytes_downloaded'] += len(body)
+        digest = body_hash(body)
+        if entry and entry['body_hash'] == digest:
+            self.stats['unchanged'] += 1
+            self._refresh(entry, headers)
+            return self._saved(entry, True, parse, parser_key, body)
+
+        self.stats['misses'] += 1
+        result, parse_seconds = self._parse(body, parse)
+
+        expires_at = _expires_at(headers)
+        if status == 200 and expires_at is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            write_bytes_atomic(self._path(url, '.body'), zlib.compress(body, 6))
+            write_json_atomic(self._path(url, '.json'), {
+                'url': url,
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+                'expires_at': expires_at,
+                'body_hash': digest,
+                'size': len(body),
+                'stored_at': datetime.now().isoformat(),
+                'parser_key': parser_key,
+                'parse_seconds': round(parse_seconds, 6),
+                'result': result
+            }, indent=None)
+        return result
+
+    def _refresh(self, entry, headers):
+        """Atualiza validadores e validade após confirmar que o corpo não mudou"""
+        expires_at = _expires_at(headers)
+        entry.update({
+            'etag': headers.get('ETag') or entry.get('etag'),
+            'last_modified': headers.get('Last-Modified') or entry.get('last_modified'),
+            'expires_at': expires_at or 0
+        })
+        write_json_atomic(self._path(entry['url'], '.json'), entry, indent=None)
+
+    def log_summary(self, label="Cache HTTP"):
+        stats = self.stats
+        logger.info(
+            f"🗄️  {label}: {stats['hits']} hits, {stats['revalidated']} revalidações (304), "
+            f"{stats['unchanged']} corpos inalterados, {stats['reparsed']} reparseados, {stats['misses']} misses; "
+            f"{stats['bytes_downloaded'] / 1024:.0f} KB baixados, {stats['bytes_saved'] / 1024:.0f} KB e "
+            f"{stats['parse_seconds_saved']:.3f}s de parsing economizados"
+        )
+
+    def clear(self):
+        """Apaga todas as entradas; retorna quantas havia"""
+        removed = 0
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.json'):
+                    removed += 1
+                os.remove(os.path.join(self.cache_dir, name))
+        return removed
+
+    def entries(self):
+        """Metadados das entradas (sem o resultado do parsing)"""
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for name in sorted(os.listdir(self.cache_dir)):
+                if not name.endswith('.json'):
+                    continue
+                try:
+                    with open(os.path.join(self.cache_dir, name), 'r', encoding='utf-8') as f:
+                        entry = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                entry.pop('result', None)
+                entries.append(entry)
+        return entries
+
+
+def main():
+    """python3 http_cache.py [--list|--clear]"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = sys.argv[1:]
+    cache = HTTPCache()
+
+    if args == ['--list']:
+        for entry in cache.entries():
+            print(f"{entry['stored_at']}  {entry['size']:>8} B  etag={entry.get('etag')}  parser={entry.get('parser_key')}  {entry['url']}")
+        success = True
+    elif args == ['--clear']:
+        print(f"{cache.clear()} entrada(s) removida(s)")
+        success = True
+    else:
+        print("Uso: python3 http_cache.py [--list|--clear]")
+        success = False
+
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,19 +8,27 @@ Detecta mudanças no JSON e faz deploy usando o sistema NextJS existente
 import os
 import sys
 import json
-import hashlib
 import subprocess
 import time
 import logging
+import importlib
+import threading
 from datetime import datetime
 from pathlib import Path
 
+from change_detection import calculate_file_hash
+from rebuild_coordinator import RebuildCoordinator
+from rebuild_daemon import delegate, send_command
+from release_manager import ReleaseManager
+from server_supervisor import SUPERVISOR_SOCKET, request_deploy, start_supervisor_process, wait_for_deploy
+
 # Configurações
 PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
 APP_DIR = f"{PROJECT_ROOT}/app"
 JSON_FILE = f"{APP_DIR}/public/dashboard_data.json"
-HASH_FILE = f"{PROJECT_ROOT}/monitoring_system/rebuild_state.json"
 LOG_DIR = f"{PROJECT_ROOT}/monitoring_system/logs"
+HOSTED_TOOLS_PATH = "/opt/hostedapp"
+TOOL_TIMEOUT_SECONDS = 600  # mesmo limite do antigo subprocesso por ferramenta
 
 # Configurar logging
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -37,48 +45,82 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Ferramentas integradas já importadas neste processo: (módulo, função) -> função
+_loaded_tools = {}
+# Chamadas que estouraram o prazo e ainda rodam na thread de trabalho
+_running_tools = set()
+_running_lock = threading.Lock()
+
+def load_tool(module_name, function_name):
+    """Importa uma ferramenta de /opt/hostedapp/tools uma única vez por processo"""
+    key = (module_name, function_name)
+    if key not in _loaded_tools:
+        if HOSTED_TOOLS_PATH not in sys.path:
+            sys.path.append(HOSTED_TOOLS_PATH)
+        start_time = time.time()
+        module = importlib.import_module(f"tools.{module_name}")
+        _loaded_tools[key] = getattr(module, function_name)
+        logger.info(f"Ferramenta {module_name} carregada em {time.time() - start_time:.2f}s")
+    return _loaded_tools[key]
+
+def run_tool(name, tool, args, timeout=TOOL_TIMEOUT_SECONDS):
+    """Roda a ferramenta em uma thread de trabalho e desiste após `timeout` segundos
+
+    Sem chdir: o diretório de trabalho é do processo inteiro (daemon com
+    várias threads); as ferramentas recebem o caminho absoluto do projeto.
+    Uma chamada que estourou o prazo não pode ser interrompida, então a mesma
+    ferramenta não é chamada de novo enquanto ela não terminar.
+    """
+    with _running_lock:
+        if name in _running_tools:
+            raise RuntimeError(f"chamada anterior de {name} ainda em execução (timeout)")
+        _running_tools.add(name)
+
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = tool(*args)
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            with _running_lock:
+                _running_tools.discard(name)
+
+    worker = threading.Thread(target=target, name=f"tool-{name}", daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        raise TimeoutError(f"{name} não terminou em {timeout}s")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
+
 class IntegratedDeploySystem:
     def __init__(self):
         self.project_root = PROJECT_ROOT
         self.app_dir = APP_DIR
         self.json_file = JSON_FILE
-        self.hash_file = HASH_FILE
+        self.coordinator = RebuildCoordinator()
+        self.releases = ReleaseManager()
+        self.tool_results = []
         
     def calculate_file_hash(self, file_path):
-        """Calcula hash MD5 do arquivo para detectar mudanças"""
-        try:
-            with open(file_path, 'rb') as f:
-                content = f.read()
-                return hashlib.md5(content).hexdigest()
-        except FileNotFoundError:
-            logger.warning(f"Arquivo não encontrado: {file_path}")
-            return None
-        except Exception as e:
-            logger.error(f"Erro ao calcular hash: {e}")
-            return None
+        """Calcula hash do conteúdo (só relê o arquivo quando o stat muda)"""
+        return calculate_file_hash(file_path)
     
     def get_rebuild_state(self):
-        """Obtém o estado atual do rebuild"""
-        try:
-            if os.path.exists(self.hash_file):
-                with open(self.hash_file, 'r') as f:
-                    return json.load(f)
-            return {}
-        except Exception as e:
-            logger.error(f"Erro ao ler estado do rebuild: {e}")
+        """Obtém o estado atual do rebuild (estado unificado do coordenador)"""
+        last_hash = self.coordinator.get_last_hash('deploy')
+        if not last_hash:
             return {}
+        entry = self.coordinator.load_state().get('hashes', {}).get('deploy', {})
+        return {'last_hash': last_hash, 'last_rebuild': entry.get('updated_at', 'N/A')}
     
     def save_rebuild_state(self, hash_value):
         """Salva o estado atual do rebuild"""
         try:
-            state = {
-                "last_hash": hash_value,
-                "last_check": datetime.now().isoformat(),
-                "last_rebuild": datetime.now().isoformat()
-            }
-            with open(self.hash_file, 'w') as f:
-                json.dump(state, f, indent=2)
-            logger.info(f"Estado do rebuild salvo: {hash_value}")
+            self.coordinator.record_hash(hash_value, 'deploy')
         except Exception as e:
             logger.error(f"Erro ao salvar estado: {e}")
     
@@ -146,19 +188,33 @@ class IntegratedDeploySystem:
         except Exception as e:
             logger.warning(f"Erro ao encerrar servidores: {e}")
     
+    def call_tool(self, module_name, function_name, *args):
+        """Chama uma ferramenta integrada no próprio processo (com prazo)
+        
+        Retorna {'tool', 'success', 'result', 'error', 'seconds'}; o resultado
+        também fica em self.tool_results para o log do deploy.
+        """
+        start_time = time.time()
+        outcome = {'tool': function_name, 'success': False, 'result': None, 'error': None}
+        try:
+            tool = load_tool(module_name, function_name)
+            outcome['result'] = run_tool(function_name, tool, args)
+            outcome['success'] = outcome['result'] is not False
+        except Exception as e:
+            logger.error(f"Erro na ferramenta {function_name}: {e}")
+            outcome['error'] = str(e)
+        outcome['seconds'] = round(time.time() - start_time, 2)
+        self.tool_results.append(outcome)
+        logger.info(f"🧰 {function_name}: {'ok' if outcome['success'] else 'falhou'} em {outcome['seconds']:.2f}s")
+        return outcome
+    
     def test_nextjs_project(self):
         """Testa o projeto NextJS usando a ferramenta integrada"""
         logger.info("=== TESTANDO PROJETO NEXTJS ===")
         
-        # Usar a ferramenta de teste integrada
-        test_command = f"cd {self.project_root} && python3 -c \""
-        test_command += "import sys; sys.path.append('/opt/hostedapp'); "
-        test_command += "from tools.test_nextjs_project import test_nextjs_project; "
-        test_command += f"test_nextjs_project('{self.project_root}')\""
+        outcome = self.call_tool('test_nextjs_project', 'test_nextjs_project', self.project_root)
         
-        success, output = self.run_command(test_command, cwd=None, timeout=600)
-        
-        if success:
+        if outcome['success']:
             logger.info("Teste do projeto NextJS concluído com sucesso")
             return True
         else:
@@ -169,59 +225,54 @@ class IntegratedDeploySystem:
         """Faz build e salva checkpoint usando a ferramenta integrada"""
         logger.info("=== FAZENDO BUILD E CHECKPOINT ===")
         
-        # Usar a ferramenta de checkpoint integrada
         timestamp = datetime.now().strftime("%H:%M")
-        checkpoint_command = f"cd {self.project_root} && python3 -c \""
-        checkpoint_command += "import sys; sys.path.append('/opt/hostedapp'); "
-        checkpoint_command += "from tools.build_and_save_nextjs_project_checkpoint import build_and_save_nextjs_project_checkpoint; "
-        checkpoint_command += f"build_and_save_nextjs_project_checkpoint('{self.project_root}', 'Dashboard atualizado - {timestamp}')\""
-        
-        success, output = self.run_command(checkpoint_command, cwd=None, timeout=600)
+        outcome = self.call_tool(
+            'build_and_save_nextjs_project_checkpoint',
+            'build_and_save_nextjs_project_checkpoint',
+            self.project_root,
+            f"Dashboard atualizado - {timestamp}"
+        )
         
-        if success:
+        if outcome['success']:
             logger.info("Build e checkpoint concluídos com sucesso")
             return True
         else:
             logger.error("Falha no build e checkpoint")
             return False
     
-    def start_dev_server(self):
-        """Inicia o servidor de desenvolvimento"""
-        logger.info("=== INICIANDO SERVIDOR DE DESENVOLVIMENTO ===")
+    def start_production_server(self):
+        """Publica o novo build com `next start` em blue/green, sem downtime"""
+        logger.info("=== PUBLICANDO SERVIDOR DE PRODUÇÃO (BLUE/GREEN) ===")
         
-        # Matar servidores existentes
-        self.kill_existing_servers()
-        
-        # Iniciar novo servidor em background
         try:
-            process = subprocess.Popen(
-                ["yarn", "dev"],
-                cwd=self.app_dir,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            
-            # Aguardar alguns segundos para o servidor inicializar
-            time.sleep(5)
+            if send_command('ping', socket_path=SUPERVISOR_SOCKET, timeout=1):
+                result = request_deploy()
+            else:
+                # Primeira execução: liberar a porta 3000 do antigo servidor de desenvolvimento
+                self.kill_existing_servers()
+                if not start_supervisor_process():
+                    logger.error("❌ Supervisor do servidor não iniciou")
+                    return False
+                # O supervisor faz o deploy inicial ao subir
+                result = wait_for_deploy()
             
-            # Verificar se o servidor está rodando
-            if process.poll() is None:
-                logger.info("✅ Servidor de desenvolvimento iniciado com sucesso!")
+            if result and result.get('success'):
+                logger.info(f"✅ Servidor de produção ({result['color']}) pronto em {result['ready_seconds']}s, troca em {result['switch_ms']} ms")
                 logger.info("🌐 Dashboard disponível em: http://localhost:3000")
                 return True
             else:
-                logger.error("❌ Falha ao iniciar servidor de desenvolvimento")
+                logger.error(f"❌ Falha ao publicar servidor de produção: {result}")
                 return False
                 
         except Exception as e:
-            logger.error(f"Erro ao iniciar servidor: {e}")
+            logger.error(f"Erro ao publicar servidor: {e}")
             return False
     
     def perform_integrated_deploy(self):
         """Executa o processo completo de deploy integrado"""
         logger.info("🚀 INICIANDO DEPLOY INTEGRADO")
         start_time = time.time()
+        self.tool_results = []
         
         try:
             # 1. Testar projeto NextJS
@@ -234,20 +285,28 @@ class IntegratedDeploySystem:
                 logger.error("❌ Falha no build/checkpoint - abortando deploy")
                 return False
             
-            # 3. Iniciar servidor
-            if not self.start_dev_server():
+            # 3. Release imutável do build (o supervisor é acionado no passo 4)
+            try:
+                self.releases.deploy(f"{self.app_dir}/.next", notify=False)
+            except Exception as e:
+                logger.error(f"❌ Falha ao ativar release: {e}")
+                return False
+            
+            # 4. Publicar servidor (blue/green)
+            if not self.start_production_server():
                 logger.warning("⚠️  Falha ao iniciar servidor, mas deploy foi concluído")
             
-            # 4. Atualizar hash
+            # 5. Atualizar hash
             current_hash = self.calculate_file_hash(self.json_file)
             if current_hash:
                 self.save_rebuild_state(current_hash)
             
-            # 5. Log de sucesso
+            # 6. Log de sucesso
             elapsed_time = time.time() - start_time
             
             logger.info("✅ DEPLOY INTEGRADO CONCLUÍDO COM SUCESSO!")
             logger.info(f"⏱️  Tempo total: {elapsed_time:.2f} segundos")
+            logger.info("⏱️  Ferramentas: " + ", ".join(f"{r['tool']}={r['seconds']:.2f}s" for r in self.tool_results))
             logger.info("🎯 Dashboard local e deployed sincronizados!")
             
             return True
@@ -262,9 +321,11 @@ class IntegratedDeploySystem:
         
         if self.has_file_changed():
             logger.info("📝 Mudança detectada - iniciando deploy integrado...")
-            success = self.perform_integrated_deploy()
+            success = self.coordinator.request(self.perform_integrated_deploy, 'integrated_deploy', kind='deploy')['success']
             
-            if success:
+            if success is None:
+                return None
+            elif success:
                 logger.info("✅ Sistema sincronizado com sucesso!")
                 return True
             else:
@@ -277,7 +338,9 @@ class IntegratedDeploySystem:
     def force_deploy(self):
         """Força um deploy independente de mudanças"""
         logger.info("🔄 DEPLOY FORÇADO INICIADO")
-        return self.perform_integrated_deploy()
+        return self.coordinator.request(
+            self.perform_integrated_deploy, 'integrated_deploy --force', kind='deploy', force=True
+        )['success']
     
     def get_status(self):
         """Obtém status do sistema"""
@@ -299,6 +362,13 @@ class IntegratedDeploySystem:
             if state:
                 logger.info(f"🔄 Último rebuild: {state.get('last_rebuild', 'N/A')}")
                 logger.info(f"🔍 Último hash: {state.get('last_hash', 'N/A')}")
+            self.coordinator.log_status()
+            
+            # Instância ativa do supervisor blue/green
+            supervisor = send_command('status', socket_path=SUPERVISOR_SOCKET, timeout=5)
+            if supervisor and supervisor['status']['active']:
+                active = supervisor['status']['active']
+                logger.info(f"🔀 Instância ativa: {active['color']} (porta {active['port']}, {active['connections']} conexões)")
             
             # Verificar se servidor está rodando
             try:
@@ -317,8 +387,21 @@ class IntegratedDeploySystem:
             logger.error(f"Erro ao verificar status: {e}")
             return False
 
+def coordinated_action(force=False):
+    """Deploy integrado executado pelo coordenador para gatilhos de outros processos"""
+    return IntegratedDeploySystem().perform_integrated_deploy
+
 def main():
     """Função principal"""
+    # Com o daemon rodando, as ferramentas já estão importadas nele
+    if len(sys.argv) == 1 or sys.argv[1] == '--force':
+        if len(sys.argv) > 1:
+            delegated = delegate('trigger', 'deploy', 'integrated_deploy --force')
+        else:
+            delegated = delegate('check', 'deploy', 'integrated_deploy', wait=False)
+        if delegated is not None:
+            sys.exit(0 if delegated else 1)
+    
     system = IntegratedDeploySystem()
     
     # Verificar argumentos
@@ -337,7 +420,10 @@ def main():
         logger.info("Modo: Monitoramento automático")
         success = system.monitor_and_deploy()
     
-    if success:
+    if success is None:
+        logger.info("⏳ Outro rebuild em andamento - gatilho na fila, será executado ao fim dele")
+        sys.exit(0)
+    elif success:
         logger.info("🎉 Operação concluída com sucesso!")
         sys.exit(0)
     else:
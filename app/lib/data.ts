@@ -29,6 +29,28 @@ export interface DashboardData {
   details: Record<string, CategoryData>;
 }
 
+// One detail file per category, published next to the summary (public/data/details/)
+export interface ShardInfo {
+  id: string;
+  file: string;
+  hash: string;
+  bytes: number;
+  records: number;
+}
+
+// First-paint document: counts and chart only, details are fetched per category
+export interface DashboardSummary {
+  metadata: DashboardData['metadata'];
+  chart_data: ChartDataItem[];
+  shards: Record<string, ShardInfo>;
+  // Accent-folded prefix index of this version (lib/search-index.ts)
+  search_index?: { file: string; hash: string; bytes: number };
+}
+
+export interface CategoryShard extends CategoryData {
+  categoria: string;
+}
+
 export function formatDate(dateString: string): string {
   try {
     const date = new Date(dateString);
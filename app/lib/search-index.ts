@@ -0,0 +1,172 @@
+// Prefix search over the index published with each data version (search_index.py)
+
+export interface SearchIndexFile {
+  fields: string[];
+  categories: string[];
+  // Records of category i are offsets[i] .. offsets[i + 1] - 1, in shard order
+  offsets: number[];
+  // Sorted, accent-folded tokens; postings[i] holds delta-encoded record ids of tokens[i]
+  tokens: string[];
+  postings: number[][];
+}
+
+export interface SearchIndex {
+  categories: string[];
+  offsets: number[];
+  tokens: string[];
+  postings: Uint32Array[];
+  recordCount: number;
+}
+
+const TOKEN_PATTERN = /[a-z0-9]+/g;
+
+// Every combining mark (Unicode category M), same class as fold_text in Python
+const MARK_PATTERN = /\p{M}/gu;
+
+/** Lowercase without accents ("Ângelo" → "angelo"), same rule as fold_text in Python */
+export function foldText(text: string): string {
+  return (text || '').normalize('NFKD').replace(MARK_PATTERN, '').toLowerCase();
+}
+
+export function tokenize(text: string): string[] {
+  return foldText(text).match(TOKEN_PATTERN) || [];
+}
+
+export function decodeSearchIndex(file: SearchIndexFile): SearchIndex {
+  const postings = file.postings.map((deltas) => {
+    const ids = new Uint32Array(deltas.length);
+    let id = 0;
+    deltas.forEach((delta, position) => {
+      id += delta;
+      ids[position] = id;
+    });
+    return ids;
+  });
+  return {
+    categories: file.categories,
+    offsets: file.offsets,
+    tokens: file.tokens,
+    postings,
+    recordCount: file.offsets[file.offsets.length - 1] || 0
+  };
+}
+
+function lowerBound(tokens: string[], term: string): number {
+  let low = 0;
+  let high = tokens.length;
+  while (low < high) {
+    const middle = (low + high) >>> 1;
+    if (tokens[middle] < term) {
+      low = middle + 1;
+    } else {
+      high = middle;
+    }
+  }
+  return low;
+}
+
+function unionPostings(lists: Uint32Array[]): Uint32Array {
+  if (lists.length === 1) return lists[0];
+  const merged = new Uint32Array(lists.reduce((total, list) => total + list.length, 0));
+  let offset = 0;
+  lists.forEach((list) => {
+    merged.set(list, offset);
+    offset += list.length;
+  });
+  merged.sort();
+  let size = 0;
+  for (let position = 0; position < merged.length; position++) {
+    if (size === 0 || merged[position] !== merged[size - 1]) {
+      merged[size++] = merged[position];
+    }
+  }
+  return merged.subarray(0, size);
+}
+
+function intersectPostings(left: Uint32Array, right: Uint32Array): Uint32Array {
+  const result = new Uint32Array(Math.min(left.length, right.length));
+  let size = 0;
+  let i = 0;
+  let j = 0;
+  while (i < left.length && j < right.length) {
+    if (left[i] < right[j]) {
+      i++;
+    } else if (left[i] > right[j]) {
+      j++;
+    } else {
+      result[size++] = left[i];
+      i++;
+      j++;
+    }
+  }
+  return result.subarray(0, size);
+}
+
+/** First position in sorted `ids` whose value is >= `value` */
+function lowerBoundId(ids: Uint32Array, value: number): number {
+  let low = 0;
+  let high = ids.length;
+  while (low < high) {
+    const middle = (low + high) >>> 1;
+    if (ids[middle] < value) {
+      low = middle + 1;
+    } else {
+      high = middle;
+    }
+  }
+  return low;
+}
+
+/**
+ * Records where every query word is the prefix of an indexed word.
+ * Returns the sorted matched record ids; the work is proportional to the
+ * posting lists touched, not to the number of records.
+ */
+export function searchRecords(index: SearchIndex, query: string): Uint32Array {
+  const terms = Array.from(new Set(tokenize(query)));
+  if (terms.length === 0) return new Uint32Array(0);
+
+  // Ids per term (union over every token with that prefix), smallest first
+  const perTerm = terms.map((term) => {
+    const lists: Uint32Array[] = [];
+    for (let position = lowerBound(index.tokens, term); position < index.tokens.length; position++) {
+      if (!index.tokens[position].startsWith(term)) break;
+      lists.push(index.postings[position]);
+    }
+    return lists;
+  });
+  if (perTerm.some((lists) => lists.length === 0)) return new Uint32Array(0);
+  const sizes = perTerm.map((lists) => lists.reduce((total, list) => total + list.length, 0));
+  const order = perTerm.map((_lists, position) => position).sort((a, b) => sizes[a] - sizes[b]);
+
+  let result = unionPostings(perTerm[order[0]]);
+  for (let position = 1; position < order.length && result.length > 0; position++) {
+    result = intersectPostings(result, unionPostings(perTerm[order[position]]));
+  }
+  return result;
+}
+
+/** Matches per category, in index order (categories without matches are omitted) */
+export function countMatches(index: SearchIndex, matches: Uint32Array): Record<string, number> {
+  const counts: Record<string, number> = {};
+  let position = 0;
+  for (const id of matches) {
+    while (id >= index.offsets[position + 1]) position++;
+    const category = index.categories[position];
+    counts[category] = (counts[category] || 0) + 1;
+  }
+  return counts;
+}
+
+/** Positions inside the category's shard that matched */
+export function matchedPositions(index: SearchIndex, matches: Uint32Array, category: string): Set<number> {
+  const positions = new Set<number>();
+  const position = index.categories.indexOf(category);
+  if (position < 0) return positions;
+  const start = index.offsets[position];
+  const end = index.offsets[position + 1];
+  for (let i = lowerBoundId(matches, start); i < matches.length && matches[i] < end; i++) {
+    positions.add(matches[i] - start);
+  }
+  return positions;
+}
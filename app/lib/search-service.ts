@@ -0,0 +1,84 @@
+import { createConnection } from 'net';
+import { join } from 'path';
+
+// Unix socket of search_service.py (next to the app directory, like the other daemons)
+const SOCKET_PATH = process.env.SEARCH_SERVICE_SOCKET || join(process.cwd(), '..', '.search_service.sock');
+const REQUEST_TIMEOUT_MS = 5000;
+
+export interface SearchFacet {
+  categoria: string;
+  count: number;
+}
+
+export interface SearchResult {
+  categoria: string;
+  numero: string;
+  descricao: string;
+  rua: string;
+  pdfUrl: string | null;
+  rank: number;
+}
+
+export interface SearchResponse {
+  query: string;
+  category: string | null;
+  page: number;
+  page_size: number;
+  pages: number;
+  total: number;
+  ranked: boolean;
+  facets: SearchFacet[];
+  results: SearchResult[];
+  version: string | null;
+  took_ms: number;
+}
+
+export interface SearchParams {
+  query: string;
+  category?: string | null;
+  page?: number;
+  pageSize?: number;
+}
+
+export class SearchServiceUnavailable extends Error {}
+
+/** Sends one JSON-line request to the search service and resolves with its reply */
+export function querySearchService(params: SearchParams): Promise<SearchResponse> {
+  return new Promise((resolve, reject) => {
+    const socket = createConnection(SOCKET_PATH);
+    let buffer = '';
+
+    socket.setTimeout(REQUEST_TIMEOUT_MS, () => {
+      socket.destroy(new SearchServiceUnavailable('Search service timed out'));
+    });
+    socket.on('connect', () => {
+      socket.write(JSON.stringify({
+        command: 'search',
+        query: params.query,
+        category: params.category || null,
+        page: params.page || 1,
+        page_size: params.pageSize
+      }) + '\n');
+    });
+    socket.on('data', (chunk) => {
+      buffer += chunk.toString('utf8');
+      const newline = buffer.indexOf('\n');
+      if (newline < 0) return;
+      socket.end();
+      try {
+        const response = JSON.parse(buffer.slice(0, newline));
+        if (!response.ok) {
+          reject(new Error(response.error || 'Search failed'));
+          return;
+        }
+        const { ok: _ok, ...result } = response;
+        resolve(result as SearchResponse);
+      } catch (error) {
+        reject(error);
+      }
+    });
+    socket.on('error', (error) => {
+      reject(error instanceof SearchServiceUnavailable ? error : new SearchServiceUnavailable(error.message));
+    });
+  });
+}
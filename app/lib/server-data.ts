@@ -1,6 +1,8 @@
 
-import { readFileSync } from 'fs';
+import { readFileSync, statSync, watch, FSWatcher } from 'fs';
 import { join } from 'path';
+import { NextRequest, NextResponse } from 'next/server';
+import type { DashboardSummary, ShardInfo } from './data';
 
 export interface IndicacaoData {
   numero: string;
@@ -31,33 +33,333 @@ export interface DashboardData {
   details: Record<string, CategoryData>;
 }
 
-export async function loadDashboardData(): Promise<DashboardData | null> {
+const PUBLIC_DIR = join(process.cwd(), 'public');
+const DATA_FILE = join(PUBLIC_DIR, 'dashboard_data.json');
+// Written by the Python pipeline after each publish (data_publisher.py)
+const MANIFEST_FILE_NAME = 'dashboard_data.manifest.json';
+const MANIFEST_FILE = join(PUBLIC_DIR, MANIFEST_FILE_NAME);
+
+export type ContentEncoding = 'br' | 'gzip';
+
+// Pre-compressed variants written next to a published file (e.g. dashboard_data.json.br)
+type EncodingEntries = Partial<Record<ContentEncoding, { file: string; bytes: number }>>;
+
+interface PublishedEntry {
+  // Relative to public/
+  file: string;
+  hash: string;
+  bytes: number;
+  encodings?: EncodingEntries;
+}
+
+export interface DataManifest {
+  version: string;
+  hash: string;
+  bytes: number;
+  records: number;
+  categories: number;
+  encodings?: EncodingEntries;
+  // data/summary.json, which in turn lists the per-category detail files
+  summary?: PublishedEntry;
+  published_at: string;
+}
+
+type PublishedShard = ShardInfo & { encodings?: EncodingEntries };
+
+// Preferred first: brotli is smaller, gzip is understood everywhere
+const ENCODING_PREFERENCE: ContentEncoding[] = ['br', 'gzip'];
+
+// Bytes served as-is, so the compressed variants always match them
+export interface PublishedBody {
+  etag: string;
+  raw: Buffer;
+  encoded: Partial<Record<ContentEncoding, Buffer>>;
+}
+
+export interface DataSnapshot extends PublishedBody {
+  key: string;
+  version: string;
+  manifest: DataManifest | null;
+  data: DashboardData;
+  lastModified: number;
+  loadedAt: number;
+  summary: PublishedBody;
+  summaryData: DashboardSummary;
+}
+
+// Parsed data shared by every request until a new version is published
+let snapshot: DataSnapshot | null = null;
+// Shards and search index by file; an entry stays valid while its hash is unchanged across versions
+const publishedCache = new Map<string, PublishedBody>();
+let watcher: FSWatcher | null = null;
+let watchUnavailable = false;
+
+function currentVersionKey(): string {
+  // Two stats per request: writers that bypass the pipeline still invalidate the snapshot
+  return [MANIFEST_FILE, DATA_FILE]
+    .map((file) => {
+      try {
+        const stats = statSync(file);
+        return `${stats.ino}:${stats.mtimeMs}:${stats.size}`;
+      } catch {
+        return '-';
+      }
+    })
+    .join('|');
+}
+
+function readManifest(): DataManifest | null {
   try {
-    // Read file from public directory
-    const filePath = join(process.cwd(), 'public', 'dashboard_data.json');
-    
-    // Add cache busting by checking file modification time
-    const fs = require('fs');
-    const stats = fs.statSync(filePath);
-    const lastModified = stats.mtime.getTime();
-    
-    console.log(`Loading dashboard data (last modified: ${new Date(lastModified).toISOString()})`);
-    
-    const fileContents = readFileSync(filePath, 'utf8');
-    const data: DashboardData = JSON.parse(fileContents);
-    
-    // Add metadata about file freshness
-    const dataWithMeta = {
-      ...data,
-      _meta: {
-        lastModified: lastModified,
-        loadedAt: Date.now()
+    return JSON.parse(readFileSync(MANIFEST_FILE, 'utf8'));
+  } catch {
+    return null;
+  }
+}
+
+function readVariants(encodings: EncodingEntries | undefined): Partial<Record<ContentEncoding, Buffer>> {
+  const encoded: Partial<Record<ContentEncoding, Buffer>> = {};
+  for (const encoding of ENCODING_PREFERENCE) {
+    const entry = encodings?.[encoding];
+    if (!entry) continue;
+    try {
+      const body = readFileSync(join(PUBLIC_DIR, entry.file));
+      // A size mismatch means the variant belongs to another version
+      if (body.length === entry.bytes) {
+        encoded[encoding] = body;
       }
-    };
-    
-    return dataWithMeta;
-  } catch (error) {
-    console.error('Error loading dashboard data:', error);
+    } catch {
+      // Missing variant: this encoding is simply not offered
+    }
+  }
+  return encoded;
+}
+
+function loadSnapshot(key: string): DataSnapshot {
+  const manifest = readManifest();
+  const stats = statSync(DATA_FILE);
+  const raw = readFileSync(DATA_FILE);
+  const data: DashboardData = JSON.parse(raw.toString('utf8'));
+
+  // The manifest only describes this file if the byte size matches
+  const current = manifest && manifest.bytes === raw.length ? manifest : null;
+  const version = current?.version || `${stats.ino.toString(16)}-${stats.mtimeMs.toString(16)}-${stats.size.toString(16)}`;
+  const etag = current ? `"${current.hash}"` : `W/"${version}"`;
+  const encoded = readVariants(current?.encodings);
+  const summary = (current?.summary && readPublished(current.summary)) || deriveSummary(data, version);
+
+  console.log(`Dashboard data snapshot loaded (version ${version}, encodings: ${Object.keys(encoded).join(', ') || 'none'}, last modified: ${stats.mtime.toISOString()})`);
+
+  return {
+    key,
+    version,
+    etag,
+    manifest: current,
+    data,
+    lastModified: stats.mtime.getTime(),
+    loadedAt: Date.now(),
+    raw,
+    encoded,
+    summary,
+    summaryData: JSON.parse(summary.raw.toString('utf8'))
+  };
+}
+
+function readPublished(entry: PublishedEntry): PublishedBody | null {
+  try {
+    const raw = readFileSync(join(PUBLIC_DIR, entry.file));
+    // Another size means the file was already replaced by a newer publish
+    if (raw.length !== entry.bytes) return null;
+    return { etag: `"${entry.hash}"`, raw, encoded: readVariants(entry.encodings) };
+  } catch {
     return null;
   }
 }
+
+function shardIdFor(category: string, used: Set<string>): string {
+  // Same scheme as data_shards.py
+  const base = category
+    .normalize('NFKD')
+    .replace(/[\u0300-\u036f]/g, '')
+    .toLowerCase()
+    .replace(/[^a-z0-9]+/g, '-')
+    .replace(/^-+|-+$/g, '') || 'categoria';
+  let id = base;
+  for (let suffix = 2; used.has(id); suffix++) {
+    id = `${base}-${suffix}`;
+  }
+  used.add(id);
+  return id;
+}
+
+/**
+ * Summary built in memory when the pipeline has not published one for this
+ * file (e.g. it was edited by hand); its shards are served from the snapshot.
+ */
+function deriveSummary(data: DashboardData, version: string): PublishedBody {
+  const used = new Set<string>();
+  const shards: Record<string, ShardInfo> = {};
+  for (const [category, categoryData] of Object.entries(data.details || {})) {
+    const id = shardIdFor(category, used);
+    shards[category] = { id, file: '', hash: `${version}-${id}`, bytes: 0, records: categoryData?.indicacoes?.length || 0 };
+  }
+  const summary: DashboardSummary = { metadata: data.metadata, chart_data: data.chart_data, shards };
+  return { etag: `W/"${version}-summary"`, raw: Buffer.from(JSON.stringify(summary)), encoded: {} };
+}
+
+function ensureWatcher() {
+  if (watcher || watchUnavailable) return;
+  try {
+    // Reload as soon as a new version is announced, before the next request arrives
+    watcher = watch(PUBLIC_DIR, (_event, filename) => {
+      if (filename === MANIFEST_FILE_NAME) {
+        getDataSnapshot();
+      }
+    });
+    watcher.unref();
+  } catch (error) {
+    watchUnavailable = true;
+    console.warn('Data manifest watcher unavailable, checking on each request:', error);
+  }
+}
+
+export function getDataSnapshot(): DataSnapshot | null {
+  ensureWatcher();
+  const key = currentVersionKey();
+  if (!snapshot || snapshot.key !== key) {
+    try {
+      snapshot = loadSnapshot(key);
+    } catch (error) {
+      // Keep serving the previous snapshot if the new one cannot be read
+      console.error('Error loading dashboard data:', error);
+    }
+  }
+  return snapshot;
+}
+
+function withMeta(current: DataSnapshot) {
+  // Add metadata about file freshness
+  return {
+    ...current.data,
+    _meta: {
+      lastModified: current.lastModified,
+      loadedAt: current.loadedAt,
+      version: current.version
+    }
+  };
+}
+
+export async function loadDashboardData(): Promise<DashboardData | null> {
+  const current = getDataSnapshot();
+  return current ? (withMeta(current) as DashboardData) : null;
+}
+
+export async function loadDashboardSummary(): Promise<DashboardSummary | null> {
+  return getDataSnapshot()?.summaryData ?? null;
+}
+
+function readCachedPublished(entry: PublishedEntry): PublishedBody | null {
+  const cached = publishedCache.get(entry.file);
+  if (cached && cached.etag === `"${entry.hash}"`) return cached;
+  const published = readPublished(entry);
+  if (published) {
+    publishedCache.set(entry.file, published);
+  }
+  return published;
+}
+
+/** Search index of the current version, or null if the pipeline did not publish one */
+export function getSearchIndexBody(current: DataSnapshot): PublishedBody | null {
+  const entry = current.summaryData.search_index as PublishedEntry | undefined;
+  return entry ? readCachedPublished(entry) : null;
+}
+
+/** Detail file of one category, or null if the id is not in the current summary */
+export function getShardBody(current: DataSnapshot, id: string): PublishedBody | null {
+  const found = Object.entries(current.summaryData.shards).find(([, shard]) => shard.id === id);
+  if (!found) return null;
+  const [category, shard] = found as [string, PublishedShard];
+
+  const published = shard.file ? readCachedPublished(shard) : null;
+  if (published) return published;
+  // Not published (or already replaced on disk): build it from this snapshot
+  const body = JSON.stringify({ categoria: category, ...current.data.details[category] });
+  return { etag: `W/"${current.version}-${id}"`, raw: Buffer.from(body), encoded: {} };
+}
+
+function acceptedEncodings(acceptEncoding: string | null): Set<string> {
+  const accepted = new Set<string>();
+  for (const part of (acceptEncoding || '').split(',')) {
+    const [name, ...params] = part.trim().toLowerCase().split(';');
+    const q = params.map((param) => param.trim()).find((param) => param.startsWith('q='));
+    if (name && !(q && Number(q.slice(2)) === 0)) {
+      accepted.add(name);
+    }
+  }
+  return accepted;
+}
+
+/**
+ * Published bytes for a request: the best pre-compressed variant the client
+ * accepts, or the JSON file itself. Nothing is serialized or compressed here.
+ */
+export function negotiateBody(
+  current: PublishedBody,
+  acceptEncoding: string | null
+): { body: Buffer; encoding: ContentEncoding | null } {
+  const accepted = acceptedEncodings(acceptEncoding);
+  for (const encoding of ENCODING_PREFERENCE) {
+    const body = current.encoded[encoding];
+    if (body && (accepted.has(encoding) || accepted.has('*'))) {
+      return { body, encoding };
+    }
+  }
+  return { body: current.raw, encoding: null };
+}
+
+export function isNotModified(ifNoneMatch: string | null, etag: string): boolean {
+  if (!ifNoneMatch) return false;
+  const opaque = etag.replace(/^W\//, '');
+  return ifNoneMatch
+    .split(',')
+    .map((candidate) => candidate.trim())
+    .some((candidate) => candidate === '*' || candidate.replace(/^W\//, '') === opaque);
+}
+
+export function representationEtag(current: PublishedBody, encoding: ContentEncoding | null): string {
+  // Each encoding is a distinct representation and needs its own strong validator
+  return encoding && !current.etag.startsWith('W/') ? current.etag.replace(/"$/, `-${encoding}"`) : current.etag;
+}
+
+export function dataVersionHeaders(
+  current: DataSnapshot,
+  encoding: ContentEncoding | null = null,
+  body: PublishedBody = current
+): Headers {
+  const headers = new Headers();
+  // Clients may keep a copy but must revalidate it (If-None-Match → 304)
+  headers.set('Cache-Control', 'no-cache');
+  headers.set('Vary', 'Accept-Encoding');
+  headers.set('ETag', representationEtag(body, encoding));
+  headers.set('X-Data-Version', current.version);
+  headers.set('Last-Modified', new Date(current.lastModified).toUTCString());
+  return headers;
+}
+
+/**
+ * Response for a published file (full document, summary or detail shard):
+ * 304 when the client's copy is current, otherwise the pre-compressed bytes.
+ */
+export function publishedResponse(request: NextRequest, current: DataSnapshot, body: PublishedBody = current): NextResponse {
+  const { body: bytes, encoding } = negotiateBody(body, request.headers.get('accept-encoding'));
+  const headers = dataVersionHeaders(current, encoding, body);
+  if (isNotModified(request.headers.get('if-none-match'), headers.get('etag')!)) {
+    return new NextResponse(null, { status: 304, headers });
+  }
+
+  headers.set('Content-Type', 'application/json');
+  if (encoding) {
+    headers.set('Content-Encoding', encoding);
+  }
+  headers.set('Content-Length', String(bytes.length));
+  return new NextResponse(bytes, { status: 200, headers });
+}
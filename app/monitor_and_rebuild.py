@@ -6,19 +6,26 @@ Detecta mudanças no dashboard_data.json e triggera rebuild quando necessário
 
 import os
 import sys
-import hashlib
-import subprocess
 import logging
 from datetime import datetime
 from pathlib import Path
 
+from change_detection import calculate_file_hash
+from rebuild_coordinator import RebuildCoordinator
+from rebuild_daemon import delegate
+
 # Configurações
 PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
 APP_DIR = f"{PROJECT_ROOT}/app"
 JSON_FILE = f"{APP_DIR}/public/dashboard_data.json"
-HASH_FILE = f"{PROJECT_ROOT}/.last_json_hash"
+SAPL_IDS_FILE = f"{PROJECT_ROOT}/sapl_document_ids.json"
 LOG_DIR = f"{PROJECT_ROOT}/.logs"
 
+# Modo observador (--watch)
+WATCHED_FILES = [JSON_FILE, SAPL_IDS_FILE]
+WATCH_DEBOUNCE_SECONDS = 0.5
+WATCH_POLL_INTERVAL = 2.0
+
 # Configurar logging
 os.makedirs(LOG_DIR, exist_ok=True)
 log_file = f"{LOG_DIR}/monitor_{datetime.now().strftime('%Y%m%d')}.log"
@@ -34,32 +41,16 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-def calculate_file_hash(file_path):
-    """Calcula hash MD5 do arquivo"""
-    try:
-        with open(file_path, 'rb') as f:
-            content = f.read()
-            return hashlib.md5(content).hexdigest()
-    except Exception as e:
-        logger.error(f"Erro ao calcular hash: {e}")
-        return None
+coordinator = RebuildCoordinator()
 
 def get_last_hash():
-    """Recupera o último hash salvo"""
-    try:
-        if os.path.exists(HASH_FILE):
-            with open(HASH_FILE, 'r') as f:
-                return f.read().strip()
-    except Exception as e:
-        logger.error(f"Erro ao ler último hash: {e}")
-    return None
+    """Recupera o último hash salvo (estado unificado do coordenador)"""
+    return coordinator.get_last_hash()
 
 def save_hash(hash_value):
     """Salva o hash atual"""
     try:
-        with open(HASH_FILE, 'w') as f:
-            f.write(hash_value)
-        logger.info(f"Hash salvo: {hash_value}")
+        coordinator.record_hash(hash_value)
     except Exception as e:
         logger.error(f"Erro ao salvar hash: {e}")
 
@@ -89,42 +80,63 @@ def has_file_changed():
     return False
 
 def trigger_rebuild():
-    """Triggera o rebuild usando o sistema principal"""
+    """Triggera o rebuild: pelo daemon residente ou no próprio processo"""
     try:
         logger.info("🚀 Triggerando rebuild automático...")
         
-        # Executar o sistema rápido de rebuild
-        result = subprocess.run([
-            'python3', 
-            f'{PROJECT_ROOT}/quick_rebuild_system.py', 
-            '--force'
-        ], 
-        capture_output=True, 
-        text=True,
-        timeout=300  # 5 minutos timeout
-        )
+        delegated = delegate('trigger', 'quick', 'monitor', wait=False)
+        if delegated is not None:
+            return delegated
         
-        if result.returncode == 0:
+        # Sem daemon: rebuild rápido no mesmo interpretador (registra o hash ao concluir)
+        from quick_rebuild_system import QuickRebuildSystem
+        success = QuickRebuildSystem().request_rebuild('monitor')
+        if success is None:
+            logger.info("⏳ Outro rebuild em andamento - gatilho na fila do coordenador")
+            return True
+        elif success:
             logger.info("✅ Rebuild executado com sucesso!")
-            
-            # Atualizar hash após rebuild bem-sucedido
-            current_hash = calculate_file_hash(JSON_FILE)
-            if current_hash:
-                save_hash(current_hash)
-            
             return True
         else:
             logger.error("❌ Falha no rebuild")
-            logger.error(f"Error: {result.stderr}")
             return False
             
-    except subprocess.TimeoutExpired:
-        logger.error("⏰ Timeout no rebuild (30 min)")
-        return False
     except Exception as e:
         logger.error(f"💥 Erro ao executar rebuild: {e}")
         return False
 
+def watch(debounce=WATCH_DEBOUNCE_SECONDS):
+    """Modo contínuo: rebuild disparado por eventos do sistema de arquivos"""
+    from file_watcher import FileWatcher
+    from quick_rebuild_system import QuickRebuildSystem
+
+    system = QuickRebuildSystem()
+
+    def on_change(paths):
+        # Escritas no JSON que não mudam o conteúdo (ex: touch) são ignoradas
+        if paths == [JSON_FILE] and not has_file_changed():
+            logger.info("✅ Evento sem mudança de conteúdo - rebuild ignorado")
+            return
+
+        logger.info("📝 Mudança detectada - iniciando rebuild rápido...")
+        success = system.request_rebuild('watch')
+        if success is None:
+            logger.info("⏳ Outro rebuild em andamento - gatilho na fila do coordenador")
+        elif success:
+            logger.info("🎉 Sistema atualizado com sucesso!")
+        else:
+            logger.error("💥 Falha na atualização do sistema")
+
+    logger.info("🔍 Iniciando observador contínuo de mudanças...")
+    watcher = FileWatcher(
+        WATCHED_FILES,
+        on_change,
+        debounce=debounce,
+        poll_interval=WATCH_POLL_INTERVAL
+    )
+    watcher.run()
+    return True
+
 def main():
     """Função principal de monitoramento"""
     logger.info("🔍 Iniciando monitoramento de mudanças...")
@@ -150,5 +162,9 @@ def main():
         return False
 
 if __name__ == "__main__":
-    success = main()
+    if len(sys.argv) > 1 and sys.argv[1] == '--watch':
+        debounce = float(sys.argv[2]) if len(sys.argv) > 2 else WATCH_DEBOUNCE_SECONDS
+        success = watch(debounce)
+    else:
+        success = main()
     sys.exit(0 if success else 1)
@@ -4,6 +4,8 @@ const path = require('path');
 const nextConfig = {
   distDir: process.env.NEXT_DIST_DIR || '.next',
   output: process.env.NEXT_OUTPUT_MODE,
+  // BUILD_ID fixo por versão do código (definido pelos scripts de rebuild)
+  generateBuildId: async () => process.env.NEXT_BUILD_ID || null,
   experimental: {
     outputFileTracingRoot: path.join(__dirname, '../'),
   },
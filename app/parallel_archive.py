@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Compressão Paralela de Pacotes de Deploy
+Gera o tar em processo e comprime em blocos usando todos os núcleos:
+gzip (membros concatenados, compatível com tar -xzf) ou zstd (opcional)
+"""
+
+import io
+import os
+import sys
+import time
+import zlib
+import tarfile
+import logging
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+DEFAULT_CODEC = "gzip"
+DEFAULT_LEVELS = {'gzip': 6, 'zstd': 3}
+EXTENSIONS = {'gzip': 'tgz', 'zstd': 'tar.zst'}
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def available_codecs():
+    """Codecs suportados neste ambiente"""
+    codecs = ['gzip']
+    try:
+        import zstandard  # noqa: F401
+        codecs.append('zstd')
+    except ImportError:
+        pass
+    return codecs
+
+
+def resolve_codec(codec):
+    """Retorna o codec pedido ou gzip se ele não estiver disponível"""
+    codec = codec or DEFAULT_CODEC
+    if codec not in EXTENSIONS:
+        raise ValueError(f"Codec desconhecido: {codec}")
+    if codec not in available_codecs():
+        logger.warning(f"Codec {codec} indisponível (instale 'zstandard') - usando gzip")
+        return 'gzip'
+    return codec
+
+
+def archive_extension(codec):
+    """Extensão do arquivo gerado pelo codec (ex: tgz)"""
+    return EXTENSIONS[resolve_codec(codec)]
+
+
+def _gzip_member(chunk, level):
+    # wbits=31: cabeçalho gzip completo, cada bloco vira um membro independente
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(chunk) + compressor.flush()
+
+
+class _ParallelGzipWriter(io.RawIOBase):
+    """Arquivo de escrita que comprime blocos em paralelo (estilo pigz)"""
+
+    def __init__(self, output, level, workers):
+        self.output = output
+        self.level = level
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.max_in_flight = workers * 2
+        self.pending = []
+        self.buffer = bytearray()
+        self.bytes_in = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        self.bytes_in += len(data)
+        while len(self.buffer) >= CHUNK_SIZE:
+            self._submit(bytes(self.buffer[:CHUNK_SIZE]))
+            del self.buffer[:CHUNK_SIZE]
+        return len(data)
+
+    def _submit(self, chunk):
+        self.pending.append(self.executor.submit(_gzip_member, chunk, self.level))
+        # Manter a ordem dos blocos e limitar a memória em uso
+        while len(self.pending) >= self.max_in_flight:
+            self.output.write(self.pending.pop(0).result())
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self.buffer or not self.bytes_in:
+                self._submit(bytes(self.buffer))
+                self.buffer.clear()
+            for future in self.pending:
+                self.output.write(future.result())
+            self.pending = []
+        finally:
+            self.executor.shutdown(wait=True)
+            super().close()
+
+
+class _CountingWriter(io.RawIOBase):
+    """Conta os bytes não comprimidos repassados ao compressor"""
+
+    def __init__(self, target):
+        self.target = target
+        self.bytes_in = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.bytes_in += len(data)
+        self.target.write(data)
+        return len(data)
+
+
+@contextmanager
+def _compressed_writer(output, codec, level, workers):
+    if codec == 'zstd':
+        import zstandard
+        compressor = zstandard.ZstdCompressor(level=level, threads=workers)
+        writer = compressor.stream_writer(output, closefd=False)
+        counter = _CountingWriter(writer)
+        try:
+            yield counter
+        finally:
+            writer.close()
+        return
+
+    writer = _ParallelGzipWriter(output, level, workers)
+    try:
+        yield writer
+    finally:
+        writer.close()
+
+
+def create_archive(source_dir, output_path, codec=None, level=None, workers=None,
+                   files=None, extra_files=None):
+    """Cria um tar comprimido de source_dir e retorna estatísticas
+
+    files: caminhos relativos a incluir (padrão: diretório inteiro, como tar -C dir .)
+    extra_files: {nome_no_pacote: bytes} gravados antes dos arquivos
+    """
+    codec = resolve_codec(codec)
+    level = level if level is not None else DEFAULT_LEVELS[codec]
+    workers = workers or os.cpu_count() or 1
+    tmp_path = f"{output_path}.tmp"
+    start_time = time.time()
+
+    try:
+        with open(tmp_path, 'wb') as output:
+            with _compressed_writer(output, codec, level, workers) as writer:
+                with tarfile.open(fileobj=writer, mode='w|', format=tarfile.PAX_FORMAT) as archive:
+                    for name, content in (extra_files or {}).items():
+                        info = tarfile.TarInfo(name)
+                        info.size = len(content)
+                        info.mtime = int(time.time())
+                        archive.addfile(info, io.BytesIO(content))
+                    if files is None:
+                        archive.add(source_dir, arcname='.')
+                    else:
+                        for rel_path in files:
+                            archive.add(os.path.join(source_dir, rel_path), arcname=rel_path, recursive=False)
+                bytes_in = writer.bytes_in
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    elapsed = max(time.time() - start_time, 1e-6)
+    bytes_out = os.path.getsize(output_path)
+    stats = {
+        'codec': codec,
+        'level': level,
+        'workers': workers,
+        'bytes_in': bytes_in,
+        'bytes_out': bytes_out,
+        'ratio': round(bytes_out / bytes_in, 4) if bytes_in else 0,
+        'seconds': round(elapsed, 3),
+        'throughput_mb_s': round(bytes_in / elapsed / (1024 * 1024), 1)
+    }
+    logger.info(
+        f"🗜️  {os.path.basename(output_path)}: {codec}-{level} x{workers} núcleos, "
+        f"{bytes_in / (1024 * 1024):.2f} MB → {bytes_out / (1024 * 1024):.2f} MB "
+        f"(razão {stats['ratio']:.2f}) em {stats['seconds']:.2f}s, {stats['throughput_mb_s']} MB/s"
+    )
+    return stats
+
+
+@contextmanager
+def open_archive(path):
+    """Abre um pacote gzip ou zstd para leitura sequencial"""
+    if path.endswith('.zst'):
+        import zstandard
+        with open(path, 'rb') as raw:
+            reader = zstandard.ZstdDecompressor().stream_reader(raw)
+            with tarfile.open(fileobj=reader, mode='r|') as archive:
+                yield archive
+        return
+
+    # Modo com acesso aleatório: GzipFile lê os membros concatenados
+    with tarfile.open(path, 'r:*') as archive:
+        yield archive
+
+
+def main():
+    """Empacota um diretório: parallel_archive.py <origem> <destino> [codec] [nível]"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if len(sys.argv) < 3:
+        print("Uso: python3 parallel_archive.py <origem> <destino> [gzip|zstd] [nível]")
+        sys.exit(1)
+
+    codec = sys.argv[3] if len(sys.argv) > 3 else None
+    level = int(sys.argv[4]) if len(sys.argv) > 4 else None
+    create_archive(sys.argv[1], sys.argv[2], codec=codec, level=level)
+
+
+if __name__ == "__main__":
+    main()
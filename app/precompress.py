@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Variantes Pré-comprimidas dos Artefatos de Dados
+Gera <arquivo>.br e <arquivo>.gz no nível máximo uma vez por versão publicada,
+para que o servidor entregue os bytes prontos conforme o Accept-Encoding em
+vez de comprimir o JSON a cada requisição
+"""
+
+import os
+import sys
+import gzip
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+EXTENSIONS = {'br': '.br', 'gzip': '.gz'}
+
+
+def _brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+
+def available_encodings():
+    """Encodings que podem ser gerados neste ambiente (brotli é opcional)"""
+    return ['br', 'gzip'] if _brotli() else ['gzip']
+
+
+def variant_path(path, encoding):
+    return f"{path}{EXTENSIONS[encoding]}"
+
+
+def _compress(payload, encoding):
+    if encoding == 'br':
+        brotli = _brotli()
+        return brotli.compress(payload, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+    # mtime=0: mesma entrada gera os mesmos bytes
+    return gzip.compress(payload, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def write_bytes_atomic(path, data):
+    """Grava bytes via arquivo temporário + rename (leitores nunca veem meio arquivo)"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def compress_variants(path):
+    """Gera as variantes comprimidas de path; retorna {encoding: {'file', 'bytes'}}
+
+    Variantes que não podem ser regeneradas (ex: brotli não instalado) são
+    removidas para que nunca se sirva uma versão antiga.
+    """
+    with open(path, 'rb') as f:
+        payload = f.read()
+
+    encodings = available_encodings()
+    variants = {}
+    for encoding in EXTENSIONS:
+        target = variant_path(path, encoding)
+        if encoding not in encodings:
+            if os.path.exists(target):
+                os.remove(target)
+            continue
+        start_time = time.perf_counter()
+        data = _compress(payload, encoding)
+        write_bytes_atomic(target, data)
+        variants[encoding] = {'file': os.path.basename(target), 'bytes': len(data)}
+        logger.info(
+            f"🗜️  {os.path.basename(target)}: {len(payload)} → {len(data)} bytes "
+            f"({len(data) / max(len(payload), 1):.1%}, {(time.perf_counter() - start_time) * 1000:.0f} ms)"
+        )
+
+    if 'br' not in encodings:
+        logger.debug("brotli indisponível (instale 'brotli') - gerando apenas gzip")
+    return variants
+
+
+def main():
+    """Gera as variantes dos arquivos passados na linha de comando"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if len(sys.argv) < 2:
+        print("Uso: python3 precompress.py <arquivo.json> [...]")
+        sys.exit(1)
+
+    for path in sys.argv[1:]:
+        compress_variants(path)
+
+
+if __name__ == "__main__":
+    main()
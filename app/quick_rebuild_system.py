@@ -7,20 +7,33 @@ Versão otimizada que usa build existente e apenas atualiza o pacote de deploy
 import os
 import sys
 import json
-import hashlib
 import subprocess
 import time
 import logging
 from datetime import datetime
 from pathlib import Path
 
+from change_detection import calculate_file_hash
+from record_diff import RecordDiffEngine
+from deploy_packaging import DeltaPackager
+from parallel_archive import create_archive
+from build_fingerprint import BuildFingerprint, clean_build_dir
+from rebuild_coordinator import RebuildCoordinator
+from rebuild_daemon import delegate, send_command
+from artifact_ops import publish_artifact
+from data_publisher import dashboard_lock, read_data_manifest, write_data_manifest
+from backup_store import BackupStore
+from release_manager import ReleaseManager
+
 # Configurações
 PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
 APP_DIR = f"{PROJECT_ROOT}/app"
 JSON_FILE = f"{APP_DIR}/public/dashboard_data.json"
-HASH_FILE = f"{PROJECT_ROOT}/.last_json_hash"
 LOG_DIR = f"{PROJECT_ROOT}/.logs"
 DEPLOY_DIR = f"{PROJECT_ROOT}/.deploy"
+PACKAGE_MODE = "delta"  # "delta" (manifesto + pacotes incrementais) ou "full"
+PACKAGE_CODEC = "gzip"  # "gzip" (compatível com tar -xzf) ou "zstd" (requer zstandard)
+PACKAGE_LEVEL = None    # None = nível padrão do codec
 
 # Configurar logging
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -42,38 +55,26 @@ class QuickRebuildSystem:
         self.project_root = PROJECT_ROOT
         self.app_dir = APP_DIR
         self.json_file = JSON_FILE
-        self.hash_file = HASH_FILE
         self.deploy_dir = DEPLOY_DIR
+        self.diff_engine = RecordDiffEngine(self.json_file)
+        self.build_fingerprint = BuildFingerprint(self.app_dir)
+        self.packager = DeltaPackager(self.deploy_dir, codec=PACKAGE_CODEC, level=PACKAGE_LEVEL)
+        self.releases = ReleaseManager(self.deploy_dir, codec=PACKAGE_CODEC)
+        self.coordinator = RebuildCoordinator()
+        self.last_diff = None
         
     def calculate_file_hash(self, file_path):
-        """Calcula hash MD5 do arquivo para detectar mudanças"""
-        try:
-            with open(file_path, 'rb') as f:
-                content = f.read()
-                return hashlib.md5(content).hexdigest()
-        except FileNotFoundError:
-            logger.warning(f"Arquivo não encontrado: {file_path}")
-            return None
-        except Exception as e:
-            logger.error(f"Erro ao calcular hash: {e}")
-            return None
+        """Calcula hash do conteúdo (só relê o arquivo quando o stat muda)"""
+        return calculate_file_hash(file_path)
     
     def get_last_hash(self):
-        """Recupera o último hash salvo"""
-        try:
-            if os.path.exists(self.hash_file):
-                with open(self.hash_file, 'r') as f:
-                    return f.read().strip()
-        except Exception as e:
-            logger.error(f"Erro ao ler último hash: {e}")
-        return None
+        """Recupera o último hash salvo (estado unificado do coordenador)"""
+        return self.coordinator.get_last_hash()
     
     def save_hash(self, hash_value):
         """Salva o hash atual"""
         try:
-            with open(self.hash_file, 'w') as f:
-                f.write(hash_value)
-            logger.info(f"Hash salvo: {hash_value}")
+            self.coordinator.record_hash(hash_value)
         except Exception as e:
             logger.error(f"Erro ao salvar hash: {e}")
     
@@ -129,14 +130,13 @@ class QuickRebuildSystem:
             return False, str(e)
     
     def backup_current_deploy(self):
-        """Faz backup do deploy atual"""
+        """Faz backup do deploy atual no repositório deduplicado (.backups/)"""
         try:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_file = f"{self.deploy_dir}/app_backup_{timestamp}.tgz"
+            package_file = self.packager.full_package
             
-            if os.path.exists(f"{self.deploy_dir}/app.tgz"):
-                os.rename(f"{self.deploy_dir}/app.tgz", backup_file)
-                logger.info(f"Backup criado: {backup_file}")
+            if os.path.exists(package_file):
+                entry = BackupStore().backup_file(package_file, 'deploy')
+                logger.info(f"Backup criado: {entry['id']}")
                 
         except Exception as e:
             logger.error(f"Erro ao fazer backup: {e}")
@@ -159,11 +159,13 @@ class QuickRebuildSystem:
             static_dir = f"{build_dir}/static"
             os.makedirs(static_dir, exist_ok=True)
             
-            # Copiar JSON atualizado
-            success, _ = self.run_command(f"cp {self.json_file} {build_json_path}")
-            if not success:
-                logger.error("Falha ao copiar JSON para build")
-                return False
+            # Publicar JSON atualizado (hardlink/cópia no kernel + rename atômico)
+            publish_artifact(self.json_file, build_json_path)
+            
+            # Variantes .br/.gz geradas na publicação acompanham o JSON
+            json_dir = os.path.dirname(self.json_file)
+            for variant in read_data_manifest(self.json_file).get('encodings', {}).values():
+                publish_artifact(os.path.join(json_dir, variant['file']), os.path.join(static_dir, variant['file']))
             
             logger.info("JSON atualizado no build existente")
             return True
@@ -176,17 +178,20 @@ class QuickRebuildSystem:
         """Executa rebuild completo apenas se necessário"""
         logger.info("=== EXECUTANDO REBUILD COMPLETO ===")
         
-        # Limpar build anterior
-        success, _ = self.run_command("rm -rf .next")
-        if not success:
-            logger.warning("Falha ao limpar build anterior")
+        # Limpar build anterior preservando .next/cache (build incremental)
+        try:
+            clean_build_dir(f"{self.app_dir}/.next")
+        except Exception as e:
+            logger.warning(f"Falha ao limpar build anterior: {e}")
         
         # Executar build
-        success, output = self.run_command("npm run build")
+        fingerprint = self.build_fingerprint.current()
+        success, output = self.run_command(f"NEXT_BUILD_ID={fingerprint[:20]} npm run build")
         if not success:
             logger.error("Falha no build da aplicação")
             return False
         
+        self.build_fingerprint.record_build(fingerprint)
         logger.info("Build completo concluído")
         return True
     
@@ -196,40 +201,68 @@ class QuickRebuildSystem:
         
         os.makedirs(self.deploy_dir, exist_ok=True)
         
-        # Fazer backup do deploy atual
-        self.backup_current_deploy()
-        
         # Verificar se existe build
         build_dir = f"{self.app_dir}/.next"
         if not os.path.exists(build_dir):
             logger.error("Build não encontrado")
             return False
         
-        # Criar novo pacote
-        success, output = self.run_command(
-            f"tar -czf {self.deploy_dir}/app.tgz -C {build_dir} .",
-            cwd=self.project_root
-        )
+        if PACKAGE_MODE != 'delta':
+            self.backup_current_deploy()
+            return self.create_full_package(build_dir)
         
-        if not success:
-            logger.error("Falha ao criar pacote de deployment")
+        try:
+            plan = self.packager.plan(build_dir)
+        except Exception as e:
+            logger.warning(f"Falha ao comparar com o manifesto ({e}) - gerando pacote completo")
+            self.backup_current_deploy()
+            return self.create_full_package(build_dir)
+        
+        logger.info(f"Modo do pacote: {plan['mode']} ({plan['reason']})")
+        
+        if plan['mode'] == 'unchanged':
+            logger.info("Build idêntico ao último pacote - nada a empacotar")
+            return True
+        
+        if plan['mode'] == 'delta':
+            try:
+                self.packager.write_delta(build_dir, plan)
+                return True
+            except Exception as e:
+                logger.warning(f"Falha ao criar pacote delta ({e}) - gerando pacote completo")
+        
+        self.backup_current_deploy()
+        if not self.create_full_package(build_dir):
+            return False
+        self.packager.record_full(plan)
+        return True
+    
+    def create_full_package(self, build_dir):
+        """Empacota o diretório de build inteiro com compressão paralela"""
+        package_file = self.packager.full_package
+        try:
+            create_archive(build_dir, package_file, codec=PACKAGE_CODEC, level=PACKAGE_LEVEL)
+        except Exception as e:
+            logger.error(f"Falha ao criar pacote de deployment: {e}")
             return False
         
-        logger.info(f"Pacote de deployment criado: {self.deploy_dir}/app.tgz")
+        logger.info(f"Pacote de deployment criado: {package_file}")
         return True
     
     def get_deployment_info(self):
         """Obtém informações do deployment"""
         try:
-            if os.path.exists(f"{self.deploy_dir}/app.tgz"):
-                stat = os.stat(f"{self.deploy_dir}/app.tgz")
+            package_file = self.packager.full_package
+            if os.path.exists(package_file):
+                stat = os.stat(package_file)
                 size_mb = stat.st_size / (1024 * 1024)
                 modified = datetime.fromtimestamp(stat.st_mtime)
                 
                 return {
                     'size_mb': round(size_mb, 2),
                     'modified': modified.strftime('%Y-%m-%d %H:%M:%S'),
-                    'exists': True
+                    'exists': True,
+                    'packages': self.packager.get_info()
                 }
         except Exception as e:
             logger.error(f"Erro ao obter info do deployment: {e}")
@@ -242,24 +275,59 @@ class QuickRebuildSystem:
         start_time = time.time()
         
         try:
-            # 1. Atualizar JSON no build existente (rápido)
+            # 0. Calcular delta por indicação (para etapas seguintes e logs)
+            try:
+                self.last_diff = self.diff_engine.compute_diff()
+            except Exception as e:
+                logger.warning(f"Não foi possível calcular o delta de indicações: {e}")
+                self.last_diff = None
+            
+            # Servidor em execução recarrega os dados a quente (sem restart nem npm);
+            # sob o lock da publicação, o manifesto descreve o corpo que está no disco
+            try:
+                with dashboard_lock(self.json_file):
+                    write_data_manifest(self.json_file)
+            except OSError as e:
+                logger.warning(f"Falha ao publicar manifesto dos dados: {e}")
+            
+            # 1. Build completo só se o código mudou; senão apenas os dados
+            decision = self.build_fingerprint.decide()
+            compiled = decision['mode'] == 'full'
+            if compiled and not self.full_rebuild():
+                logger.error("❌ Falha no rebuild completo")
+                return False
+            
+            # Atualizar JSON no build existente (rápido)
             if not self.update_json_in_build():
                 logger.warning("Falha na atualização rápida - tentando rebuild completo")
                 if not self.full_rebuild():
                     logger.error("❌ Falha no rebuild completo")
                     return False
+                compiled = True
             
             # 2. Criar pacote de deployment
             if not self.create_deployment_package():
                 logger.error("❌ Falha ao criar pacote")
                 return False
             
-            # 3. Atualizar hash
+            # 3. Release imutável + troca do symlink `current` e do supervisor, só
+            #    com código novo: mudança só de dados é recarregada a quente de public/
+            if compiled or self.releases.current() is None:
+                try:
+                    self.releases.deploy(f"{self.app_dir}/.next")
+                except Exception as e:
+                    logger.error(f"❌ Falha ao ativar release: {e}")
+                    return False
+            else:
+                logger.info("Só dados mudaram - release e servidor mantidos (recarga a quente)")
+            
+            # 4. Atualizar hash
             current_hash = self.calculate_file_hash(self.json_file)
             if current_hash:
                 self.save_hash(current_hash)
+            self.diff_engine.commit()
             
-            # 4. Log de sucesso
+            # 5. Log de sucesso
             elapsed_time = time.time() - start_time
             deploy_info = self.get_deployment_info()
             
@@ -274,15 +342,24 @@ class QuickRebuildSystem:
             logger.error(f"❌ Erro durante rebuild rápido: {e}")
             return False
     
+    def request_rebuild(self, source='quick_rebuild'):
+        """Pede um rebuild rápido ao coordenador (um por vez, gatilhos agrupados)
+
+        Retorna None se outro rebuild estiver em andamento (gatilho na fila).
+        """
+        return self.coordinator.request(self.quick_rebuild, source, kind='quick')['success']
+    
     def monitor_and_rebuild(self):
         """Monitora mudanças e executa rebuild rápido quando necessário"""
         logger.info("🔍 Verificando mudanças no dashboard_data.json...")
         
         if self.has_file_changed():
             logger.info("📝 Mudança detectada - iniciando rebuild rápido...")
-            success = self.quick_rebuild()
+            success = self.request_rebuild()
             
-            if success:
+            if success is None:
+                return None
+            elif success:
                 logger.info("✅ Sistema atualizado com sucesso!")
                 return True
             else:
@@ -292,22 +369,48 @@ class QuickRebuildSystem:
             logger.info("✅ Nenhuma mudança detectada")
             return True
 
+def coordinated_action(force=False):
+    """Rebuild rápido executado pelo coordenador para gatilhos de outros processos"""
+    return QuickRebuildSystem().quick_rebuild
+
 def main():
     """Função principal"""
+    # Com o daemon rodando, este script é apenas um cliente
+    if len(sys.argv) == 1 or sys.argv[1] == '--force':
+        if len(sys.argv) > 1:
+            delegated = delegate('trigger', 'quick', 'quick_rebuild --force')
+        else:
+            delegated = delegate('check', 'quick', 'quick_rebuild', wait=False)
+        if delegated is not None:
+            sys.exit(0 if delegated else 1)
+    
     system = QuickRebuildSystem()
     
     # Verificar argumentos
     if len(sys.argv) > 1:
         if sys.argv[1] == '--force':
             logger.info("Modo: Rebuild rápido forçado")
-            success = system.quick_rebuild()
+            success = system.request_rebuild('quick_rebuild --force')
         elif sys.argv[1] == '--status':
             logger.info("Modo: Verificação de status")
             deploy_info = system.get_deployment_info()
             if deploy_info['exists']:
                 logger.info(f"📦 Deploy atual: {deploy_info['size_mb']} MB, modificado em {deploy_info['modified']}")
+                packages = deploy_info['packages']
+                if packages['exists']:
+                    logger.info(f"🧩 Base {packages['base_id']}: {packages['base_files']} arquivos, {packages['deltas_since_full']} deltas desde o último completo")
+                    if packages['last_delta']:
+                        last_delta = packages['last_delta']
+                        logger.info(f"🧩 Último delta: {last_delta['changed']} alterados, {last_delta['removed']} removidos, {last_delta['size_bytes'] / 1024:.1f} KB")
             else:
                 logger.info("❌ Nenhum deploy encontrado")
+            decision = system.build_fingerprint.decide()
+            logger.info(f"🧬 Último build completo: {decision['built_at'] or 'N/A'} - próximo rebuild: {decision['mode']} ({decision['reason']})")
+            system.coordinator.log_status()
+            daemon_status = send_command('status', timeout=5)
+            if daemon_status:
+                daemon = daemon_status['daemon']
+                logger.info(f"🛰️  Daemon ativo (pid {daemon['pid']}, {daemon['uptime_seconds']}s): {daemon['runs']} rebuilds, latência média até o início {daemon['avg_start_latency_ms']} ms")
             success = True
         else:
             logger.error(f"Argumento inválido: {sys.argv[1]}")
@@ -317,7 +420,10 @@ def main():
         logger.info("Modo: Monitoramento automático")
         success = system.monitor_and_rebuild()
     
-    if success:
+    if success is None:
+        logger.info("⏳ Outro rebuild em andamento - gatilho na fila, será executado ao fim dele")
+        sys.exit(0)
+    elif success:
         logger.info("🎉 Operação concluída com sucesso!")
         sys.exit(0)
     else:
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Coordenador Único de Rebuilds
+Garante no máximo um rebuild em andamento entre todos os scripts (monitor,
+rebuild rápido/completo, deploy integrado) e agrupa os gatilhos que chegam
+durante um rebuild em uma execução seguinte por tipo de rebuild. O estado fica em um só
+arquivo persistente (.rebuild_state.json)
+"""
+
+import os
+import sys
+import json
+import time
+import fcntl
+import logging
+import importlib
+from datetime import datetime
+from contextlib import contextmanager
+
+from data_publisher import LOCK_DIR, lock_file_for, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
+REBUILD_STATE_FILE = f"{PROJECT_ROOT}/.rebuild_state.json"
+REBUILD_LOCK_FILE = f"{LOCK_DIR}/rebuild.lock"
+
+# Arquivos de estado antigos (lidos uma vez para migrar o último hash)
+LEGACY_HASH_FILES = {
+    'rebuild': f"{PROJECT_ROOT}/.last_json_hash",
+    'checkpoint': f"{PROJECT_ROOT}/monitoring_system/rebuild_state.json",
+    'deploy': f"{PROJECT_ROOT}/monitoring_system/rebuild_state.json"
+}
+
+
+# Tipos de rebuild atendidos pelas rodadas extras: tipo → módulo com
+# coordinated_action(force), usado quando o gatilho veio de outro processo
+ACTION_MODULES = {
+    'quick': 'quick_rebuild_system',
+    'full': 'auto_rebuild_system',
+    'deploy': 'integrated_deploy_system'
+}
+_resolved_actions = {}
+
+
+def resolve_action(kind, force=False):
+    """Ação do tipo `kind` neste processo (instância criada uma vez e reaproveitada)"""
+    if (kind, force) not in _resolved_actions:
+        module = importlib.import_module(ACTION_MODULES[kind])
+        _resolved_actions[(kind, force)] = module.coordinated_action(force)
+    return _resolved_actions[(kind, force)]
+
+
+def _pending_queue(state):
+    """Fila por tipo de rebuild: {tipo: {count, sources, force, first_queued_at}}"""
+    pending = state.get('pending') or {}
+    if 'count' in pending:
+        # Formato antigo (contador único, sem tipo): atendido como rebuild rápido
+        pending = {'quick': dict(pending, force=False)}
+    return pending
+
+
+def _read_legacy_hash(path):
+    try:
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            content = f.read().strip()
+        if content.startswith('{'):
+            return json.loads(content).get('last_hash')
+        return content or None
+    except Exception as e:
+        logger.warning(f"Erro ao ler estado antigo {path}: {e}")
+        return None
+
+
+def _empty_stats():
+    return {
+        'runs': 0,
+        'failures': 0,
+        'triggers': 0,
+        'coalesced_triggers': 0,
+        'follow_up_runs': 0,
+        'total_wait_seconds': 0.0,
+        'max_wait_seconds': 0.0,
+        'last_wait_seconds': 0.0,
+        'last_duration_seconds': None
+    }
+
+
+class RebuildCoordinator:
+    """Execução única (single-flight) de rebuilds com fila agrupada"""
+
+    def __init__(self, state_file=REBUILD_STATE_FILE, lock_file=REBUILD_LOCK_FILE):
+        self.state_file = state_file
+        self.lock_file = lock_file
+
+    @contextmanager
+    def _edit_state(self):
+        """Lê e regrava o estado sob o lock curto do próprio arquivo"""
+        with open(lock_file_for(self.state_file), 'a') as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                state = self.load_state()
+                yield state
+                write_json_atomic(self.state_file, state)
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def load_state(self):
+        try:
+            if os.path.exists(self.state_file):
+                with open(self.state_file, 'r') as f:
+                    state = json.load(f)
+                state.setdefault('stats', _empty_stats())
+                return state
+        except Exception as e:
+            logger.error(f"Erro ao ler estado do rebuild: {e}")
+        return {'hashes': {}, 'in_flight': None, 'pending': None, 'stats': _empty_stats()}
+
+    def get_last_hash(self, key='rebuild'):
+        """Hash do JSON na última execução bem-sucedida de `key`"""
+        entry = self.load_state().get('hashes', {}).get(key)
+        if entry:
+            return entry.get('hash')
+        legacy_file = LEGACY_HASH_FILES.get(key)
+        return _read_legacy_hash(legacy_file) if legacy_file else None
+
+    def record_hash(self, hash_value, key='rebuild'):
+        """Registra o hash publicado por `key`"""
+        with self._edit_state() as state:
+            state.setdefault('hashes', {})[key] = {
+                'hash': hash_value,
+                'updated_at': datetime.now().isoformat()
+            }
+        logger.info(f"Hash salvo ({key}): {hash_value}")
+
+    def _try_lock(self, lock):
+        try:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _take_pending(self, state, kind=None, force=False):
+        """Retira da fila os gatilhos de `kind` (ou do tipo mais antigo) para uma rodada
+
+        Com `kind` informado, gatilhos com force só saem da fila se a rodada
+        também for forçada. Retorna {'kind', 'force', 'count', 'sources',
+        'wait'} ou None se não houver o que executar.
+        """
+        queue = _pending_queue(state)
+        if kind is None and queue:
+            kind = min(queue, key=lambda name: queue[name]['first_queued_at'])
+            force = True
+        entry = queue.get(kind)
+        if not entry or (entry['force'] and not force):
+            state['pending'] = queue or None
+            return None
+        del queue[kind]
+        state['pending'] = queue or None
+        stats = state['stats']
+        wait = max(time.time() - entry['first_queued_at'], 0.0)
+        stats['total_wait_seconds'] = round(stats['total_wait_seconds'] + wait, 3)
+        stats['max_wait_seconds'] = round(max(stats['max_wait_seconds'], wait), 3)
+        stats['last_wait_seconds'] = round(wait, 3)
+        return {'kind': kind, 'force': entry['force'], 'count': entry['count'],
+                'sources': entry.get('sources', []), 'wait': wait}
+
+    def _mark_in_flight(self, state, source, kind):
+        state['in_flight'] = {
+            'source': source,
+            'kind': kind,
+            'pid': os.getpid(),
+            'started_at': datetime.now().isoformat()
+        }
+
+    def request(self, action, source='manual', kind='quick', force=False):
+        """Executa action() se nenhum rebuild estiver em andamento
+
+        Caso contrário registra o gatilho na fila do seu tipo (`kind`: quick,
+        full ou deploy; `force` fica registrado) e retorna na hora com
+        {'status': 'queued', 'success': None}. Quem detém o rebuild executa,
+        ao terminar, uma rodada extra por tipo na fila, cada uma com a ação
+        daquele tipo. Retorna {'status': 'ran'|'queued', 'success', 'runs'}.
+        """
+        lock = open(self._ensure_lock_dir(), 'a')
+        with self._edit_state() as state:
+            state['stats']['triggers'] += 1
+            if not self._try_lock(lock):
+                lock.close()
+                queue = _pending_queue(state)
+                entry = queue.setdefault(kind, {'count': 0, 'sources': [], 'force': False,
+                                                'first_queued_at': time.time()})
+                entry['count'] += 1
+                entry['force'] = entry['force'] or force
+                if source not in entry['sources']:
+                    entry['sources'].append(source)
+                state['pending'] = queue
+                state['stats']['coalesced_triggers'] += 1
+                in_flight = state.get('in_flight') or {}
+                logger.info(
+                    f"⏳ Rebuild em andamento ({in_flight.get('source', '?')}, pid {in_flight.get('pid', '?')}) - "
+                    f"gatilho '{source}' ({kind}) na fila; {entry['count']} gatilho(s) {kind} aguardando"
+                )
+                return {'status': 'queued', 'success': None, 'runs': 0}
+            # Gatilhos do mesmo tipo deixados por um processo interrompido são atendidos por esta rodada
+            self._take_pending(state, kind, force)
+            self._mark_in_flight(state, source, kind)
+
+        runs = 0
+        success = False
+        released = False
+        run_kind, run_force, run_action = kind, force, action
+        try:
+            while True:
+                start_time = time.time()
+                try:
+                    if run_action is None:
+                        run_action = resolve_action(run_kind, run_force)
+                    run_success = bool(run_action())
+                except Exception as e:
+                    logger.error(f"💥 Erro no rebuild ({source}): {e}")
+                    run_success = False
+                runs += 1
+                # Resultado devolvido ao chamador: a última rodada do tipo que ele pediu
+                if run_kind == kind:
+                    success = run_success
+                elapsed = time.time() - start_time
+
+                with self._edit_state() as state:
+                    stats = state['stats']
+                    stats['runs'] += 1
+                    stats['last_duration_seconds'] = round(elapsed, 2)
+                    if not run_success:
+                        stats['failures'] += 1
+                    state['last_run'] = {
+                        'source': source,
+                        'kind': run_kind,
+                        'success': run_success,
+                        'finished_at': datetime.now().isoformat(),
+                        'seconds': round(elapsed, 2)
+                    }
+                    follow_up = self._take_pending(state)
+                    if follow_up is None:
+                        # Liberar sob o lock do estado: nenhum gatilho fica órfão
+                        state['in_flight'] = None
+                        fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+                        released = True
+                        break
+                    stats['follow_up_runs'] += 1
+                    source = f"agrupado ({', '.join(follow_up['sources'])})"
+                    self._mark_in_flight(state, source, follow_up['kind'])
+
+                run_kind, run_force = follow_up['kind'], follow_up['force']
+                # A ação do próprio chamador serve se for do mesmo tipo (e forçada, se preciso)
+                run_action = action if run_kind == kind and (force or not run_force) else None
+                logger.info(
+                    f"🔁 {follow_up['count']} gatilho(s) {run_kind}{' --force' if run_force else ''} recebidos "
+                    f"durante o rebuild - executando uma rodada extra (espera {follow_up['wait']:.1f}s)"
+                )
+        finally:
+            if not released:
+                with self._edit_state() as state:
+                    state['in_flight'] = None
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+            lock.close()
+
+        return {'status': 'ran', 'success': success, 'runs': runs}
+
+    def _ensure_lock_dir(self):
+        os.makedirs(os.path.dirname(self.lock_file), exist_ok=True)
+        return self.lock_file
+
+    def is_busy(self):
+        """True se algum processo detém o rebuild agora"""
+        with open(self._ensure_lock_dir(), 'a') as lock:
+            if self._try_lock(lock):
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+                return False
+            return True
+
+    def get_status(self):
+        """Resumo da fila e das estatísticas para --status"""
+        state = self.load_state()
+        stats = state['stats']
+        queue = _pending_queue(state)
+        busy = self.is_busy()
+        waits = stats['follow_up_runs']
+        oldest = min((entry['first_queued_at'] for entry in queue.values()), default=None)
+        return {
+            'in_flight': state.get('in_flight') if busy else None,
+            'queue_depth': sum(entry['count'] for entry in queue.values()),
+            'queue': {
+                kind: {'count': entry['count'], 'force': entry['force'], 'sources': entry.get('sources', [])}
+                for kind, entry in queue.items()
+            },
+            'queued_sources': [source for entry in queue.values() for source in entry.get('sources', [])],
+            'oldest_wait_seconds': round(time.time() - oldest, 1) if oldest else 0,
+            'runs': stats['runs'],
+            'failures': stats['failures'],
+            'triggers': stats['triggers'],
+            'coalesced_triggers': stats['coalesced_triggers'],
+            'follow_up_runs': stats['follow_up_runs'],
+            'avg_wait_seconds': round(stats['total_wait_seconds'] / waits, 2) if waits else 0,
+            'max_wait_seconds': stats['max_wait_seconds'],
+            'last_run': state.get('last_run'),
+            'hashes': state.get('hashes', {})
+        }
+
+    def log_status(self):
+        """Escreve o estado da fila no log"""
+        status = self.get_status()
+        by_kind = ', '.join(f"{kind}: {entry['count']}" for kind, entry in status['queue'].items())
+        in_flight = status['in_flight']
+        if in_flight:
+            logger.info(f"🏗️  Rebuild em andamento: {in_flight['source']} (pid {in_flight['pid']}, desde {in_flight['started_at']})")
+        else:
+            logger.info("🏗️  Nenhum rebuild em andamento")
+        logger.info(
+            f"📥 Fila: {status['queue_depth']} gatilho(s) pendente(s)"
+            + (f" ({by_kind}) "
+               f"de {', '.join(status['queued_sources'])}, há {status['oldest_wait_seconds']}s" if status['queue_depth'] else "")
+        )
+        logger.info(
+            f"📊 Rebuilds: {status['runs']} ({status['failures']} falhas), gatilhos: {status['triggers']}, "
+            f"agrupados: {status['coalesced_triggers']} em {status['follow_up_runs']} rodadas extras, "
+            f"espera média {status['avg_wait_seconds']}s (máx {status['max_wait_seconds']}s)"
+        )
+        return status
+
+
+def main():
+    """Mostra o estado do coordenador (--status)"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if len(sys.argv) == 2 and sys.argv[1] == '--status':
+        print(json.dumps(RebuildCoordinator().get_status(), indent=2, ensure_ascii=False))
+        success = True
+    else:
+        print("Uso: python3 rebuild_coordinator.py --status")
+        success = False
+
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Daemon Residente de Rebuild
+Carrega os sistemas de rebuild uma única vez e recebe gatilhos por um socket
+Unix local; os scripts de linha de comando viram clientes finos que apenas
+enviam o pedido (sem iniciar um novo interpretador por rebuild)
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import logging
+import threading
+import socketserver
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
+SOCKET_PATH = f"{PROJECT_ROOT}/.rebuild_daemon.sock"
+LOG_DIR = f"{PROJECT_ROOT}/.logs"
+CONNECT_TIMEOUT = 0.5    # segundos para concluir que o daemon não está rodando
+REQUEST_TIMEOUT = 1800   # espera máxima de um cliente com wait=True
+
+
+def send_command(command, socket_path=SOCKET_PATH, timeout=REQUEST_TIMEOUT, **fields):
+    """Envia um comando ao daemon e retorna a resposta (None se ele não estiver rodando)"""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.settimeout(CONNECT_TIMEOUT)
+        try:
+            client.connect(socket_path)
+        except OSError:
+            return None
+
+        client.settimeout(timeout)
+        request = dict(fields, command=command)
+        client.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with client.makefile('rb') as reader:
+            line = reader.readline()
+        return json.loads(line) if line else None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Falha na comunicação com o daemon de rebuild: {e}")
+        return None
+    finally:
+        client.close()
+
+
+def is_running(socket_path=SOCKET_PATH):
+    """True se um daemon responde no socket"""
+    response = send_command('ping', socket_path=socket_path, timeout=CONNECT_TIMEOUT)
+    return bool(response and response.get('ok'))
+
+
+def delegate(command, system, source, wait=True, force=False):
+    """Encaminha um pedido ao daemon; None se ele não estiver rodando (executar no processo)"""
+    response = send_command(command, system=system, source=source, wait=wait, force=force)
+    if response is None:
+        return None
+    if not response.get('ok'):
+        logger.error(f"Daemon recusou o pedido: {response.get('error')}")
+        return False
+    if not response.get('changed'):
+        logger.info("✅ Nenhuma mudança detectada (daemon)")
+        return True
+    if wait:
+        if response.get('success') is None:
+            # Não é falha nem sucesso ainda; None aqui significaria "executar no processo"
+            logger.info(f"📨 Rebuild #{response['batch']} na fila do coordenador (outro processo está reconstruindo)")
+            return True
+        logger.info(f"📨 Rebuild #{response['batch']} executado pelo daemon: {'ok' if response.get('success') else 'falhou'}")
+        return bool(response.get('success'))
+    logger.info(f"📨 Gatilho enviado ao daemon (rebuild #{response['batch']}, {response['queued']} gatilho(s) agrupado(s))")
+    return True
+
+
+class _Batch:
+    """Gatilhos agrupados que serão atendidos por um único rebuild"""
+
+    def __init__(self, batch_id, system):
+        self.id = batch_id
+        self.system = system
+        self.sources = []
+        self.count = 0
+        self.force = False
+        self.queued_at = time.time()
+        self.done = threading.Event()
+        self.success = None
+
+
+class RebuildDaemon:
+    """Mantém os sistemas em memória e executa um rebuild por vez"""
+
+    def __init__(self, socket_path=SOCKET_PATH, systems=None):
+        self.socket_path = socket_path
+        if systems is None:
+            from quick_rebuild_system import QuickRebuildSystem
+            from auto_rebuild_system import DashboardRebuildSystem
+            from integrated_deploy_system import IntegratedDeploySystem
+            systems = {
+                'quick': QuickRebuildSystem(),
+                'full': DashboardRebuildSystem(),
+                # Reaproveita as ferramentas de teste/checkpoint importadas entre deploys
+                'deploy': IntegratedDeploySystem()
+            }
+        self.systems = systems
+        self.condition = threading.Condition()
+        self.pending = {}
+        self.order = []
+        self.running = True
+        self.current = None
+        self.next_batch_id = 1
+        self.started_at = time.time()
+        self.stats = {
+            'triggers': 0,
+            'coalesced_triggers': 0,
+            'runs': 0,
+            'failures': 0,
+            'last_start_latency_ms': None,
+            'total_start_latency_ms': 0.0,
+            'last_duration_seconds': None
+        }
+        self.worker = threading.Thread(target=self._work, name='rebuild-worker', daemon=True)
+
+    def submit(self, system, source, force=False):
+        """Enfileira um gatilho; gatilhos do mesmo sistema ainda na fila são agrupados"""
+        if system not in self.systems:
+            raise ValueError(f"Sistema desconhecido: {system}")
+        with self.condition:
+            batch = self.pending.get(system)
+            if batch is None:
+                batch = _Batch(self.next_batch_id, system)
+                self.next_batch_id += 1
+                self.pending[system] = batch
+                self.order.append(system)
+            else:
+                self.stats['coalesced_triggers'] += 1
+            batch.count += 1
+            batch.force = batch.force or force
+            if source not in batch.sources:
+                batch.sources.append(source)
+            self.stats['triggers'] += 1
+            self.condition.notify()
+        return batch
+
+    def check(self, system, source):
+        """Enfileira um rebuild só se o JSON mudou desde o último publicado"""
+        if not self.systems[system].has_file_changed():
+            return None
+        return self.submit(system, source)
+
+    def _run_batch(self, batch):
+        system = self.systems[batch.system]
+        source = ', '.join(batch.sources)
+        if batch.system == 'full':
+            if batch.force:
+                return system.force_rebuild()
+            return system.coordinator.request(system.perform_rebuild, f"daemon: {source}", kind='full')['success']
+        if batch.system == 'deploy':
+            return system.coordinator.request(
+                system.perform_integrated_deploy, f"daemon: {source}", kind='deploy', force=batch.force
+            )['success']
+        return system.request_rebuild(f"daemon: {source}")
+
+    def _work(self):
+        while True:
+            with self.condition:
+                while self.running and not self.order:
+                    self.condition.wait()
+                if not self.order:
+                    return
+                batch = self.pending.pop(self.order.pop(0))
+                self.current = batch
+                latency_ms = (time.time() - batch.queued_at) * 1000
+                self.stats['last_start_latency_ms'] = round(latency_ms, 2)
+                self.stats['total_start_latency_ms'] += latency_ms
+
+            logger.info(
+                f"🚀 Rebuild {batch.system} #{batch.id} iniciado {latency_ms:.1f} ms após o gatilho "
+                f"({batch.count} gatilho(s): {', '.join(batch.sources)})"
+            )
+
+            start_time = time.time()
+            try:
+                # None: outro processo detém o rebuild e o gatilho ficou na fila do coordenador
+                result = self._run_batch(batch)
+                batch.success = None if result is None else bool(result)
+            except Exception as e:
+                logger.error(f"💥 Erro no rebuild {batch.system} #{batch.id}: {e}")
+                batch.success = False
+
+            with self.condition:
+                self.stats['runs'] += 1
+                self.stats['last_duration_seconds'] = round(time.time() - start_time, 2)
+                if batch.success is False:
+                    self.stats['failures'] += 1
+                self.current = None
+            batch.done.set()
+
+    def get_status(self):
+        """Estado em memória do daemon"""
+        with self.condition:
+            runs = self.stats['runs']
+            status = dict(self.stats)
+            status['total_start_latency_ms'] = round(status['total_start_latency_ms'], 2)
+            status['avg_start_latency_ms'] = round(self.stats['total_start_latency_ms'] / runs, 2) if runs else None
+            status['queue'] = [
+                {'system': s, 'triggers': self.pending[s].count, 'sources': self.pending[s].sources,
+                 'waiting_seconds': round(time.time() - self.pending[s].queued_at, 2)}
+                for s in self.order
+            ]
+            status['in_flight'] = None
+            if self.current:
+                status['in_flight'] = {
+                    'system': self.current.system,
+                    'sources': self.current.sources,
+                    'seconds': round(time.time() - self.current.queued_at, 2)
+                }
+        status['pid'] = os.getpid()
+        status['uptime_seconds'] = round(time.time() - self.started_at, 1)
+        return status
+
+    def handle(self, request):
+        """Processa um comando recebido pelo socket"""
+        command = request.get('command')
+        system = request.get('system', 'quick')
+        source = request.get('source', 'cliente')
+
+        if command == 'ping':
+            return {'ok': True, 'pid': os.getpid()}
+        if command == 'status':
+            return {'ok': True, 'daemon': self.get_status(),
+                    'coordinator': self.systems['quick'].coordinator.get_status()}
+        if command == 'shutdown':
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {'ok': True}
+        if command not in ('trigger', 'check'):
+            return {'ok': False, 'error': f"Comando desconhecido: {command}"}
+        if system not in self.systems:
+            return {'ok': False, 'error': f"Sistema desconhecido: {system}"}
+
+        if command == 'check':
+            batch = self.check(system, source)
+            if batch is None:
+                return {'ok': True, 'changed': False, 'success': True}
+        else:
+            batch = self.submit(system, source, force=bool(request.get('force')))
+
+        response = {'ok': True, 'changed': True, 'batch': batch.id, 'queued': batch.count}
+        if request.get('wait'):
+            batch.done.wait()
+            response['success'] = batch.success
+        return response
+
+    def serve(self, watch=False):
+        """Atende o socket até receber SIGTERM/SIGINT ou o comando shutdown"""
+        if is_running(self.socket_path):
+            logger.error(f"Daemon de rebuild já está rodando em {self.socket_path}")
+            return False
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    request = json.loads(self.rfile.readline() or b'{}')
+                    response = daemon.handle(request)
+                except Exception as e:
+                    logger.error(f"Erro ao processar comando: {e}")
+                    response = {'ok': False, 'error': str(e)}
+                self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+
+        self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self.server.daemon_threads = True
+        os.chmod(self.socket_path, 0o600)
+        self.worker.start()
+
+        watcher = None
+        if watch:
+            watcher = self._start_watcher()
+
+        def stop(signum, frame):
+            threading.Thread(target=self.shutdown, daemon=True).start()
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, stop)
+            signal.signal(signal.SIGINT, stop)
+
+        logger.info(f"🛰️  Daemon de rebuild ouvindo em {self.socket_path} (pid {os.getpid()})")
+        try:
+            self.server.serve_forever()
+        finally:
+            if watcher:
+                watcher.stop()
+            self.server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            # Não interromper um rebuild no meio
+            self.worker.join()
+            logger.info("🛑 Daemon de rebuild encerrado")
+        return True
+
+    def _start_watcher(self):
+        from file_watcher import FileWatcher
+        from monitor_and_rebuild import WATCHED_FILES, WATCH_DEBOUNCE_SECONDS, WATCH_POLL_INTERVAL
+
+        def on_change(paths):
+            if self.check('quick', 'watch') is None:
+                logger.info("✅ Evento sem mudança de conteúdo - rebuild ignorado")
+
+        watcher = FileWatcher(WATCHED_FILES, on_change, debounce=WATCH_DEBOUNCE_SECONDS,
+                              poll_interval=WATCH_POLL_INTERVAL)
+        threading.Thread(target=watcher.run, name='file-watcher', daemon=True).start()
+        return watcher
+
+    def shutdown(self):
+        """Para de aceitar comandos e termina após a fila atual"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.server.shutdown()
+
+
+def main():
+    """python3 rebuild_daemon.py [--serve [--watch]|--status|--stop]"""
+    args = sys.argv[1:]
+
+    if args and args[0] == '--serve':
+        # Importar os sistemas antes de configurar o log do daemon (eles configuram o próprio)
+        daemon = RebuildDaemon()
+        from logging.handlers import TimedRotatingFileHandler
+        os.makedirs(LOG_DIR, exist_ok=True)
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                TimedRotatingFileHandler(f"{LOG_DIR}/rebuild_daemon.log", when='midnight', backupCount=14),
+                logging.StreamHandler(sys.stdout)
+            ],
+            force=True
+        )
+        success = daemon.serve(watch='--watch' in args)
+    elif args == ['--status']:
+        response = send_command('status', timeout=CONNECT_TIMEOUT * 10)
+        if response is None:
+            print("Daemon de rebuild não está rodando")
+            success = False
+        else:
+            print(json.dumps(response, indent=2, ensure_ascii=False))
+            success = True
+    elif args == ['--stop']:
+        success = send_command('shutdown') is not None
+        print("Daemon de rebuild encerrando" if success else "Daemon de rebuild não está rodando")
+    else:
+        print("Uso: python3 rebuild_daemon.py [--serve [--watch]|--status|--stop]")
+        success = False
+
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
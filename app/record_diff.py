@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Diff de Indicações do Dashboard
+Compara duas versões do dashboard_data.json registro a registro (chave: numero)
+e informa indicações adicionadas, removidas, modificadas e recategorizadas
+"""
+
+import os
+import sys
+import json
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
+JSON_FILE = f"{PROJECT_ROOT}/app/public/dashboard_data.json"
+RECORD_INDEX_FILE = f"{PROJECT_ROOT}/.record_index.json"
+INDEX_VERSION = 1
+
+
+def _digest(value):
+    """Hash estável de um valor JSON (chaves ordenadas, sem espaços)"""
+    encoded = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.blake2b(encoded.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def build_record_index(data):
+    """Indexa cada indicação por número com seu hash e categoria"""
+    records = {}
+    category_meta = {}
+
+    for categoria, categoria_data in data.get('details', {}).items():
+        indicacoes = categoria_data.get('indicacoes', [])
+        category_meta[categoria] = {k: v for k, v in categoria_data.items() if k != 'indicacoes'}
+
+        for position, indicacao in enumerate(indicacoes):
+            key = indicacao.get('numero') or f"{categoria}#{position}"
+            if key in records:
+                logger.debug(f"Indicação duplicada: {key} ({records[key]['categoria']} e {categoria})")
+                key = f"{key}@{categoria}"
+            records[key] = {'hash': _digest(indicacao), 'categoria': categoria}
+
+    # Tudo que não é indicação conta como metadado
+    metadata = {k: v for k, v in data.items() if k != 'details'}
+    metadata['_categorias'] = category_meta
+
+    return {
+        'version': INDEX_VERSION,
+        'metadata_hash': _digest(metadata),
+        'records': records
+    }
+
+
+def diff_indexes(old_index, new_index):
+    """Compara dois índices em tempo linear"""
+    old_records = (old_index or {}).get('records', {})
+    new_records = new_index.get('records', {})
+
+    added = []
+    modified = []
+    recategorized = []
+    for numero, new_entry in new_records.items():
+        old_entry = old_records.get(numero)
+        if old_entry is None:
+            added.append(numero)
+            continue
+        if old_entry['categoria'] != new_entry['categoria']:
+            recategorized.append({
+                'numero': numero,
+                'de': old_entry['categoria'],
+                'para': new_entry['categoria']
+            })
+        if old_entry['hash'] != new_entry['hash']:
+            modified.append(numero)
+
+    removed = [numero for numero in old_records if numero not in new_records]
+    metadata_changed = (old_index or {}).get('metadata_hash') != new_index.get('metadata_hash')
+
+    affected_categories = set()
+    for numero in added + modified:
+        affected_categories.add(new_records[numero]['categoria'])
+    for numero in removed:
+        affected_categories.add(old_records[numero]['categoria'])
+    for item in recategorized:
+        affected_categories.update((item['de'], item['para']))
+
+    return {
+        'added': added,
+        'removed': removed,
+        'modified': modified,
+        'recategorized': recategorized,
+        'metadata_changed': metadata_changed,
+        'affected_categories': sorted(affected_categories),
+        'has_changes': bool(added or removed or modified or recategorized or metadata_changed)
+    }
+
+
+def format_diff_summary(diff):
+    """Resumo de uma linha para os logs"""
+    parts = [
+        f"+{len(diff['added'])}",
+        f"-{len(diff['removed'])}",
+        f"~{len(diff['modified'])}",
+        f"↔{len(diff['recategorized'])}"
+    ]
+    if diff['metadata_changed']:
+        parts.append("metadados")
+    return ' '.join(parts)
+
+
+class RecordDiffEngine:
+    """Mantém o índice por registro entre execuções e calcula o delta"""
+
+    def __init__(self, json_file=JSON_FILE, index_file=RECORD_INDEX_FILE):
+        self.json_file = json_file
+        self.index_file = index_file
+        self._pending_index = None
+
+    def load_index(self):
+        """Carrega o índice persistido da última versão processada"""
+        try:
+            if os.path.exists(self.index_file):
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                if index.get('version') == INDEX_VERSION:
+                    return index
+                logger.info("Índice de registros em versão antiga - será recriado")
+        except Exception as e:
+            logger.error(f"Erro ao ler índice de registros: {e}")
+        return None
+
+    def save_index(self, index):
+        """Persiste o índice de forma atômica"""
+        tmp_file = f"{self.index_file}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False)
+            os.replace(tmp_file, self.index_file)
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao salvar índice de registros: {e}")
+            return False
+
+    def compute_diff(self, data=None):
+        """Calcula o delta entre o índice salvo e o JSON atual"""
+        if data is None:
+            with open(self.json_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+        new_index = build_record_index(data)
+        diff = diff_indexes(self.load_index(), new_index)
+        self._pending_index = new_index
+
+        logger.info(f"🧮 Delta de indicações: {format_diff_summary(diff)}")
+        if diff['affected_categories']:
+            logger.info(f"📂 Categorias afetadas: {', '.join(diff['affected_categories'])}")
+        return diff
+
+    def commit(self):
+        """Confirma o último delta calculado como nova base"""
+        if self._pending_index is None:
+            return False
+        saved = self.save_index(self._pending_index)
+        self._pending_index = None
+        return saved
+
+
+def main():
+    """Compara dois arquivos ou o JSON atual contra o índice salvo"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if len(sys.argv) == 3:
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            old_index = build_record_index(json.load(f))
+        with open(sys.argv[2], 'r', encoding='utf-8') as f:
+            new_index = build_record_index(json.load(f))
+        diff = diff_indexes(old_index, new_index)
+    elif len(sys.argv) == 1:
+        diff = RecordDiffEngine().compute_diff()
+    else:
+        print("Uso: python3 record_diff.py [antigo.json novo.json]")
+        sys.exit(1)
+
+    print(json.dumps(diff, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Releases Imutáveis com Troca por Symlink
+Cada build (rápido, completo ou deploy integrado) vira uma release em
+.deploy/releases/<id> e entra no ar trocando o symlink .deploy/current de
+forma atômica e pedindo ao supervisor blue/green que a sirva; o rollback é só
+apontar o symlink para outra release. Arquivos iguais aos de releases anteriores
+viram hardlinks e a coleta de lixo mantém as N releases mais recentes
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+from datetime import datetime
+
+from change_detection import ChangeDetector, hash_file_contents
+from deploy_packaging import DEPLOY_DIR, list_build_files, manifest_id, restore_deploy
+from data_publisher import dashboard_lock, write_json_atomic
+from artifact_ops import remove_tree
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
+APP_DIR = f"{PROJECT_ROOT}/app"
+RELEASES_DIR_NAME = "releases"
+CURRENT_LINK_NAME = "current"
+STATE_FILE_NAME = "releases.json"
+RELEASE_INFO_NAME = ".release.json"
+KEEP_RELEASES = 5
+# Caminhos que o `next start` pode gravar: nunca compartilhados por hardlink
+MUTABLE_DIRS = ('cache', 'trace')
+# Dados publicados no build pelo rebuild rápido: o servidor os lê de public/
+# (recarga a quente), então não fazem parte da release nem do seu id
+PUBLISHED_DATA_PREFIX = os.path.join('static', 'dashboard_data')
+
+
+def _is_mutable(rel_path):
+    return rel_path.split(os.sep, 1)[0] in MUTABLE_DIRS
+
+
+def _is_release_file(rel_path):
+    """Arquivo do build que entra na release (sem cache/trace e sem os dados)"""
+    return not _is_mutable(rel_path) and not rel_path.startswith(PUBLISHED_DATA_PREFIX)
+
+
+class ReleaseManager:
+    """Cria, ativa, reverte e coleta releases em <deploy_dir>/releases"""
+
+    def __init__(self, deploy_dir=DEPLOY_DIR, codec=None, keep=KEEP_RELEASES):
+        self.deploy_dir = deploy_dir
+        self.codec = codec
+        self.keep = keep
+        self.releases_dir = os.path.join(deploy_dir, RELEASES_DIR_NAME)
+        self.current_link = os.path.join(deploy_dir, CURRENT_LINK_NAME)
+        # Mesmos fingerprints do empacotamento do build (deploy_packaging)
+        self.detector = ChangeDetector(os.path.join(deploy_dir, '.build_fingerprints.json'))
+        self.state_file = os.path.join(deploy_dir, STATE_FILE_NAME)
+
+    def release_dir(self, release_id):
+        return os.path.join(self.releases_dir, release_id)
+
+    def load_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'history': []}
+
+    def read_release(self, release_id):
+        with open(os.path.join(self.release_dir(release_id), RELEASE_INFO_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def list_releases(self):
+        """Releases completas, da mais antiga para a mais nova"""
+        releases = []
+        if not os.path.isdir(self.releases_dir):
+            return releases
+        for name in os.listdir(self.releases_dir):
+            if name.startswith('.'):
+                continue
+            try:
+                releases.append(self.read_release(name))
+            except (OSError, ValueError):
+                continue
+        return sorted(releases, key=lambda release: release['created_at'])
+
+    def current(self):
+        """Id da release apontada por `current` (None se ainda não há)"""
+        try:
+            return os.path.basename(os.readlink(self.current_link))
+        except OSError:
+            return None
+
+    def _known_files(self):
+        """Hash → arquivo já existente em alguma release (candidato a hardlink)"""
+        known = {}
+        for release in self.list_releases():
+            for rel_path, content_hash in release['files'].items():
+                if not _is_mutable(rel_path):
+                    known[content_hash] = os.path.join(self.release_dir(release['id']), rel_path)
+        return known
+
+    def _copy_build(self, build_dir, target_dir, files):
+        """Monta a release a partir do build: hardlink do que já existe em releases, cópia do resto
+
+        O build nunca é ligado por hardlink: o próximo build (ou a atualização
+        do JSON no build) não pode alterar arquivos de uma release.
+        """
+        known = self._known_files()
+        linked = 0
+        saved = 0
+        for rel_path, content_hash in files.items():
+            path = os.path.join(target_dir, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            source = known.get(content_hash)
+            if source and os.path.exists(source):
+                try:
+                    os.link(source, path)
+                    linked += 1
+                    saved += os.path.getsize(path)
+                    continue
+                except OSError:
+                    pass
+            shutil.copy2(os.path.join(build_dir, rel_path), path)
+        return linked, saved
+
+    def _link_unchanged(self, target_dir, files):
+        """Troca arquivos iguais (mesmo hash) aos das releases existentes por hardlinks"""
+        known = self._known_files()
+
+        linked = 0
+        saved = 0
+        for rel_path, content_hash in files.items():
+            source = known.get(content_hash)
+            if _is_mutable(rel_path) or not source or not os.path.exists(source):
+                continue
+            path = os.path.join(target_dir, rel_path)
+            tmp_path = f"{path}.link.tmp"
+            try:
+                os.link(source, tmp_path)
+                os.replace(tmp_path, path)
+            except OSError:
+                if os.path.lexists(tmp_path):
+                    os.remove(tmp_path)
+                continue
+            linked += 1
+            saved += os.path.getsize(path)
+        return linked, saved
+
+    def create_release(self, build_dir=None):
+        """Nova release com o build `build_dir` (ex: app/.next, sem cache/ e
+        sem os dados publicados) ou, sem ele, com o deploy empacotado
+
+        Se já existe uma release com o mesmo conteúdo ela é reaproveitada.
+        Retorna o id.
+        """
+        os.makedirs(self.releases_dir, exist_ok=True)
+        start_time = time.time()
+        incoming = os.path.join(self.releases_dir, f".incoming-{os.getpid()}")
+        remove_tree(incoming, deferred=False)
+        try:
+            if build_dir is None:
+                restore_deploy(incoming, self.deploy_dir, codec=self.codec)
+                files = {
+                    rel_path: hash_file_contents(os.path.join(incoming, rel_path))
+                    for rel_path in list_build_files(incoming)
+                }
+            else:
+                # Hash com cache por stat: sem build novo, nada do .next é relido
+                rel_paths = [rel_path for rel_path in list_build_files(build_dir) if _is_release_file(rel_path)]
+                hashes = self.detector.file_hashes([os.path.join(build_dir, rel_path) for rel_path in rel_paths])
+                files = {rel_path: hashes[os.path.abspath(os.path.join(build_dir, rel_path))] for rel_path in rel_paths}
+            content_id = manifest_id({rel_path: {'hash': value} for rel_path, value in files.items()})
+
+            for release in self.list_releases():
+                if release['content_id'] == content_id:
+                    logger.info(f"Release {release['id']} já contém este build - reaproveitada")
+                    remove_tree(incoming)
+                    return release['id']
+
+            if build_dir is None:
+                linked, saved = self._link_unchanged(incoming, files)
+            else:
+                linked, saved = self._copy_build(build_dir, incoming, files)
+            # Arquivos do build ficam somente leitura (hardlinks são compartilhados)
+            for rel_path in files:
+                if not _is_mutable(rel_path):
+                    os.chmod(os.path.join(incoming, rel_path), 0o444)
+
+            release_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{content_id[:8]}"
+            info = {
+                'id': release_id,
+                'content_id': content_id,
+                'created_at': datetime.now().isoformat(),
+                'files': files,
+                'linked_files': linked,
+                'linked_bytes': saved
+            }
+            write_json_atomic(os.path.join(incoming, RELEASE_INFO_NAME), info)
+            os.rename(incoming, self.release_dir(release_id))
+        except BaseException:
+            remove_tree(incoming, deferred=False)
+            raise
+
+        logger.info(
+            f"📦 Release {release_id} criada em {time.time() - start_time:.2f}s: {len(files)} arquivos, "
+            f"{linked} hardlinks ({saved / (1024 * 1024):.1f} MB reaproveitados)"
+        )
+        return release_id
+
+    def activate(self, release_id):
+        """Aponta `current` para a release (symlink novo + rename atômico); retorna ms"""
+        if not os.path.isfile(os.path.join(self.release_dir(release_id), RELEASE_INFO_NAME)):
+            raise ValueError(f"Release não encontrada: {release_id}")
+
+        with dashboard_lock(self.state_file):
+            previous = self.current()
+            start_time = time.perf_counter()
+            tmp_link = f"{self.current_link}.{os.getpid()}.tmp"
+            if os.path.lexists(tmp_link):
+                os.remove(tmp_link)
+            os.symlink(os.path.join(RELEASES_DIR_NAME, release_id), tmp_link)
+            os.replace(tmp_link, self.current_link)
+            switch_ms = (time.perf_counter() - start_time) * 1000
+
+            state = self.load_state()
+            if previous != release_id:
+                state['history'].append({'id': release_id, 'previous': previous,
+                                         'activated_at': datetime.now().isoformat()})
+                write_json_atomic(self.state_file, state)
+
+        logger.info(f"🔀 Release ativa: {release_id} (antes: {previous}, troca em {switch_ms:.3f} ms)")
+        return switch_ms
+
+    def rollback(self, release_id=None):
+        """Volta para `release_id` ou para a release ativa antes da atual"""
+        if release_id is None:
+            current = self.current()
+            history = [entry for entry in self.load_state()['history'] if entry['id'] == current]
+            release_id = history[-1]['previous'] if history else None
+            if not release_id:
+                raise ValueError("Não há release anterior para rollback")
+        return release_id, self.activate(release_id)
+
+    def collect_garbage(self, keep=None):
+        """Remove releases além das `keep` mais recentes (a ativa nunca é removida)"""
+        keep = keep or self.keep
+        releases = self.list_releases()
+        current = self.current()
+        retained = {release['id'] for release in releases[-keep:]} | {current}
+        removed = []
+        for release in releases:
+            if release['id'] not in retained:
+                remove_tree(self.release_dir(release['id']))
+                removed.append(release['id'])
+                logger.info(f"🧹 Release removida: {release['id']}")
+        return removed
+
+    def deploy(self, build_dir=None, notify=True):
+        """Cria (ou reaproveita) a release do build, ativa e coleta as antigas
+
+        Se a release já está ativa nada muda; senão, com `notify`, pede ao
+        supervisor blue/green (se estiver rodando) que suba uma instância com
+        ela e troque o tráfego.
+        """
+        release_id = self.create_release(build_dir)
+        if self.current() == release_id:
+            return release_id
+        self.activate(release_id)
+        self.collect_garbage()
+        if notify:
+            notify_supervisor()
+        return release_id
+
+
+def notify_supervisor():
+    """Faz o supervisor servir a release ativa; None se ele não estiver rodando"""
+    # Import tardio: server_supervisor importa este módulo
+    from server_supervisor import SUPERVISOR_SOCKET, request_deploy
+    from rebuild_daemon import send_command
+
+    if not send_command('ping', socket_path=SUPERVISOR_SOCKET, timeout=1):
+        logger.info("Supervisor não está rodando - a release ativa entra no ar quando ele subir")
+        return None
+    result = request_deploy()
+    if result and result.get('success'):
+        logger.info(f"✅ Release no ar ({result['color']}) após {result['ready_seconds']}s, troca em {result['switch_ms']} ms")
+    else:
+        logger.error(f"❌ Supervisor não trocou para a release ativa: {result}")
+    return result
+
+
+def current_dist_dir(app_dir=APP_DIR, deploy_dir=DEPLOY_DIR):
+    """distDir (relativo ao app) da release ativa resolvida, ou None sem releases
+
+    A instância aponta para o diretório da release, não para o symlink: trocar
+    `current` depois não altera arquivos de uma instância em execução.
+    """
+    current_link = os.path.join(deploy_dir, CURRENT_LINK_NAME)
+    if not os.path.islink(current_link):
+        return None
+    return os.path.relpath(os.path.realpath(current_link), app_dir)
+
+
+def main():
+    """python3 release_manager.py [--create [build]|--list|--activate <id>|--rollback [id]|--gc [n]]"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = sys.argv[1:]
+    manager = ReleaseManager()
+
+    if args and args[0] == '--create' and len(args) <= 2:
+        print(manager.deploy(args[1] if len(args) == 2 else f"{APP_DIR}/.next"))
+        success = True
+    elif args == ['--list']:
+        current = manager.current()
+        for release in manager.list_releases():
+            marker = '*' if release['id'] == current else ' '
+            print(f"{marker} {release['id']}  {len(release['files']):>6} arquivos  "
+                  f"{release.get('linked_files', 0):>6} hardlinks")
+        success = True
+    elif args and args[0] in ('--activate', '--rollback') and len(args) <= 2:
+        if args[0] == '--activate' and len(args) != 2:
+            print("Uso: python3 release_manager.py --activate <id>")
+            sys.exit(1)
+        try:
+            if args[0] == '--activate':
+                release_id, switch_ms = args[1], manager.activate(args[1])
+            else:
+                release_id, switch_ms = manager.rollback(args[1] if len(args) == 2 else None)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"Release ativa: {release_id} (troca em {switch_ms:.3f} ms)")
+
+        # Com o supervisor rodando, o tráfego segue a release (blue/green)
+        result = notify_supervisor()
+        success = result is None or bool(result.get('success'))
+    elif args and args[0] == '--gc' and len(args) <= 2:
+        removed = manager.collect_garbage(int(args[1]) if len(args) == 2 else None)
+        print(f"{len(removed)} release(s) removida(s)")
+        success = True
+    else:
+        print("Uso: python3 release_manager.py [--create [build]|--list|--activate <id>|--rollback [id]|--gc [n]]")
+        success = False
+
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
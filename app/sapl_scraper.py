@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Coleta Assíncrona das Listagens do SAPL
+Percorre todas as páginas de uma listagem do SAPL com um pool de conexões
+keep-alive, concorrência limitada e um token bucket de cortesia. A última
+página é descoberta pelos links de paginação (o SAPL mostra só uma janela de
+páginas, então cada página lida pode revelar novas). As respostas passam pelo
+cache HTTP em disco (http_cache.py): páginas que não mudaram não são baixadas
+nem parseadas de novo. Informa páginas/s e o tempo total; --replay roda contra
+um servidor local com páginas gravadas
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import logging
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+from http_cache import HTTPCache, body_hash
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
+SAPL_LISTING_URL = "https://sapl.camarabento.rs.gov.br/ta/indicacao/"
+SAPL_YEAR = 2025
+CONCURRENCY = 4
+RATE_PER_SECOND = 4.0   # token bucket: requisições por segundo em regime
+BURST = 4               # requisições permitidas de uma vez
+TIMEOUT_SECONDS = 10
+RETRIES = 2
+KEEPALIVE_SECONDS = 30
+MAX_PAGES = 500
+USER_AGENT = "dashboard-indicacoes/1.0 (+monitoramento de indicações)"
+LINK_PATTERN = re.compile(r'/(?:ta/indicacao|materia)/(\d+)')
+PAGE_PATTERN = re.compile(r'[?&]page=(\d+)')
+PARSER_VERSION = 1      # aumentar ao mudar parse_listing/LINK_PATTERN/PAGE_PATTERN (invalida o cache)
+RECORDED_PAGE_NAME = "page_{page}.html"
+MONITORING_CONFIG = f"{PROJECT_ROOT}/monitoring_system/config/system_config.json"
+
+
+def page_url(base_url, page):
+    """URL da listagem com ?page=N (os demais filtros da consulta são mantidos)"""
+    parts = urlsplit(base_url)
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != 'page']
+    return urlunsplit(parts._replace(query=urlencode([('page', str(page))] + query)))
+
+
+def monitoring_url(config_file=MONITORING_CONFIG):
+    """URL da pesquisa de matérias usada pelo monitoramento (system_config.json)"""
+    with open(config_file, 'r', encoding='utf-8') as f:
+        return json.load(f)['monitoring']['url']
+
+
+def parse_listing(html, year=SAPL_YEAR):
+    """IDs da página ({numero: sapl_id}) e maior página citada na paginação"""
+    soup = BeautifulSoup(html, 'html.parser')
+    ids = {}
+    for link in soup.find_all('a', href=LINK_PATTERN):
+        numero_match = re.search(rf'(\d+)/{year}', link.get_text(strip=True))
+        if numero_match:
+            ids[int(numero_match.group(1))] = LINK_PATTERN.search(link['href']).group(1)
+    pages = [int(PAGE_PATTERN.search(link['href']).group(1)) for link in soup.find_all('a', href=PAGE_PATTERN)]
+    return ids, max(pages, default=1)
+
+
+class TokenBucket:
+    """Limite de cortesia: `rate` requisições/s com rajadas de até `burst`"""
+
+    def __init__(self, rate=RATE_PER_SECOND, burst=BURST):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class SaplScraper:
+    """Lê todas as páginas de uma listagem do SAPL e junta os IDs encontrados"""
+
+    def __init__(self, base_url=SAPL_LISTING_URL, concurrency=CONCURRENCY, rate=RATE_PER_SECOND,
+                 burst=BURST, timeout=TIMEOUT_SECONDS, max_pages=MAX_PAGES, year=SAPL_YEAR, record_dir=None, cache=None):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.year = year
+        self.parser_key = f"{year}:{PARSER_VERSION}"
+        self.record_dir = record_dir
+        self.cache = cache
+        self.stats = {}
+
+    def _session(self):
+        trace = aiohttp.TraceConfig()
+
+        async def on_connection_created(session, context, params):
+            self.stats['connections'] += 1
+
+        trace.on_connection_create_end.append(on_connection_created)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=KEEPALIVE_SECONDS)
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={'User-Agent': USER_AGENT},
+            trace_configs=[trace]
+        )
+
+    async def fetch(self, session, bucket, url, headers=None):
+        """(status, cabeçalhos, corpo) da página; None se falhar após as tentativas"""
+        for attempt in range(RETRIES + 1):
+            await bucket.acquire()
+            self.stats['requests'] += 1
+            try:
+                async with session.get(url, headers=headers) as response:
+                    body = await response.read()
+                    self.stats['bytes'] += len(body)
+                    if response.status in (200, 304):
+                        return response.status, response.headers, body
+                    logger.warning(f"HTTP {response.status} em {url}")
+                    if response.status < 500:
+                        return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"Falha ao buscar {url} (tentativa {attempt + 1}): {e!r}")
+            await asyncio.sleep(0.5 * (attempt + 1))
+        return None
+
+    def _parse(self, body):
+        ids, last_page = parse_listing(body, self.year)
+        return {'ids': {str(numero): sapl_id for numero, sapl_id in ids.items()}, 'last_page': last_page}
+
+    async def fetch_listing(self, session, bucket, page):
+        """Página parseada ({'ids', 'last_page'}), via cache HTTP quando houver"""
+        url = page_url(self.base_url, page)
+        entry = self.cache.lookup(url) if self.cache else None
+        body = None
+        if self.cache and self.cache.is_fresh(entry):
+            result = self.cache.hit(entry, self._parse, self.parser_key)
+        else:
+            response = await self.fetch(session, bucket, url, self.cache.validators(entry) if self.cache else None)
+            if response is None:
+                return None
+            status, headers, body = response
+            if self.cache:
+                result = self.cache.resolve(url, entry, status, headers, body, self._parse, self.parser_key)
+            elif status == 200:
+                result = self._parse(body)
+            else:
+                return None
+        if self.record_dir:
+            self._record(page, body if body else self.cache.read_body(entry))
+        return result
+
+    def _record(self, page, body):
+        os.makedirs(self.record_dir, exist_ok=True)
+        with open(os.path.join(self.record_dir, RECORDED_PAGE_NAME.format(page=page)), 'wb') as f:
+            f.write(body)
+
+    async def scrape(self):
+        """Retorna {numero: sapl_id} de todas as páginas; estatísticas em self.stats"""
+        self.stats = {'pages': 0, 'failed_pages': [], 'last_page': 1, 'requests': 0, 'connections': 0, 'bytes': 0}
+        start_time = time.perf_counter()
+        bucket = TokenBucket(self.rate, self.burst)
+        results = {}
+        scheduled = {1}
+        queue = asyncio.Queue()
+        queue.put_nowait(1)
+
+        async with self._session() as session:
+            async def worker():
+                while True:
+                    page = await queue.get()
+                    try:
+                        listing = await self.fetch_listing(session, bucket, page)
+                        if listing is None:
+                            self.stats['failed_pages'].append(page)
+                            continue
+                        results[page] = {int(numero): sapl_id for numero, sapl_id in listing['ids'].items()}
+                        self.stats['pages'] += 1
+                        self.stats['last_page'] = max(self.stats['last_page'], min(listing['last_page'], self.max_pages))
+                        for next_page in range(2, self.stats['last_page'] + 1):
+                            if next_page not in scheduled:
+                                scheduled.add(next_page)
+                                queue.put_nowait(next_page)
+                    except Exception as e:
+                        logger.error(f"Erro ao processar página {page}: {e}")
+                        self.stats['failed_pages'].append(page)
+                    finally:
+                        queue.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            try:
+                await queue.join()
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+        ids_found = {}
+        for page in sorted(results):
+            ids_found.update(results[page])
+
+        wall_seconds = time.perf_counter() - start_time
+        self.stats.update({
+            'ids': len(ids_found),
+            'wall_seconds': round(wall_seconds, 3),
+            'pages_per_second': round(self.stats['pages'] / wall_seconds, 2) if wall_seconds else 0.0
+        })
+        self.stats['failed_pages'].sort()
+        if self.cache:
+            self.stats['cache'] = {key: round(value, 4) if isinstance(value, float) else value
+                                   for key, value in self.cache.stats.items()}
+            self.cache.log_summary("Cache HTTP do SAPL")
+        logger.info(
+            f"📄 SAPL: {self.stats['pages']}/{self.stats['last_page']} páginas em {wall_seconds:.2f}s "
+            f"({self.stats['pages_per_second']} páginas/s, {self.stats['requests']} requisições, "
+            f"{self.stats['connections']} conexões, {self.stats['bytes'] / 1024:.0f} KB)"
+        )
+        return ids_found
+
+
+def scrape_sapl_ids(base_url=SAPL_LISTING_URL, **options):
+    """Versão síncrona: ({numero: sapl_id}, estatísticas); usa o cache HTTP salvo `cache=None`"""
+    options.setdefault('cache', HTTPCache())
+    scraper = SaplScraper(base_url, **options)
+    ids_found = asyncio.run(scraper.scrape())
+    return ids_found, scraper.stats
+
+
+class _RecordedPagesHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        page = dict(parse_qsl(urlsplit(self.path).query)).get('page', '1')
+        path = os.path.join(self.server.pages_dir, RECORDED_PAGE_NAME.format(page=page))
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        if not page.isdigit() or not os.path.isfile(path):
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        with open(path, 'rb') as f:
+            body = f.read()
+        etag = f'"{body_hash(body)}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', self.date_time_string(int(os.path.getmtime(path))))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_recorded_pages(pages_dir, host='127.0.0.1', port=0, delay=0.0):
+    """Servidor HTTP/1.1 local (keep-alive) que responde ?page=N com page_N.html
+
+    Envia ETag/Last-Modified e responde 304 a If-None-Match. Substitui o SAPL em testes e medições; `delay` simula a latência da rede.
+    Retorna o servidor já rodando em segundo plano (URL em server.url).
+    """
+    server = ThreadingHTTPServer((host, port), _RecordedPagesHandler)
+    server.daemon_threads = True
+    server.pages_dir = pages_dir
+    server.delay = delay
+    server.url = f"http://{host}:{server.server_address[1]}/ta/indicacao/"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    """python3 sapl_scraper.py [url]|--monitoring|--record <dir> [url]|--replay <dir> [atraso_ms]"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = sys.argv[1:]
+
+    if len(args) <= 1 and not (args and args[0].startswith('--')):
+        _, stats = scrape_sapl_ids(args[0] if args else SAPL_LISTING_URL)
+    elif args == ['--monitoring']:
+        _, stats = scrape_sapl_ids(monitoring_url())
+    elif args and args[0] == '--record' and len(args) in (2, 3):
+        _, stats = scrape_sapl_ids(args[2] if len(args) == 3 else SAPL_LISTING_URL, record_dir=args[1])
+    elif args and args[0] == '--replay' and len(args) in (2, 3):
+        # Duas execuções com um cache temporário: a fria baixa e parseia, a seguinte revalida
+        server = serve_recorded_pages(args[1], delay=int(args[2]) / 1000 if len(args) == 3 else 0.0)
+        try:
+            with tempfile.TemporaryDirectory() as cache_dir:
+                _, cold = scrape_sapl_ids(server.url, cache=HTTPCache(cache_dir))
+                _, stats = scrape_sapl_ids(server.url, cache=HTTPCache(cache_dir))
+        finally:
+            server.shutdown()
+        stats = {'cold': cold, 'warm': stats, 'failed_pages': cold['failed_pages'] + stats['failed_pages']}
+    else:
+        print("Uso: python3 sapl_scraper.py [url]|--monitoring|--record <dir> [url]|--replay <dir> [atraso_ms]")
+        sys.exit(1)
+
+    print(json.dumps(stats, indent=2))
+    sys.exit(0 if not stats['failed_pages'] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Índice de Busca Pré-computado
+Gerado a cada versão publicada: tokens normalizados (minúsculas, sem acentos,
+"Ângelo" → "angelo") de número, descrição e rua, em ordem, cada um com a
+lista de registros onde aparece. O cliente busca por prefixo com pesquisa
+binária e interseção das listas, sem varrer as indicações a cada tecla
+"""
+
+import re
+import sys
+import json
+import logging
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
+DASHBOARD_FILE = f"{PROJECT_ROOT}/app/public/dashboard_data.json"
+SEARCH_FIELDS = ('numero', 'descricao', 'rua')
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def fold_text(text):
+    """Minúsculas sem acentos (mesma regra de foldText em lib/search-index.ts)
+
+    Remove toda marca combinante (categorias Unicode Mn/Mc/Me, como /\\p{M}/u no TypeScript)
+    """
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.category(c).startswith('M')).lower()
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(fold_text(text))
+
+
+def _delta_encode(ids):
+    previous = 0
+    deltas = []
+    for record_id in ids:
+        deltas.append(record_id - previous)
+        previous = record_id
+    return deltas
+
+
+def build_search_index(data):
+    """Monta o índice do documento
+
+    Registros são numerados em sequência, categoria por categoria, na ordem de
+    `details`: o registro `offsets[i] + p` é a indicação `p` da categoria `i`.
+    As listas de registros são gravadas como diferenças (delta) para ocupar menos.
+    """
+    categories = []
+    offsets = [0]
+    postings = {}
+    record_id = 0
+    for category, category_data in data.get('details', {}).items():
+        categories.append(category)
+        for indicacao in category_data.get('indicacoes', []):
+            tokens = set()
+            for field in SEARCH_FIELDS:
+                tokens.update(tokenize(str(indicacao.get(field) or '')))
+            for token in tokens:
+                postings.setdefault(token, []).append(record_id)
+            record_id += 1
+        offsets.append(record_id)
+
+    tokens = sorted(postings)
+    return {
+        'fields': list(SEARCH_FIELDS),
+        'categories': categories,
+        'offsets': offsets,
+        'tokens': tokens,
+        'postings': [_delta_encode(postings[token]) for token in tokens]
+    }
+
+
+def search(index, query):
+    """Referência em Python da busca do cliente: ids de registros que casam"""
+    ranges = []
+    tokens = index['tokens']
+    for term in tokenize(query):
+        matched = set()
+        start = _lower_bound(tokens, term)
+        for position in range(start, len(tokens)):
+            if not tokens[position].startswith(term):
+                break
+            record_id = 0
+            for delta in index['postings'][position]:
+                record_id += delta
+                matched.add(record_id)
+        ranges.append(matched)
+    if not ranges:
+        return set()
+    return set.intersection(*ranges)
+
+
+def _lower_bound(tokens, term):
+    low, high = 0, len(tokens)
+    while low < high:
+        middle = (low + high) // 2
+        if tokens[middle] < term:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def main():
+    """Mostra estatísticas do índice ou executa uma busca (--search <termo>)"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    with open(DASHBOARD_FILE, 'r', encoding='utf-8') as f:
+        index = build_search_index(json.load(f))
+
+    if len(sys.argv) > 2 and sys.argv[1] == '--search':
+        matches = sorted(search(index, ' '.join(sys.argv[2:])))
+        print(json.dumps({'matches': len(matches), 'records': matches}, ensure_ascii=False))
+    else:
+        print(json.dumps({
+            'records': index['offsets'][-1],
+            'categories': len(index['categories']),
+            'tokens': len(index['tokens']),
+            'bytes': len(json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Serviço de Busca Paginada (SQLite FTS5)
+O pipeline de publicação mantém um banco SQLite local com uma tabela FTS5
+sobre número, descrição, rua e categoria; o serviço responde buscas com
+ranking (bm25), facetas por categoria e contagens pelo socket Unix
+.search_service.sock, consultado pela rota /api/search do Next.js
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import signal
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+import socketserver
+
+from change_detection import DIGEST_SIZE
+from rebuild_daemon import send_command
+from search_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
+DASHBOARD_FILE = f"{PROJECT_ROOT}/app/public/dashboard_data.json"
+SEARCH_DB_FILE = f"{PROJECT_ROOT}/.data/search.db"
+SOCKET_PATH = f"{PROJECT_ROOT}/.search_service.sock"
+LOG_DIR = f"{PROJECT_ROOT}/.logs"
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Pesos do bm25 por coluna: numero, descricao, rua, categoria
+RANK_WEIGHTS = (10.0, 1.0, 4.0, 2.0)
+# Acima disso os termos aparecem em quase tudo (IDF ~ 0) e o ranking não
+# diferencia resultados: a ordem do documento evita calcular bm25 de cada um
+RANKED_MATCH_LIMIT = 20_000
+BENCHMARK_SIZES = (10_000, 100_000)
+BENCHMARK_QUERIES = ('rua', 'angelo', 'ilum', 'buraco rua', '2025', 'pavimentacao asfalt', 'marcon 12')
+BENCHMARK_REPEAT = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_records (
+    id INTEGER PRIMARY KEY,
+    categoria TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    numero TEXT,
+    descricao TEXT,
+    rua TEXT,
+    pdf_url TEXT,
+    row_hash TEXT NOT NULL,
+    UNIQUE (categoria, position)
+);
+CREATE INDEX IF NOT EXISTS search_records_categoria ON search_records (categoria);
+CREATE VIRTUAL TABLE IF NOT EXISTS search_records_fts USING fts5(
+    numero, descricao, rua, categoria,
+    content='search_records', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS search_records_ai AFTER INSERT ON search_records BEGIN
+    INSERT INTO search_records_fts (rowid, numero, descricao, rua, categoria)
+    VALUES (new.id, new.numero, new.descricao, new.rua, new.categoria);
+END;
+CREATE TRIGGER IF NOT EXISTS search_records_ad AFTER DELETE ON search_records BEGIN
+    INSERT INTO search_records_fts (search_records_fts, rowid, numero, descricao, rua, categoria)
+    VALUES ('delete', old.id, old.numero, old.descricao, old.rua, old.categoria);
+END;
+CREATE TRIGGER IF NOT EXISTS search_records_au AFTER UPDATE ON search_records BEGIN
+    INSERT INTO search_records_fts (search_records_fts, rowid, numero, descricao, rua, categoria)
+    VALUES ('delete', old.id, old.numero, old.descricao, old.rua, old.categoria);
+    INSERT INTO search_records_fts (rowid, numero, descricao, rua, categoria)
+    VALUES (new.id, new.numero, new.descricao, new.rua, new.categoria);
+END;
+CREATE TABLE IF NOT EXISTS search_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _row_hash(values):
+    payload = json.dumps(values, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=DIGEST_SIZE).hexdigest()
+
+
+def build_match_query(query):
+    """Consulta FTS5 segura: cada palavra vira um prefixo entre aspas ("angelo"*)"""
+    return ' AND '.join(f'"{token}"*' for token in tokenize(query))
+
+
+class SearchDatabase:
+    """Banco de busca derivado do dashboard_data.json"""
+
+    def __init__(self, db_file=SEARCH_DB_FILE):
+        self.db_file = db_file
+        self._local = threading.local()
+
+    def connect(self):
+        """Conexão da thread atual (WAL: leituras não bloqueiam a publicação)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_file)), exist_ok=True)
+            conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def sync(self, data, version=None):
+        """Atualiza o banco com o documento: só registros alterados são regravados
+
+        Retorna {'inserted', 'updated', 'deleted', 'seconds'}.
+        """
+        start_time = time.perf_counter()
+        conn = self.connect()
+        counts = {'inserted': 0, 'updated': 0, 'deleted': 0}
+        with conn:
+            existing = {
+                (categoria, position): (row_id, row_hash)
+                for row_id, categoria, position, row_hash in conn.execute(
+                    'SELECT id, categoria, position, row_hash FROM search_records'
+                )
+            }
+            for categoria, category_data in data.get('details', {}).items():
+                for position, indicacao in enumerate(category_data.get('indicacoes', [])):
+                    values = [
+                        str(indicacao.get('numero') or ''),
+                        str(indicacao.get('descricao') or ''),
+                        str(indicacao.get('rua') or ''),
+                        indicacao.get('pdfUrl')
+                    ]
+                    row_hash = _row_hash(values)
+                    current = existing.pop((categoria, position), None)
+                    if current is None:
+                        conn.execute(
+                            'INSERT INTO search_records (categoria, position, numero, descricao, rua, pdf_url, row_hash) '
+                            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (categoria, position, *values, row_hash)
+                        )
+                        counts['inserted'] += 1
+                    elif current[1] != row_hash:
+                        conn.execute(
+                            'UPDATE search_records SET numero = ?, descricao = ?, rua = ?, pdf_url = ?, row_hash = ? '
+                            'WHERE id = ?',
+                            (*values, row_hash, current[0])
+                        )
+                        counts['updated'] += 1
+            for row_id, _ in existing.values():
+                conn.execute('DELETE FROM search_records WHERE id = ?', (row_id,))
+                counts['deleted'] += 1
+            conn.execute(
+                'INSERT OR REPLACE INTO search_meta (key, value) VALUES (?, ?)', ('version', version or '')
+            )
+        counts['seconds'] = round(time.perf_counter() - start_time, 3)
+        return counts
+
+    def version(self):
+        row = self.connect().execute("SELECT value FROM search_meta WHERE key = 'version'").fetchone()
+        return row[0] if row else None
+
+    def search(self, query='', category=None, page=1, page_size=DEFAULT_PAGE_SIZE):
+        """Busca paginada com ranking, facetas por categoria e contagens
+
+        Sem termos, lista todos os registros na ordem do documento.
+        """
+        start_time = time.perf_counter()
+        conn = self.connect()
+        page = max(int(page or 1), 1)
+        page_size = min(max(int(page_size or DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+        match = build_match_query(query or '')
+
+        if match:
+            source = ('FROM search_records_fts JOIN search_records r ON r.id = search_records_fts.rowid '
+                      'WHERE search_records_fts MATCH ?')
+            params = [match]
+        else:
+            source = 'FROM search_records r WHERE 1 = 1'
+            params = []
+
+        facets = [
+            {'categoria': categoria, 'count': count}
+            for categoria, count in conn.execute(
+                f'SELECT r.categoria, COUNT(*) {source} GROUP BY r.categoria ORDER BY COUNT(*) DESC, r.categoria',
+                params
+            )
+        ]
+        if category:
+            source += ' AND r.categoria = ?'
+            params.append(category)
+            total = next((facet['count'] for facet in facets if facet['categoria'] == category), 0)
+        else:
+            total = sum(facet['count'] for facet in facets)
+
+        ranked = bool(match) and sum(facet['count'] for facet in facets) <= RANKED_MATCH_LIMIT
+        if ranked:
+            rank = f"bm25(search_records_fts, {', '.join(str(w) for w in RANK_WEIGHTS)})"
+            order = 'rank, r.id'
+        else:
+            rank = '0.0'
+            # Com MATCH, a ordem de rowid vem pronta do índice FTS (sem ordenar os resultados)
+            order = 'search_records_fts.rowid' if match else 'r.id'
+
+        rows = conn.execute(
+            f'SELECT r.categoria, r.numero, r.descricao, r.rua, r.pdf_url, {rank} AS rank {source} '
+            f'ORDER BY {order} LIMIT ? OFFSET ?',
+            params + [page_size, (page - 1) * page_size]
+        ).fetchall()
+
+        return {
+            'query': query or '',
+            'category': category,
+            'page': page,
+            'page_size': page_size,
+            'pages': (total + page_size - 1) // page_size,
+            'total': total,
+            'ranked': ranked,
+            'facets': facets,
+            'results': [
+                {'categoria': categoria, 'numero': numero, 'descricao': descricao, 'rua': rua,
+                 'pdfUrl': pdf_url, 'rank': round(score, 4)}
+                for categoria, numero, descricao, rua, pdf_url, score in rows
+            ],
+            'version': self.version(),
+            'took_ms': round((time.perf_counter() - start_time) * 1000, 3)
+        }
+
+
+def sync_search_database(path=DASHBOARD_FILE, version=None, db_file=None):
+    """Chamado na publicação: atualiza o banco de busca a partir do JSON publicado"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    database = SearchDatabase(db_file or SEARCH_DB_FILE)
+    try:
+        counts = database.sync(data, version)
+    finally:
+        database.close()
+    logger.info(
+        f"🔎 Banco de busca atualizado: {counts['inserted']} inseridos, {counts['updated']} alterados, "
+        f"{counts['deleted']} removidos ({counts['seconds']}s)"
+    )
+    return counts
+
+
+class SearchService:
+    """Atende buscas pelo socket Unix (uma conexão SQLite por thread)"""
+
+    def __init__(self, db_file=SEARCH_DB_FILE, socket_path=SOCKET_PATH):
+        self.database = SearchDatabase(db_file)
+        self.socket_path = socket_path
+        self.started_at = time.time()
+        self.queries = 0
+
+    def handle(self, request):
+        command = request.get('command')
+        if command == 'ping':
+            return {'ok': True, 'pid': os.getpid()}
+        if command == 'status':
+            return {'ok': True, 'pid': os.getpid(), 'version': self.database.version(), 'queries': self.queries,
+                    'uptime_seconds': round(time.time() - self.started_at, 1)}
+        if command == 'shutdown':
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return {'ok': True}
+        if command != 'search':
+            return {'ok': False, 'error': f"Comando desconhecido: {command}"}
+
+        self.queries += 1
+        result = self.database.search(
+            request.get('query', ''), request.get('category'), request.get('page', 1),
+            request.get('page_size', DEFAULT_PAGE_SIZE)
+        )
+        return dict(result, ok=True)
+
+    def serve(self):
+        """Atende o socket até receber SIGTERM/SIGINT ou o comando shutdown"""
+        if send_command('ping', socket_path=self.socket_path, timeout=1):
+            logger.error(f"Serviço de busca já está rodando em {self.socket_path}")
+            return False
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        response = service.handle(json.loads(line))
+                    except Exception as e:
+                        logger.error(f"Erro ao processar busca: {e}")
+                        response = {'ok': False, 'error': str(e)}
+                    self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                service.database.close()
+
+        self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self.server.daemon_threads = True
+        os.chmod(self.socket_path, 0o600)
+
+        def stop(signum, frame):
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, stop)
+            signal.signal(signal.SIGINT, stop)
+
+        logger.info(f"🔎 Serviço de busca ouvindo em {self.socket_path} (banco {self.database.db_file})")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            logger.info("🛑 Serviço de busca encerrado")
+        return True
+
+
+def _synthetic_corpus(size, seed=42):
+    """Documento sintético com `size` indicações, no formato do dashboard_data.json"""
+    rng = random.Random(seed)
+    categories = ['Iluminação Pública', 'Sinalização e Trânsito', 'Pavimentação e Vias',
+                  'Manutenção e Limpeza Urbana', 'Gestão de Resíduos', 'Planejamento Urbano e Programas',
+                  'Espaços Públicos e Infraestrutura', 'Prédios Públicos']
+    streets = ['Ângelo Marcon', 'Angelo Tecchio', 'Fiorelo Ross', 'Joaquim Manfredini', 'Elias Luchese',
+               'Avelino Menegotto', 'São Roque', 'Planalto', 'Borges de Medeiros', 'Marechal Deodoro',
+               'Herny Hugo Dreher', 'Assis Brasil']
+    actions = ['reparar buraco', 'trocar lâmpada', 'pintar faixa de pedestres', 'recolher entulho',
+               'instalar placa', 'refazer pavimentação asfáltica', 'podar árvores', 'limpar bueiro',
+               'iluminação do trecho', 'recapeamento da via']
+    details = {category: {'sheet_name': category, 'indicacoes': []} for category in categories}
+    for number in range(size):
+        street = rng.choice(streets)
+        details[rng.choice(categories)]['indicacoes'].append({
+            'numero': f"{number % 9000 + 1}/{rng.choice([2022, 2023, 2024, 2025])}",
+            'descricao': f"Solicita à Secretaria competente {rng.choice(actions)} na Rua {street}, "
+                         f"nº {rng.randint(1, 3000)}, bairro {rng.choice(streets)}",
+            'rua': f"Rua {street}"
+        })
+    for category_data in details.values():
+        category_data['total_indicacoes'] = len(category_data['indicacoes'])
+    return {'details': details}
+
+
+def run_benchmark(sizes=BENCHMARK_SIZES, queries=BENCHMARK_QUERIES, repeat=BENCHMARK_REPEAT):
+    """Latência de busca (página 1 + facetas) em corpora sintéticos de cada tamanho"""
+    report = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            database = SearchDatabase(os.path.join(tmp_dir, 'search.db'))
+            start_time = time.perf_counter()
+            database.sync(_synthetic_corpus(size), 'benchmark')
+            build_seconds = time.perf_counter() - start_time
+            for query in queries:
+                timings = []
+                for _ in range(repeat):
+                    start_time = time.perf_counter()
+                    result = database.search(query)
+                    timings.append((time.perf_counter() - start_time) * 1000)
+                timings.sort()
+                report.append({
+                    'records': size,
+                    'query': query,
+                    'matches': result['total'],
+                    'p50_ms': round(timings[len(timings) // 2], 3),
+                    'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 3),
+                    'build_seconds': round(build_seconds, 2)
+                })
+            database.close()
+    return report
+
+
+def main():
+    """python3 search_service.py [--serve|--sync|--query <termo> [--category <c>] [--page <n>]|--benchmark|--stop]"""
+    args = sys.argv[1:]
+
+    if args == ['--serve']:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        from logging.handlers import TimedRotatingFileHandler
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                TimedRotatingFileHandler(f"{LOG_DIR}/search_service.log", when='midnight', backupCount=14),
+                logging.StreamHandler(sys.stdout)
+            ]
+        )
+        success = SearchService().serve()
+    elif args == ['--sync']:
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        sync_search_database()
+        success = True
+    elif args and args[0] == '--query':
+        options = dict(zip(args[2::2], args[3::2]))
+        result = SearchDatabase().search(
+            args[1] if len(args) > 1 else '', options.get('--category'), options.get('--page', 1)
+        )
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        success = True
+    elif args == ['--benchmark']:
+        print(f"{'registros':>10} {'consulta':<22} {'resultados':>10} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+        for row in run_benchmark():
+            print(f"{row['records']:>10} {row['query']:<22} {row['matches']:>10} {row['p50_ms']:>9} {row['p95_ms']:>9}")
+        success = True
+    elif args == ['--stop']:
+        success = send_command('shutdown', socket_path=SOCKET_PATH, timeout=5) is not None
+        print("Serviço de busca encerrando" if success else "Serviço de busca não está rodando")
+    else:
+        print("Uso: python3 search_service.py [--serve|--sync|--query <termo> [--category <c>] [--page <n>]|--benchmark|--stop]")
+        success = False
+
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Supervisor Blue/Green do Servidor de Produção
+Mantém um proxy TCP local na porta pública e alterna entre duas instâncias
+`next start` (blue/green): a nova versão sobe na porta livre, só recebe
+tráfego depois de responder /api/dashboard-data e a antiga é drenada
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import select
+import socket
+import logging
+import threading
+import subprocess
+import socketserver
+import urllib.request
+
+from artifact_ops import link_tree, remove_tree
+from rebuild_daemon import send_command
+from release_manager import DEPLOY_DIR, current_dist_dir
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
+APP_DIR = f"{PROJECT_ROOT}/app"
+LOG_DIR = f"{PROJECT_ROOT}/.logs"
+SUPERVISOR_SOCKET = f"{PROJECT_ROOT}/.server_supervisor.sock"
+PUBLIC_PORT = 3000
+BACKEND_PORTS = {'blue': 3001, 'green': 3002}
+READY_PATH = "/api/dashboard-data"
+READY_TIMEOUT_SECONDS = 90
+READY_POLL_INTERVAL = 0.2
+DRAIN_TIMEOUT_SECONDS = 30
+STOP_GRACE_SECONDS = 10
+PROXY_IDLE_TIMEOUT = 300
+
+
+def _pipe(client, upstream):
+    """Repassa bytes nos dois sentidos até as duas pontas fecharem"""
+    peers = {client: upstream, upstream: client}
+    open_sockets = {client, upstream}
+    while open_sockets:
+        readable, _, _ = select.select(list(open_sockets), [], [], PROXY_IDLE_TIMEOUT)
+        if not readable:
+            return
+        for sock in readable:
+            try:
+                data = sock.recv(65536)
+            except OSError:
+                return
+            if not data:
+                open_sockets.discard(sock)
+                try:
+                    peers[sock].shutdown(socket.SHUT_WR)
+                except OSError:
+                    pass
+                continue
+            try:
+                peers[sock].sendall(data)
+            except OSError:
+                return
+
+
+class _Backend:
+    """Uma instância `next start` (blue ou green)"""
+
+    def __init__(self, color, port, dist_dir):
+        self.color = color
+        self.port = port
+        self.dist_dir = dist_dir
+        self.process = None
+        self.connections = 0
+        self.started_at = None
+        self.ready_at = None
+
+
+class BlueGreenSupervisor:
+    """Proxy na porta pública + troca atômica da instância ativa"""
+
+    def __init__(self, app_dir=APP_DIR, public_port=PUBLIC_PORT, backend_ports=None,
+                 socket_path=SUPERVISOR_SOCKET, start_command=None, deploy_dir=DEPLOY_DIR):
+        self.app_dir = app_dir
+        self.deploy_dir = deploy_dir
+        self.public_port = public_port
+        self.backend_ports = backend_ports or BACKEND_PORTS
+        self.socket_path = socket_path
+        self.start_command = start_command
+        self.lock = threading.Lock()
+        self.deploy_lock = threading.Lock()
+        self.active = None
+        self.draining = {}
+        self.last_deploy = None
+
+    # --- proxy -----------------------------------------------------------
+
+    def acquire_backend(self):
+        with self.lock:
+            backend = self.active
+            if backend:
+                backend.connections += 1
+            return backend
+
+    def release_backend(self, backend):
+        with self.lock:
+            backend.connections -= 1
+
+    def _make_proxy(self):
+        supervisor = self
+
+        class ProxyHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                backend = supervisor.acquire_backend()
+                if backend is None:
+                    return
+                try:
+                    upstream = socket.create_connection(('127.0.0.1', backend.port), timeout=5)
+                except OSError as e:
+                    logger.error(f"Backend {backend.color} indisponível: {e}")
+                    supervisor.release_backend(backend)
+                    return
+                try:
+                    upstream.settimeout(None)
+                    _pipe(self.request, upstream)
+                finally:
+                    upstream.close()
+                    supervisor.release_backend(backend)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        server = socketserver.ThreadingTCPServer(('0.0.0.0', self.public_port), ProxyHandler)
+        server.daemon_threads = True
+        return server
+
+    # --- instâncias --------------------------------------------------------
+
+    def _command(self, port):
+        if self.start_command:
+            return [part.format(port=port) for part in self.start_command]
+        local_next = os.path.join(self.app_dir, 'node_modules', '.bin', 'next')
+        binary = [local_next] if os.path.exists(local_next) else ['npx', 'next']
+        return binary + ['start', '-p', str(port)]
+
+    def _snapshot_build(self, color):
+        """Build imutável da instância: a release ativa ou, sem releases, cópia do .next por hardlinks"""
+        release_dist = current_dist_dir(self.app_dir, self.deploy_dir)
+        if release_dist:
+            logger.info(f"Instância {color} servirá a release {os.path.basename(release_dist)}")
+            return release_dist
+
+        dist_name = f".next-{color}"
+        dist_dir = os.path.join(self.app_dir, dist_name)
+        remove_tree(dist_dir)
+        files = link_tree(os.path.join(self.app_dir, '.next'), dist_dir, exclude_dirs=('cache',))
+        logger.info(f"Build copiado para {dist_name} ({files} arquivos, hardlinks)")
+        return dist_name
+
+    def _start_backend(self, color):
+        port = self.backend_ports[color]
+        backend = _Backend(color, port, self._snapshot_build(color))
+        env = dict(os.environ, NEXT_DIST_DIR=backend.dist_dir, PORT=str(port))
+        os.makedirs(LOG_DIR, exist_ok=True)
+        with open(f"{LOG_DIR}/next_{color}.log", 'ab') as output:
+            backend.process = subprocess.Popen(
+                self._command(port), cwd=self.app_dir, env=env,
+                stdout=output, stderr=subprocess.STDOUT
+            )
+        backend.started_at = time.time()
+        logger.info(f"▶️  Instância {color} iniciada na porta {port} (pid {backend.process.pid})")
+        return backend
+
+    def _wait_ready(self, backend, timeout=READY_TIMEOUT_SECONDS):
+        """Espera a instância servir os dados; retorna os segundos até ficar pronta ou None"""
+        url = f"http://127.0.0.1:{backend.port}{READY_PATH}"
+        deadline = backend.started_at + timeout
+        while time.time() < deadline:
+            if backend.process.poll() is not None:
+                logger.error(f"Instância {backend.color} terminou antes de ficar pronta (código {backend.process.returncode})")
+                return None
+            try:
+                with urllib.request.urlopen(url, timeout=2) as response:
+                    if response.status == 200 and 'metadata' in json.loads(response.read()):
+                        backend.ready_at = time.time()
+                        return backend.ready_at - backend.started_at
+            except (OSError, ValueError):
+                pass
+            time.sleep(READY_POLL_INTERVAL)
+        logger.error(f"Instância {backend.color} não ficou pronta em {timeout}s")
+        return None
+
+    def _stop_backend(self, backend):
+        process = backend.process
+        if process and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(STOP_GRACE_SECONDS)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        self.draining.pop(backend.color, None)
+
+    def _drain(self, backend):
+        """Espera as conexões abertas na instância antiga terminarem e a encerra"""
+        start_time = time.time()
+        while time.time() - start_time < DRAIN_TIMEOUT_SECONDS:
+            with self.lock:
+                if backend.connections <= 0:
+                    break
+            time.sleep(0.1)
+        self._stop_backend(backend)
+        logger.info(f"⏹️  Instância {backend.color} drenada e encerrada em {time.time() - start_time:.1f}s")
+
+    def deploy(self):
+        """Sobe a nova versão na cor livre, troca o tráfego e drena a anterior"""
+        with self.deploy_lock:
+            deploy_start = time.time()
+            with self.lock:
+                current = self.active
+            color = 'green' if current and current.color == 'blue' else 'blue'
+
+            # Uma drenagem anterior ainda ocupando a porta é encerrada agora
+            stale = self.draining.get(color)
+            if stale:
+                self._stop_backend(stale)
+
+            try:
+                backend = self._start_backend(color)
+            except Exception as e:
+                logger.error(f"Falha ao iniciar instância {color}: {e}")
+                self.last_deploy = {'success': False, 'color': color, 'error': str(e)}
+                return self.last_deploy
+
+            ready_seconds = self._wait_ready(backend)
+            if ready_seconds is None:
+                self._stop_backend(backend)
+                self.last_deploy = {'success': False, 'color': color, 'error': 'readiness'}
+                return self.last_deploy
+
+            switch_start = time.perf_counter()
+            with self.lock:
+                previous, self.active = self.active, backend
+            switch_ms = (time.perf_counter() - switch_start) * 1000
+
+            if previous:
+                self.draining[previous.color] = previous
+                threading.Thread(target=self._drain, args=(previous,), daemon=True).start()
+
+            self.last_deploy = {
+                'success': True,
+                'color': color,
+                'port': backend.port,
+                'previous': previous.color if previous else None,
+                'ready_seconds': round(ready_seconds, 2),
+                'switch_ms': round(switch_ms, 3),
+                'total_seconds': round(time.time() - deploy_start, 2),
+                'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+            }
+            logger.info(
+                f"🔀 Tráfego em {color}:{backend.port} - pronto em {ready_seconds:.2f}s, "
+                f"troca em {switch_ms:.3f} ms" + (f", drenando {previous.color}" if previous else "")
+            )
+            return self.last_deploy
+
+    def get_status(self):
+        with self.lock:
+            active = self.active
+            status = {
+                'public_port': self.public_port,
+                'active': None,
+                'draining': [b.color for b in self.draining.values()],
+                'last_deploy': self.last_deploy
+            }
+            if active:
+                status['active'] = {
+                    'color': active.color,
+                    'port': active.port,
+                    'pid': active.process.pid,
+                    'connections': active.connections,
+                    'uptime_seconds': round(time.time() - active.ready_at, 1)
+                }
+        return status
+
+    # --- controle ----------------------------------------------------------
+
+    def handle(self, request):
+        command = request.get('command')
+        if command == 'ping':
+            return {'ok': True, 'pid': os.getpid()}
+        if command == 'status':
+            return {'ok': True, 'status': self.get_status()}
+        if command == 'deploy':
+            return dict(self.deploy(), ok=True)
+        if command == 'shutdown':
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {'ok': True}
+        return {'ok': False, 'error': f"Comando desconhecido: {command}"}
+
+    def serve(self):
+        """Sobe o proxy e o socket de controle, e faz o primeiro deploy"""
+        if send_command('ping', socket_path=self.socket_path, timeout=1):
+            logger.error(f"Supervisor já está rodando em {self.socket_path}")
+            return False
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+        supervisor = self
+
+        class ControlHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    response = supervisor.handle(json.loads(self.rfile.readline() or b'{}'))
+                except Exception as e:
+                    logger.error(f"Erro ao processar comando: {e}")
+                    response = {'ok': False, 'error': str(e)}
+                self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+
+        self.proxy = self._make_proxy()
+        self.control = socketserver.ThreadingUnixStreamServer(self.socket_path, ControlHandler)
+        self.control.daemon_threads = True
+        os.chmod(self.socket_path, 0o600)
+        threading.Thread(target=self.proxy.serve_forever, name='proxy', daemon=True).start()
+
+        if threading.current_thread() is threading.main_thread():
+            def stop(signum, frame):
+                threading.Thread(target=self.shutdown, daemon=True).start()
+            signal.signal(signal.SIGTERM, stop)
+            signal.signal(signal.SIGINT, stop)
+
+        logger.info(f"🛡️  Supervisor: proxy na porta {self.public_port}, controle em {self.socket_path}")
+        threading.Thread(target=self.deploy, name='initial-deploy', daemon=True).start()
+        try:
+            self.control.serve_forever()
+        finally:
+            self.proxy.shutdown()
+            self.proxy.server_close()
+            self.control.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            for backend in [self.active] + list(self.draining.values()):
+                if backend:
+                    self._stop_backend(backend)
+            logger.info("🛑 Supervisor encerrado")
+        return True
+
+    def shutdown(self):
+        self.control.shutdown()
+
+
+def request_deploy(socket_path=SUPERVISOR_SOCKET):
+    """Pede um deploy blue/green ao supervisor; None se ele não estiver rodando"""
+    return send_command('deploy', socket_path=socket_path, timeout=READY_TIMEOUT_SECONDS + 60)
+
+
+def start_supervisor_process(wait_seconds=10):
+    """Inicia o supervisor em segundo plano e espera o socket de controle"""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    with open(f"{LOG_DIR}/server_supervisor.log", 'ab') as output:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--serve'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=output, stderr=subprocess.STDOUT,
+            start_new_session=True
+        )
+    deadline = time.time() + wait_seconds
+    while time.time() < deadline:
+        if send_command('ping', socket_path=SUPERVISOR_SOCKET, timeout=1):
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def wait_for_deploy(timeout=READY_TIMEOUT_SECONDS + 30):
+    """Espera o supervisor concluir um deploy (ex: o inicial); retorna o resultado ou None"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        response = send_command('status', socket_path=SUPERVISOR_SOCKET, timeout=5)
+        last_deploy = response and response['status'].get('last_deploy')
+        if last_deploy:
+            return last_deploy
+        time.sleep(0.5)
+    return None
+
+
+def main():
+    """python3 server_supervisor.py [--serve|--deploy|--status|--stop]"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = sys.argv[1:]
+
+    if args == ['--serve']:
+        success = BlueGreenSupervisor().serve()
+    elif args in (['--deploy'], ['--status'], ['--stop']):
+        command = {'--deploy': 'deploy', '--status': 'status', '--stop': 'shutdown'}[args[0]]
+        response = send_command(command, socket_path=SUPERVISOR_SOCKET, timeout=READY_TIMEOUT_SECONDS + 60)
+        if response is None:
+            print("Supervisor não está rodando")
+            success = False
+        else:
+            print(json.dumps(response, indent=2, ensure_ascii=False))
+            success = response.get('ok', False) and response.get('success', True)
+    else:
+        print("Uso: python3 server_supervisor.py [--serve|--deploy|--status|--stop]")
+        success = False
+
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Grafo de Etapas do Rebuild
+Cada etapa declara entradas, saídas e dependências; uma etapa cuja impressão
+digital de entrada é igual à da última execução bem-sucedida é pulada
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+from datetime import datetime
+
+from change_detection import ChangeDetector, fingerprint_paths
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    """Etapa do rebuild: action() -> bool"""
+
+    def __init__(self, name, action, inputs=(), outputs=(), deps=(), exclude_dirs=(),
+                 relative_to=None, fingerprint_outputs=True):
+        self.name = name
+        self.action = action
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.exclude_dirs = list(exclude_dirs)
+        self.relative_to = relative_to
+        # False: saídas só precisam existir (nenhuma etapa depende do conteúdo)
+        self.fingerprint_outputs = fingerprint_outputs
+
+
+class StageGraph:
+    """Executa etapas em ordem topológica reaproveitando saídas em cache"""
+
+    def __init__(self, state_file, detector=None):
+        self.state_file = state_file
+        self.detector = detector or ChangeDetector()
+        self.stages = {}
+        self.order = []
+
+    def add(self, stage):
+        for dep in stage.deps:
+            if dep not in self.stages:
+                raise ValueError(f"Etapa {stage.name} depende de etapa desconhecida: {dep}")
+        self.stages[stage.name] = stage
+        self.order.append(stage.name)
+        return stage
+
+    def load_state(self):
+        """Carrega as impressões digitais da última execução de cada etapa"""
+        try:
+            if os.path.exists(self.state_file):
+                with open(self.state_file, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.error(f"Erro ao ler cache de etapas: {e}")
+        return {}
+
+    def save_state(self, state):
+        tmp_file = f"{self.state_file}.tmp"
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_file, self.state_file)
+        except Exception as e:
+            logger.error(f"Erro ao salvar cache de etapas: {e}")
+
+    def _fingerprint(self, paths, stage):
+        if not paths:
+            return None, 0
+        return fingerprint_paths(paths, self.detector, stage.exclude_dirs, stage.relative_to)
+
+    def input_fingerprint(self, stage, output_fingerprints):
+        """Combina os arquivos de entrada com as saídas das dependências"""
+        digest = hashlib.blake2b(digest_size=16)
+        files_fingerprint, file_count = self._fingerprint(stage.inputs, stage)
+        digest.update(f"entradas:{files_fingerprint}:{file_count}\n".encode('utf-8'))
+        for dep in stage.deps:
+            digest.update(f"{dep}:{output_fingerprints.get(dep)}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def run(self, force=False):
+        """Executa o grafo; retorna True se todas as etapas terminaram bem"""
+        state = self.load_state()
+        output_fingerprints = {}
+        summary = []
+
+        for name in self.order:
+            stage = self.stages[name]
+            stage_state = state.get(name, {})
+            fingerprint = self.input_fingerprint(stage, output_fingerprints)
+            outputs_present = all(os.path.exists(p) for p in stage.outputs)
+
+            if (not force and outputs_present
+                    and stage_state.get('input_fingerprint') == fingerprint):
+                logger.info(f"⏭️  Etapa '{name}' sem mudanças nas entradas - usando saída em cache")
+                output_fingerprints[name] = stage_state.get('output_fingerprint')
+                summary.append(f"{name}=cache")
+                continue
+
+            logger.info(f"▶️  Etapa '{name}' ({'forçada' if force else 'entradas mudaram'})")
+            start_time = time.time()
+            if not stage.action():
+                logger.error(f"❌ Etapa '{name}' falhou")
+                state.pop(name, None)
+                self.save_state(state)
+                return False
+
+            elapsed = time.time() - start_time
+            output_fingerprint = None
+            if stage.fingerprint_outputs:
+                output_fingerprint, _ = self._fingerprint(stage.outputs, stage)
+            # Etapas sem saídas em disco propagam a própria entrada
+            output_fingerprints[name] = output_fingerprint or fingerprint
+            state[name] = {
+                'input_fingerprint': fingerprint,
+                'output_fingerprint': output_fingerprints[name],
+                'last_run': datetime.now().isoformat(),
+                'seconds': round(elapsed, 2)
+            }
+            self.save_state(state)
+            summary.append(f"{name}={elapsed:.1f}s")
+
+        logger.info(f"🧭 Etapas: {', '.join(summary)}")
+        return True
@@ -5,44 +5,41 @@ Simula mudanças no dashboard_data.json para testar o sistema
 """
 
 import os
-import json
 import time
 import subprocess
 from datetime import datetime
 
+from data_publisher import edit_dashboard
+from backup_store import BackupStore
+
 PROJECT_ROOT = "/home/ubuntu/dashboard_indicacoes"
 JSON_FILE = f"{PROJECT_ROOT}/app/public/dashboard_data.json"
-BACKUP_FILE = f"{PROJECT_ROOT}/app/public/dashboard_data_backup.json"
 
 def backup_original():
-    """Faz backup do arquivo original"""
+    """Faz backup do arquivo original no repositório de backups (.backups/)"""
     if os.path.exists(JSON_FILE):
-        subprocess.run(['cp', JSON_FILE, BACKUP_FILE])
-        print(f"✅ Backup criado: {BACKUP_FILE}")
+        backup_id = BackupStore().backup_file(JSON_FILE, 'test_auto_rebuild')['id']
+        print(f"✅ Backup criado: {backup_id}")
+        return backup_id
+    return None
 
-def restore_original():
-    """Restaura o arquivo original"""
-    if os.path.exists(BACKUP_FILE):
-        subprocess.run(['cp', BACKUP_FILE, JSON_FILE])
+def restore_original(backup_id):
+    """Restaura o arquivo original (republicado sob lock)"""
+    if backup_id:
+        BackupStore().restore(backup_id, JSON_FILE)
         print(f"✅ Arquivo original restaurado")
 
 def simulate_change():
     """Simula uma mudança no arquivo JSON"""
     try:
-        # Ler arquivo atual
-        with open(JSON_FILE, 'r') as f:
-            data = json.load(f)
-        
-        # Adicionar timestamp para simular mudança
-        if 'metadata' not in data:
-            data['metadata'] = {}
-        
-        data['metadata']['last_test_update'] = datetime.now().isoformat()
-        data['metadata']['test_counter'] = data['metadata'].get('test_counter', 0) + 1
-        
-        # Salvar arquivo modificado
-        with open(JSON_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
+        # Ler, modificar e salvar o arquivo atual sob lock (escrita atômica)
+        with edit_dashboard(JSON_FILE) as data:
+            # Adicionar timestamp para simular mudança
+            if 'metadata' not in data:
+                data['metadata'] = {}
+            
+            data['metadata']['last_test_update'] = datetime.now().isoformat()
+            data['metadata']['test_counter'] = data['metadata'].get('test_counter', 0) + 1
         
         print(f"✅ Mudança simulada - contador: {data['metadata']['test_counter']}")
         return True
@@ -82,7 +79,7 @@ def main():
     
     # 1. Fazer backup
     print("\n1. Fazendo backup do arquivo original...")
-    backup_original()
+    backup_id = backup_original()
     
     # 2. Executar monitor inicial (deve detectar que não há mudanças)
     print("\n2. Executando monitor inicial...")
@@ -99,7 +96,7 @@ def main():
     
     # 5. Restaurar original
     print("\n5. Restaurando arquivo original...")
-    restore_original()
+    restore_original(backup_id)
     
     if success:
         print("\n🎉 TESTE CONCLUÍDO COM SUCESSO!")
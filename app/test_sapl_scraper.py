@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Teste do Scraper do SAPL com Páginas Gravadas
+Serve fixtures/sapl/page_N.html (50 indicações reais de
+monitoring_system/logs/html_sample.html em 7 páginas, paginação em janela de
+±2 páginas) e confere que todas as páginas e IDs são encontrados e que a
+segunda execução revalida todas as páginas com 304 (reparseando o corpo em
+cache quando o ano pedido muda)
+"""
+
+import os
+import tempfile
+import unittest
+
+from http_cache import HTTPCache
+from sapl_scraper import RECORDED_PAGE_NAME, parse_listing, scrape_sapl_ids, serve_recorded_pages
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'sapl')
+FIXTURE_PAGES = 7
+FIXTURE_IDS = 50
+
+
+def fixture_ids():
+    """IDs esperados: união do parsing de cada página gravada"""
+    expected = {}
+    for page in range(1, FIXTURE_PAGES + 1):
+        with open(os.path.join(FIXTURES_DIR, RECORDED_PAGE_NAME.format(page=page)), 'r', encoding='utf-8') as f:
+            expected.update(parse_listing(f.read())[0])
+    return expected
+
+
+class SaplScraperReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.server = serve_recorded_pages(FIXTURES_DIR)
+        self.cache_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.cache_dir.cleanup()
+
+    def scrape(self, **options):
+        return scrape_sapl_ids(self.server.url, rate=50, burst=8, cache=HTTPCache(self.cache_dir.name), **options)
+
+    def test_fixtures_use_windowed_pagination(self):
+        # A primeira página não cita a última: as demais só aparecem navegando
+        with open(os.path.join(FIXTURES_DIR, RECORDED_PAGE_NAME.format(page=1)), 'r', encoding='utf-8') as f:
+            self.assertLess(parse_listing(f.read())[1], FIXTURE_PAGES)
+
+    def test_cold_pass_finds_every_page_and_id(self):
+        ids, stats = self.scrape()
+
+        self.assertEqual(stats['pages'], FIXTURE_PAGES)
+        self.assertEqual(stats['last_page'], FIXTURE_PAGES)
+        self.assertEqual(stats['failed_pages'], [])
+        self.assertEqual(len(ids), FIXTURE_IDS)
+        self.assertEqual(ids, fixture_ids())
+        self.assertEqual(ids[799], '33022')
+        self.assertEqual(ids[55], '31662')
+        self.assertEqual(stats['cache']['misses'], FIXTURE_PAGES)
+
+    def test_warm_pass_revalidates_every_page(self):
+        cold_ids, _ = self.scrape()
+        ids, stats = self.scrape()
+
+        self.assertEqual(ids, cold_ids)
+        self.assertEqual(stats['pages'], FIXTURE_PAGES)
+        self.assertEqual(stats['failed_pages'], [])
+        self.assertEqual(stats['cache']['revalidated'], FIXTURE_PAGES)
+        self.assertEqual(stats['cache']['misses'], 0)
+        self.assertEqual(stats['cache']['bytes_downloaded'], 0)
+
+    def test_other_year_reparses_cached_bodies(self):
+        self.scrape()
+        # Mesmas páginas (304), mas o resultado guardado é de outro ano: parseia o corpo em cache
+        ids, stats = self.scrape(year=2024)
+
+        self.assertEqual(ids, {})
+        self.assertEqual(stats['pages'], FIXTURE_PAGES)
+        self.assertEqual(stats['cache']['revalidated'], FIXTURE_PAGES)
+        self.assertEqual(stats['cache']['reparsed'], FIXTURE_PAGES)
+        self.assertEqual(stats['cache']['bytes_downloaded'], 0)
+
+        ids, stats = self.scrape()
+        self.assertEqual(ids, fixture_ids())
+        self.assertEqual(stats['cache']['reparsed'], FIXTURE_PAGES)
+
+
+if __name__ == "__main__":
+    unittest.main()
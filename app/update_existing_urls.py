@@ -4,9 +4,11 @@
 Script para atualizar indicações existentes no dashboard com URLs do SAPL
 """
 
-import json
 import os
 
+from dashboard_store import edit_store
+from backup_store import BackupStore
+
 def generate_sapl_url(numero: str) -> str:
     """Gera URL do SAPL para buscar a indicação"""
     return 'https://sapl.camarabento.rs.gov.br/'
@@ -15,30 +17,20 @@ def update_dashboard_with_urls():
     """Atualiza todas as indicações existentes com URLs do SAPL"""
     dashboard_file = "/home/ubuntu/dashboard_indicacoes/app/public/dashboard_data.json"
     
-    # Carregar dados atuais
-    with open(dashboard_file, 'r', encoding='utf-8') as f:
-        dashboard_data = json.load(f)
-    
-    # Criar backup
-    backup_file = dashboard_file.replace('.json', '_backup_before_urls.json')
-    with open(backup_file, 'w', encoding='utf-8') as f:
-        json.dump(dashboard_data, f, ensure_ascii=False, indent=2)
-    print(f"Backup criado: {backup_file}")
-    
-    # Atualizar indicações em todas as categorias
-    updated_count = 0
-    
-    for categoria_nome, categoria_data in dashboard_data.get('details', {}).items():
-        for indicacao in categoria_data.get('indicacoes', []):
-            # Verificar se já tem pdfUrl
-            if 'pdfUrl' not in indicacao:
-                indicacao['pdfUrl'] = generate_sapl_url(indicacao.get('numero', ''))
+    # Atualizar no banco em uma transação; o JSON é exportado ao final (sob lock)
+    with edit_store(dashboard_file) as store:
+        # Criar backup (sob o lock o arquivo é a exportação atual do banco)
+        backup_id = BackupStore().backup_file(dashboard_file, 'before_urls')['id']
+        print(f"Backup criado: {backup_id}")
+        
+        # Atualizar só as indicações sem o campo pdfUrl (pdfUrl: null explícito é mantido)
+        updated_count = 0
+        
+        for indicacao in store.indicacoes():
+            if indicacao['pdf_url'] is None and 'pdfUrl' not in indicacao['extra']:
+                store.update_indicacao(indicacao['id'], pdf_url=generate_sapl_url(indicacao['identificacao'] or ''))
                 updated_count += 1
     
-    # Salvar dados atualizados
-    with open(dashboard_file, 'w', encoding='utf-8') as f:
-        json.dump(dashboard_data, f, ensure_ascii=False, indent=2)
-    
     print(f"✅ Dashboard atualizado!")
     print(f"📊 Total de indicações atualizadas: {updated_count}")
     print(f"🔗 Todas as indicações agora têm links para o SAPL")
@@ -6,10 +6,13 @@ Mapeia cada indicação do dashboard com seu documentoId específico do SAPL
 """
 
 import json
-import shutil
 from datetime import datetime
 import re
 
+from data_publisher import write_json_atomic
+from dashboard_store import edit_store
+from backup_store import BackupStore
+
 def extract_number_from_indication(numero_str):
     """Extrai o número da indicação do formato 'IND XXX/2025'"""
     if not numero_str:
@@ -22,17 +25,13 @@ def extract_number_from_indication(numero_str):
     return None
 
 def create_backup():
-    """Cria backup do dashboard_data.json atual"""
+    """Cria backup do dashboard_data.json atual (repositório deduplicado, fora de public/)"""
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = f"/home/ubuntu/dashboard_indicacoes/app/public/dashboard_data_backup_before_pdf_links_{timestamp}.json"
-        
-        shutil.copy2(
-            "/home/ubuntu/dashboard_indicacoes/app/public/dashboard_data.json", 
-            backup_file
+        entry = BackupStore().backup_file(
+            "/home/ubuntu/dashboard_indicacoes/app/public/dashboard_data.json", "before_pdf_links"
         )
-        print(f"✅ Backup criado: {backup_file}")
-        return backup_file
+        print(f"✅ Backup criado: {entry['id']}")
+        return entry['id']
     except Exception as e:
         print(f"❌ Erro ao criar backup: {e}")
         return None
@@ -49,8 +48,7 @@ def load_json_file(filepath):
 def save_json_file(data, filepath):
     """Salva arquivo JSON"""
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        write_json_atomic(filepath, data)
         return True
     except Exception as e:
         print(f"❌ Erro ao salvar {filepath}: {e}")
@@ -72,42 +70,45 @@ def create_sapl_mapping(sapl_data):
     
     return mapping
 
-def update_dashboard_links(dashboard_data, sapl_mapping):
-    """Atualiza os links diretos no dashboard"""
+def update_dashboard_links(store, sapl_mapping):
+    """Atualiza os links diretos no banco (UPDATE por indicação, na transação do store)"""
     total_updated = 0
     total_not_found = 0
     updated_details = []
     not_found_details = []
     
-    # Processar cada categoria no dashboard
-    for categoria_nome, categoria_data in dashboard_data.get('details', {}).items():
-        for indicacao in categoria_data.get('indicacoes', []):
-            numero_dashboard = extract_number_from_indication(indicacao.get('numero', ''))
+    # Processar cada indicação do banco, na ordem do dashboard
+    for indicacao in store.indicacoes():
+        numero_dashboard = extract_number_from_indication(indicacao['identificacao'] or '')
+        
+        if numero_dashboard and numero_dashboard in sapl_mapping:
+            # Encontrou correspondência - atualizar URL
+            old_url = indicacao['pdf_url'] or ''
+            new_url = sapl_mapping[numero_dashboard]['pdfUrl']
+            documento_id = sapl_mapping[numero_dashboard]['documentoId']
             
-            if numero_dashboard and numero_dashboard in sapl_mapping:
-                # Encontrou correspondência - atualizar URL
-                old_url = indicacao.get('pdfUrl', '')
-                new_url = sapl_mapping[numero_dashboard]['pdfUrl']
-                
-                indicacao['pdfUrl'] = new_url
-                total_updated += 1
-                
-                updated_details.append({
-                    'numero': indicacao.get('numero'),
-                    'categoria': categoria_nome,
-                    'old_url': old_url,
-                    'new_url': new_url,
-                    'documentoId': sapl_mapping[numero_dashboard]['documentoId']
-                })
-                
-            else:
-                # Não encontrou correspondência
-                total_not_found += 1
-                not_found_details.append({
-                    'numero': indicacao.get('numero'),
-                    'categoria': categoria_nome,
-                    'current_url': indicacao.get('pdfUrl', '')
-                })
+            store.update_indicacao(
+                indicacao['id'], pdf_url=new_url,
+                documento_id=str(documento_id) if documento_id is not None else None
+            )
+            total_updated += 1
+            
+            updated_details.append({
+                'numero': indicacao['identificacao'],
+                'categoria': indicacao['categoria'],
+                'old_url': old_url,
+                'new_url': new_url,
+                'documentoId': documento_id
+            })
+            
+        else:
+            # Não encontrou correspondência
+            total_not_found += 1
+            not_found_details.append({
+                'numero': indicacao['identificacao'],
+                'categoria': indicacao['categoria'],
+                'current_url': indicacao['pdf_url'] or ''
+            })
     
     return total_updated, total_not_found, updated_details, not_found_details
 
@@ -128,33 +129,25 @@ def main():
         print("❌ Falha ao carregar dados do SAPL")
         return
     
-    # 3. Carregar dados do dashboard atual
-    print("📥 Carregando dados do dashboard atual...")
-    dashboard_data = load_json_file("/home/ubuntu/dashboard_indicacoes/app/public/dashboard_data.json")
-    if not dashboard_data:
-        print("❌ Falha ao carregar dados do dashboard")
-        return
-    
-    # 4. Criar mapeamento
+    # 3. Criar mapeamento
     print("🗺️  Criando mapeamento de indicações...")
     sapl_mapping = create_sapl_mapping(sapl_data)
     print(f"   📊 Total de IDs do SAPL mapeados: {len(sapl_mapping)}")
     
-    # 5. Atualizar links no dashboard
-    print("🔗 Atualizando links diretos...")
-    total_updated, total_not_found, updated_details, not_found_details = update_dashboard_links(
-        dashboard_data, sapl_mapping
-    )
-    
-    # 6. Salvar dashboard atualizado
-    print("💾 Salvando dashboard atualizado...")
-    success = save_json_file(
-        dashboard_data, 
-        "/home/ubuntu/dashboard_indicacoes/app/public/dashboard_data.json"
-    )
-    
-    if not success:
-        print("❌ Falha ao salvar dashboard atualizado")
+    # 4. Atualizar no banco em uma transação; o JSON é exportado ao final (sob lock)
+    print("📥 Abrindo banco do dashboard...")
+    try:
+        with edit_store("/home/ubuntu/dashboard_indicacoes/app/public/dashboard_data.json") as store:
+            # 5. Atualizar links no banco
+            print("🔗 Atualizando links diretos...")
+            total_updated, total_not_found, updated_details, not_found_details = update_dashboard_links(
+                store, sapl_mapping
+            )
+            
+            # 6. Exportar dashboard atualizado
+            print("💾 Exportando dashboard atualizado...")
+    except Exception as e:
+        print(f"❌ Falha ao atualizar dashboard: {e}")
         return
     
     # 7. Relatório final
@@ -163,7 +156,7 @@ def main():
     print("=" * 60)
     print(f"✅ Total de indicações atualizadas: {total_updated}")
     print(f"⚠️  Total de indicações não encontradas: {total_not_found}")
-    print(f"📁 Backup salvo em: {backup_file.split('/')[-1]}")
+    print(f"📁 Backup salvo: {backup_file} (python3 backup_store.py --restore {backup_file})")
     
     if updated_details:
         print(f"\n🔗 PRIMEIRAS 5 ATUALIZAÇÕES REALIZADAS:")